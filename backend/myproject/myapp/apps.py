@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import signals  # noqa: F401  (connects the cache invalidation receivers)
+        from .metrics import instrument_connection, instrument_drf
+        from .sqlite import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='sqlite-pragmas')
+        connection_created.connect(instrument_connection, dispatch_uid='query-timer')
+        instrument_drf()
@@ -0,0 +1,92 @@
+"""
+Async-native read endpoints for the hottest master lists, mounted under /api/async/.
+
+Served by the ASGI app (`uvicorn myproject.asgi:application`), a request waiting
+on the database no longer holds a worker thread. The JSON is the same as the DRF
+routes produce (see representations.py); writes, pagination and conditional GETs
+stay on the regular endpoints.
+
+/api/events/ (the master-data change stream, see events.py) lives here too.
+"""
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import events, renderers, representations
+from .models import BranchState, Pincode, Bank
+
+
+def _pincodes(params):
+    # Same filters as PincodeViewSet.get_queryset
+    queryset = Pincode.objects.all()
+    for name in ('branch_state', 'branch_location', 'sub_location'):
+        if params.get(name):
+            queryset = queryset.filter(**{name: params[name]})
+    if params.get('status') is not None:
+        queryset = queryset.filter(status=params['status'])
+    return queryset
+
+
+# resource -> (representation, queryset for the request's query params)
+RESOURCES = {
+    'branch-states': (representations.BRANCH_STATE, lambda params: BranchState.objects.all()),
+    'banks': (representations.BANK, lambda params: Bank.objects.filter(status=True)),
+    'pincodes': (representations.PINCODE, _pincodes),
+}
+
+CHUNK_SIZE = 2000
+
+def _json(data, status=200):
+    return HttpResponse(renderers.dumps(data), content_type='application/json', status=status)
+
+
+def _not_found(detail='Not found.'):
+    return _json({'detail': detail}, status=404)
+
+
+@require_GET
+async def list_view(request, resource):
+    if resource not in RESOURCES:
+        return _not_found()
+    representation, queryset = RESOURCES[resource]
+    rows = representation.arows(queryset(request.GET), chunk_size=CHUNK_SIZE)
+    return _json([representation.to_dict(row) async for row in rows])
+
+
+@require_GET
+async def detail_view(request, resource, pk):
+    if resource not in RESOURCES:
+        return _not_found()
+    representation, queryset = RESOURCES[resource]
+    try:
+        row = await representation.rows(queryset(request.GET)).aget(pk=pk)
+    except representation.model.DoesNotExist:
+        return _not_found(f'No {representation.model.__name__} matches the given query.')
+    return _json(representation.to_dict(row))
+
+
+@require_GET
+async def events_view(request):
+    """Server-Sent Events stream of master-data changes; see events.py."""
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would hold a worker thread for as long as it is open
+        return _json({'detail': 'The event stream is only served by the ASGI application.'}, status=501)
+    if events.connection_count() >= getattr(settings, 'EVENTS_MAX_CONNECTIONS', 1000):
+        return _json({'detail': 'Too many open event streams, retry later.'}, status=503)
+
+    resources = [name for name in request.GET.get('resources', '').split(',') if name]
+    unknown = [name for name in resources if name not in events.RESOURCE_OF_LABEL.values()]
+    if unknown:
+        return _json({'detail': f"Unknown resource(s): {', '.join(unknown)}"}, status=400)
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_id is not None and not last_id.isdigit():
+        return _json({'detail': 'Last-Event-ID must be an event id'}, status=400)
+
+    response = StreamingHttpResponse(
+        events.stream(int(last_id) if last_id is not None else None, resources or None),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass events through as they are written
+    return response
@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+
+# User fields signed into every token; permission checks read them from the token
+USER_CLAIMS = ('role', 'is_staff', 'is_superuser', 'full_name', 'email')
+# Saving any of these (or the password / is_active) revokes the user's outstanding tokens
+REVOKING_FIELDS = frozenset(USER_CLAIMS) | {'password', 'is_active'}
+
+REVOKED_KEY = 'jwt-revoked-before:{}'
+
+
+def add_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def get_tokens_for_user(user):
+    refresh = add_claims(RefreshToken.for_user(user), user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+        'role': user.role
+    }
+
+
+def revoke_tokens(*user_ids):
+    """
+    Reject every token issued to `user_ids` before now (to the second).
+
+    The cut-off is stored on the user row (`tokens_valid_after`), which login
+    and token refresh read anyway, so every server process refuses to refresh
+    a revoked session. Access tokens are checked without a query, against a
+    copy of the cut-off in the cache: with a per-process cache, an access token
+    revoked by another process keeps working until it expires
+    (ACCESS_TOKEN_LIFETIME); a shared cache (Redis / database) closes that gap.
+    """
+    now = timezone.now().replace(microsecond=0)
+    User.objects.filter(pk__in=user_ids).update(tokens_valid_after=now)
+    cache.set_many({REVOKED_KEY.format(user_id): int(now.timestamp()) for user_id in user_ids},
+                   int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+
+
+def is_revoked(token, user=None):
+    """True if `token` predates a revocation: `user`'s stored cut-off when given, else the cached copy."""
+    if user is not None:
+        revoked_before = user.tokens_valid_after and int(user.tokens_valid_after.timestamp())
+    else:
+        revoked_before = cache.get(REVOKED_KEY.format(token[api_settings.USER_ID_CLAIM]))
+    return bool(revoked_before) and token.get('iat', 0) < revoked_before
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds `request.user` from the token's signed claims
+    instead of loading the User row, so authenticated requests and the role
+    permission checks cost no queries.
+
+    Tokens issued before the claims existed fall back to the database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            user = super().get_user(validated_token)
+            if is_revoked(validated_token, user):
+                raise InvalidToken('Token has been revoked')
+            return user
+        if is_revoked(validated_token):
+            raise InvalidToken('Token has been revoked')
+        return TokenUser(validated_token)
@@ -0,0 +1,179 @@
+"""
+Helpers shared by the benchmark management commands: a synthetic data
+generator for the master tables and a few timing utilities.
+
+Benchmarks seed inside `rolled_back()`, so they can be pointed at a real
+database without leaving anything behind.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+
+from .models import (
+    User, Department, Designation, BranchState, BranchLocation, SubLocation, Pincode,
+    BranchInnerState, BranchInnerLocation, Bank, TypeOfAccount,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back(using='default'):
+    """Run the block in a transaction that is always rolled back."""
+    try:
+        with transaction.atomic(using=using):
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+@contextmanager
+def scratch_database(alias='default'):
+    """
+    Swap in a throwaway test database for the block (in memory for SQLite).
+
+    Unlike `rolled_back()`, data seeded here is committed, so it is visible to
+    other threads, e.g. the executor behind Django's async ORM.
+    """
+    creation = connections[alias].creation
+    old_name = creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        creation.destroy_test_db(old_name, verbosity=0)
+
+
+def _chunks(objs, size):
+    for start in range(0, len(objs), size):
+        yield objs[start:start + size]
+
+
+def _bulk(model, objs, batch_size):
+    created = []
+    for chunk in _chunks(objs, batch_size):
+        created.extend(model.objects.bulk_create(chunk))
+    return created
+
+
+def seed_location_master(states=40, locations=2000, sublocations=20000, pincodes=150000,
+                         inactive_ratio=0.2, batch_size=5000, prefix='Bench', seed=0):
+    """
+    Bulk-insert a synthetic State → Location → SubLocation → Pincode tree.
+
+    Children are spread randomly over their parents and `inactive_ratio` of every
+    level gets status=False, so status filters have something to skip.
+    Returns a dict of row counts per model.
+    """
+    rng = random.Random(seed)
+    active = lambda: rng.random() >= inactive_ratio
+
+    state_objs = _bulk(BranchState, [
+        BranchState(name=f'{prefix} State {i}', status=active()) for i in range(states)
+    ], batch_size)
+    location_objs = _bulk(BranchLocation, [
+        BranchLocation(name=f'{prefix} Location {i}', branch_state=rng.choice(state_objs), status=active())
+        for i in range(locations)
+    ], batch_size)
+
+    sublocation_objs = []
+    for i in range(sublocations):
+        location = rng.choice(location_objs)
+        sublocation_objs.append(SubLocation(
+            name=f'{prefix} SubLocation {i}', branch_state_id=location.branch_state_id,
+            branch_location=location, status=active(),
+        ))
+    sublocation_objs = _bulk(SubLocation, sublocation_objs, batch_size)
+
+    # Six-digit codes that do not collide with rows already in the table
+    taken = set(Pincode.objects.values_list('pincode', flat=True))
+    codes = (code for code in map(str, range(100000, 1000000)) if code not in taken)
+    pincode_objs = []
+    for _, code in zip(range(pincodes), codes):
+        sub_location = rng.choice(sublocation_objs)
+        pincode_objs.append(Pincode(
+            pincode=code, branch_state_id=sub_location.branch_state_id,
+            branch_location_id=sub_location.branch_location_id, sub_location=sub_location,
+            status=active(),
+        ))
+    _bulk(Pincode, pincode_objs, batch_size)
+
+    inner_state_objs = _bulk(BranchInnerState, [
+        BranchInnerState(name=f'{prefix} Inner State {i}', status=active()) for i in range(states)
+    ], batch_size)
+    _bulk(BranchInnerLocation, [
+        BranchInnerLocation(
+            name=f'{prefix} Inner Location {i}', branch_inner_state=rng.choice(inner_state_objs),
+            branch_location=rng.choice(location_objs), status=active(),
+        )
+        for i in range(locations)
+    ], batch_size)
+
+    _bulk(Bank, [Bank(bank_name=f'{prefix} Bank {i}', status=active()) for i in range(states * 10)], batch_size)
+    _bulk(TypeOfAccount, [
+        TypeOfAccount(account_type=f'{prefix} Account {i}', status=active()) for i in range(states * 10)
+    ], batch_size)
+
+    return {
+        'states': len(state_objs),
+        'locations': len(location_objs),
+        'sublocations': len(sublocation_objs),
+        'pincodes': len(pincode_objs),
+        'inner_locations': locations,
+        'banks': states * 10,
+        'account_types': states * 10,
+    }
+
+
+def seed_users(count=50000, batch_size=5000, prefix='bench', seed=0):
+    """Bulk-insert trainers and trainees (plus a few departments / designations) sharing one password hash."""
+    rng = random.Random(seed)
+    password = make_password('bench-password')
+    departments = _bulk(Department, [Department(name=f'{prefix} Department {i}') for i in range(10)], batch_size)
+    _bulk(Designation, [
+        Designation(name=f'{prefix} Designation {i}', department=rng.choice(departments)) for i in range(50)
+    ], batch_size)
+    _bulk(User, [
+        User(
+            email=f'{prefix}.user{i}@example.com', full_name=f'{prefix.title()} User {i}',
+            employee_id=f'{prefix[:4].upper()}{i:07d}', role=rng.choice(['trainer', 'trainee']),
+            password=password, is_active=rng.random() >= 0.1,
+        )
+        for i in range(count)
+    ], batch_size)
+    return count
+
+
+def measure(fn, repeat=20, warmup=2):
+    """Call `fn` repeatedly and return the wall-clock samples in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+    }
@@ -0,0 +1,118 @@
+"""
+Delta sync for client-side copies of the master tables.
+
+GET /api/changes/ returns every row of the requested resources and a token.
+GET /api/changes/?since=<token> returns only the rows created or updated since
+that token (by `updated_at`) and the ids deleted since then (from Tombstone),
+along with the next token. Rows have the same JSON as the resource's list
+endpoint. Clients apply `updated` as upserts and then drop the `deleted` ids;
+ids are never reused.
+
+The next token lies CHANGES_MARGIN_SECONDS before the response was built, so
+a write whose transaction committed just after the read is still picked up.
+The price is that the last few seconds of rows can come back twice; upserts
+make that harmless. Tombstones are kept for CHANGES_TOMBSTONE_DAYS; an older
+token is answered with 410 and the client starts over without `since`.
+
+`queryset.update()` does not set auto_now fields, so bulk writers pass
+`touched(model, ...)` as their update values.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import representations
+from .models import (
+    Department, Designation, BranchState, BranchLocation, SubLocation, Pincode,
+    BranchInnerState, BranchInnerLocation, Bank, TypeOfAccount, Tombstone,
+)
+
+
+# resource (as in the router) -> (model, representation of its list rows)
+RESOURCES = {
+    'departments': (Department, representations.DEPARTMENT),
+    'designations': (Designation, representations.DESIGNATION),
+    'branch-states': (BranchState, representations.BRANCH_STATE),
+    'branch-locations': (BranchLocation, representations.BRANCH_LOCATION),
+    'sublocations': (SubLocation, representations.SUB_LOCATION),
+    'pincodes': (Pincode, representations.PINCODE),
+    'branch-inner-states': (BranchInnerState, representations.BRANCH_INNER_STATE),
+    'branch-inner-locations': (BranchInnerLocation, representations.BRANCH_INNER_LOCATION),
+    'banks': (Bank, representations.BANK),
+    'typeofaccounts': (TypeOfAccount, representations.TYPE_OF_ACCOUNT),
+}
+TRACKED_MODELS = tuple(model for model, _ in RESOURCES.values())
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class TokenExpired(Exception):
+    """The token is older than the tombstones, so deletions may have been forgotten."""
+
+
+def margin():
+    return timedelta(seconds=getattr(settings, 'CHANGES_MARGIN_SECONDS', 5))
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'CHANGES_TOMBSTONE_DAYS', 30))
+
+
+def encode_token(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_token(token):
+    try:
+        return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise InvalidToken(f'Invalid token: {token!r}')
+
+
+def touched(model, **values):
+    """Values for `queryset.update()` on `model`, plus the `updated_at` that update() leaves alone."""
+    if model in TRACKED_MODELS:
+        values['updated_at'] = timezone.now()
+    return values
+
+
+def record_deletions(model, pks):
+    if model in TRACKED_MODELS and pks:
+        label = model._meta.label_lower
+        Tombstone.objects.bulk_create([Tombstone(model=label, object_id=pk) for pk in pks])
+
+
+def changes(resources, since=None):
+    """{'token': ..., 'changes': {resource: {'updated': [rows], 'deleted': [ids]}}}"""
+    now = timezone.now()
+    if since is not None and since < now - retention():
+        raise TokenExpired()
+
+    deleted = defaultdict(list)
+    if since is not None:
+        names = {RESOURCES[name][0]._meta.label_lower: name for name in resources}
+        tombstones = Tombstone.objects.filter(deleted_at__gt=since, model__in=names).order_by('id')
+        for label, object_id in tombstones.values_list('model', 'object_id'):
+            deleted[names[label]].append(object_id)
+
+    result = {}
+    for name in resources:
+        model, representation = RESOURCES[name]
+        queryset = model.objects.order_by('id')
+        if since is not None:
+            queryset = queryset.filter(updated_at__gt=since)
+        result[name] = {
+            'updated': representation.render(representation.rows(queryset)),
+            'deleted': deleted[name],
+        }
+    return {'token': encode_token(now - margin()), 'changes': result}
+
+
+def prune(older_than=None):
+    """Delete tombstones past the retention window; returns how many."""
+    cutoff = timezone.now() - (older_than if older_than is not None else retention())
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
@@ -0,0 +1,48 @@
+"""
+Employee directory: the non-admin users, listed by `is_active` and switched
+between the two lists in sets.
+
+The list queries filter on exactly the predicates of the partial indexes on
+User (`user_active_directory_idx` / `user_inactive_directory_idx`), so a page
+in id order and its total are both read from an index over that list alone.
+
+Activation and deactivation are one UPDATE for the whole set. update() sends
+no per-row signals, so bulk_changed is sent instead; its User receiver
+revokes the outstanding tokens of deactivated users (see signals.py).
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .models import User
+from .signals import bulk_changed
+
+
+DIRECTORY_ROLES = [role for role, _ in User.ROLE_CHOICES if role != 'admin']
+MAX_SEARCH_LENGTH = 100
+
+
+def directory(active, role=None, search=None):
+    """Non-admin users with the given `is_active`, optionally of one role and matching `search`."""
+    queryset = User.objects.filter(is_active=active).exclude(role='admin').order_by('id')
+    if role:
+        queryset = queryset.filter(role=role)
+    search = ' '.join((search or '').split())[:MAX_SEARCH_LENGTH]
+    if search:
+        queryset = queryset.filter(
+            Q(email__icontains=search) | Q(full_name__icontains=search) | Q(employee_id__icontains=search)
+        )
+    return queryset
+
+
+def set_active(ids, active):
+    """
+    Set `is_active` on the non-admin users among `ids`. Returns (changed ids,
+    missing ids); users that already had the value are neither.
+    """
+    with transaction.atomic():
+        found = dict(User.objects.filter(pk__in=ids).exclude(role='admin').values_list('pk', 'is_active'))
+        changed = [pk for pk, current in found.items() if current != active]
+        if changed:
+            User.objects.filter(pk__in=changed).update(is_active=active)
+            bulk_changed.send(sender=User, pks=changed, operation='update', fields=['is_active'])
+    return changed, [pk for pk in ids if pk not in found]
@@ -0,0 +1,224 @@
+"""
+Push channel for master-data changes: GET /api/events/ as Server-Sent Events.
+
+Every create / update / delete of the master models (EVENT_MODELS) is written
+to ChangeEvent in the same transaction, by the signal receivers in signals.py.
+Because the table is the broker, subscribers in every server process see the
+same feed with nothing else to run. The feed is in id order, which is commit
+order only because SQLite serializes writers; on a database with concurrent
+writers a smaller id can commit after a larger one has been read, and a
+stream following the ids could skip it.
+
+Each process keeps one Broadcaster per event loop. While at least one stream
+is open it polls ChangeEvent for new ids every EVENTS_POLL_INTERVAL seconds,
+with a single query however many clients are connected, and hands each batch
+to the streams' queues. A stream is an async generator waiting on its queue.
+Under ASGI it holds no thread. Queues hold at most EVENTS_QUEUE_SIZE batches:
+a client that falls that far behind is disconnected, and EventSource
+reconnects with its Last-Event-ID to catch up from the table.
+
+Clients resume with the standard `Last-Event-ID` header that EventSource sends
+when it reconnects. If more than EVENTS_MAX_BACKLOG events were missed, the
+stream sends a `reset` event instead, and the client should resync through
+/api/changes/.
+"""
+import asyncio
+import weakref
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import changes
+from .models import (
+    Department, Designation, BranchState, BranchLocation, SubLocation, Pincode, Bank, TypeOfAccount,
+    ChangeEvent,
+)
+from .renderers import dumps
+
+
+EVENT_MODELS = (BranchState, BranchLocation, SubLocation, Pincode, Bank, TypeOfAccount, Department, Designation)
+# app_label.model_name -> resource name used in the API (as in changes.RESOURCES)
+RESOURCE_OF_LABEL = {
+    model._meta.label_lower: name for name, (model, _) in changes.RESOURCES.items() if model in EVENT_MODELS
+}
+IGNORED_FIELDS = {'updated_at'}
+COLUMNS = ('id', 'model', 'object_id', 'operation', 'fields', 'created_at')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+#-------------------------------------------------------------------------------#
+# Recording (called from signals.py, inside the writing transaction)
+
+
+def changed_fields(instance):
+    """Names of the fields a save changed, or None if the instance was not loaded from the database."""
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        return None
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if field.attname in loaded and field.name not in IGNORED_FIELDS
+        and getattr(instance, field.attname) != loaded[field.attname]
+    ]
+
+
+def record(model, pks, operation, fields=None):
+    if model in EVENT_MODELS and pks:
+        label = model._meta.label_lower
+        ChangeEvent.objects.bulk_create([
+            ChangeEvent(model=label, object_id=pk, operation=operation, fields=fields) for pk in pks
+        ])
+
+
+def record_save(instance, created, update_fields=None):
+    if created:
+        fields = None
+    elif update_fields is not None:
+        fields = sorted(set(update_fields) - IGNORED_FIELDS)
+    else:
+        fields = changed_fields(instance)
+    if not created and fields == []:
+        return  # saved without changes
+    record(type(instance), [instance.pk], 'create' if created else 'update', fields)
+    # The next save of this instance is compared against what was just written
+    instance._loaded_values = {field.attname: getattr(instance, field.attname)
+                               for field in instance._meta.concrete_fields}
+
+
+def prune(older_than):
+    return ChangeEvent.objects.filter(created_at__lt=timezone.now() - older_than).delete()[0]
+
+
+#-------------------------------------------------------------------------------#
+# Reading
+
+
+async def latest_id():
+    row = await ChangeEvent.objects.order_by('-id').values('id').afirst()
+    return row['id'] if row else 0
+
+
+async def fetch(after, limit):
+    queryset = ChangeEvent.objects.filter(id__gt=after).order_by('id').values(*COLUMNS)[:limit]
+    return [row async for row in queryset]
+
+
+def format_event(row):
+    data = {
+        'model': RESOURCE_OF_LABEL.get(row['model'], row['model']),
+        'id': row['object_id'],
+        'operation': row['operation'],
+        'fields': row['fields'],
+        'at': row['created_at'],
+    }
+    return f"id: {row['id']}\nevent: change\ndata: {dumps(data).decode()}\n\n"
+
+
+class Broadcaster:
+    """One poller per process and event loop, shared by every open stream."""
+
+    def __init__(self):
+        self.queues = set()
+        self.position = None
+        self.task = None
+
+    def subscribe(self, after):
+        """
+        A queue of the event batches after the poller's position, and that
+        position. A poller started here begins at `after`, the id the
+        subscriber read, rather than reading its own later one.
+        """
+        queue = asyncio.Queue(maxsize=_setting('EVENTS_QUEUE_SIZE', 100))
+        self.queues.add(queue)
+        if self.task is None or self.task.done():
+            self.position = after
+            self.task = asyncio.get_running_loop().create_task(self._poll())
+        return queue, self.position
+
+    def unsubscribe(self, queue):
+        self.queues.discard(queue)
+
+    def _put(self, queue, rows):
+        try:
+            queue.put_nowait(rows)
+        except asyncio.QueueFull:
+            # Too slow: drop what it has not read and tell the stream to end
+            self.queues.discard(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    async def _poll(self):
+        interval, batch = _setting('EVENTS_POLL_INTERVAL', 1.0), _setting('EVENTS_MAX_BACKLOG', 1000)
+        while self.queues:
+            rows = await fetch(self.position, batch)
+            if rows:
+                self.position = rows[-1]['id']
+                for queue in list(self.queues):
+                    self._put(queue, rows)
+            if len(rows) < batch:
+                await asyncio.sleep(interval)
+        self.task = self.position = None
+
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def broadcaster():
+    loop = asyncio.get_running_loop()
+    if loop not in _broadcasters:
+        _broadcasters[loop] = Broadcaster()
+    return _broadcasters[loop]
+
+
+def connection_count():
+    return sum(len(b.queues) for b in list(_broadcasters.values()))
+
+
+async def stream(last_id=None, resources=None):
+    """The text of an SSE response: backlog after `last_id` (if given), then live events."""
+    labels = None if resources is None else {
+        label for label, name in RESOURCE_OF_LABEL.items() if name in resources
+    }
+    head = await latest_id()
+    if last_id is None:
+        last_id = head
+    hub = broadcaster()
+    # A poller started here begins where this stream does. Subscribing comes before
+    # the backlog query, so nothing falls between the two.
+    queue, position = hub.subscribe(head)
+    try:
+        yield f"retry: {int(_setting('EVENTS_RETRY_MS', 3000))}\n\n"
+        if position > last_id:
+            # Events the poller had already passed: read them ourselves
+            limit = _setting('EVENTS_MAX_BACKLOG', 1000)
+            backlog = await fetch(last_id, limit + 1)
+            if len(backlog) > limit:
+                last_id = await latest_id()
+                yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+                backlog = []
+            for row in backlog:
+                last_id = row['id']
+                if labels is None or row['model'] in labels:
+                    yield format_event(row)
+
+        heartbeat = _setting('EVENTS_HEARTBEAT', 15.0)
+        while True:
+            try:
+                rows = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if rows is None:
+                return  # fell too far behind; the client reconnects with Last-Event-ID
+            for row in rows:
+                if row['id'] <= last_id:
+                    continue  # already sent from the backlog
+                last_id = row['id']
+                if labels is None or row['model'] in labels:
+                    yield format_event(row)
+    finally:
+        hub.unsubscribe(queue)
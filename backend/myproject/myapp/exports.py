@@ -0,0 +1,103 @@
+import csv
+import json
+
+from django.db import models
+
+from .models import User, SubLocation, Pincode, BranchInnerLocation
+from .representations import iso_datetime
+
+
+# resource -> (queryset factory, [(column, ORM path)]). Column names match the serializers.
+EXPORTS = {
+    'pincodes': (
+        lambda: Pincode.objects.order_by('id'),
+        [
+            ('id', 'id'), ('pincode', 'pincode'),
+            ('branch_state', 'branch_state_id'), ('branch_state_name', 'branch_state__name'),
+            ('branch_location', 'branch_location_id'), ('location_name', 'branch_location__name'),
+            ('sub_location', 'sub_location_id'), ('sub_location_name', 'sub_location__name'),
+            ('status', 'status'), ('created_at', 'created_at'),
+        ],
+    ),
+    'sublocations': (
+        lambda: SubLocation.objects.order_by('id'),
+        [
+            ('id', 'id'), ('name', 'name'),
+            ('branch_state', 'branch_state_id'), ('branch_state_name', 'branch_state__name'),
+            ('branch_location', 'branch_location_id'), ('branch_location_name', 'branch_location__name'),
+            ('status', 'status'),
+        ],
+    ),
+    'branch-inner-locations': (
+        lambda: BranchInnerLocation.objects.order_by('id'),
+        [
+            ('id', 'id'), ('name', 'name'),
+            ('branch_inner_state', 'branch_inner_state_id'),
+            ('branch_inner_state_name', 'branch_inner_state__name'),
+            ('branch_location', 'branch_location_id'), ('branch_location_name', 'branch_location__name'),
+            ('status', 'status'),
+        ],
+    ),
+    'users': (
+        lambda: User.objects.exclude(role='admin').order_by('id'),
+        [
+            ('id', 'id'), ('full_name', 'full_name'), ('email', 'email'), ('employee_id', 'employee_id'),
+            ('role', 'role'), ('contact_info', 'contact_info'), ('created_at', 'created_at'),
+        ],
+    ),
+}
+
+# Resources that only admins may export
+ADMIN_ONLY_EXPORTS = {'users'}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+    def write(self, value):
+        return value
+
+
+def export_rows(resource, fmt, chunk_size=CHUNK_SIZE):
+    """
+    Yield the export for `resource` as `fmt` text, a chunk of rows at a time.
+
+    The rows come from a `values_list().iterator()` with the related names joined in,
+    so no model instances are built and only one chunk is ever held in memory.
+    """
+    queryset_factory, columns = EXPORTS[resource]
+    headers = [column for column, _ in columns]
+    paths = [path for _, path in columns]
+    queryset = queryset_factory()
+    datetime_positions = [
+        i for i, path in enumerate(paths)
+        if '__' not in path and isinstance(queryset.model._meta.get_field(path), models.DateTimeField)
+    ]
+    rows = queryset.values_list(*paths).iterator(chunk_size=chunk_size)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        encode = writer.writerow
+        yield encode(headers)
+    else:
+        encode = lambda row: json.dumps(dict(zip(headers, row)), ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    buffer = []
+    for row in rows:
+        if datetime_positions:
+            row = list(row)
+            for i in datetime_positions:
+                if row[i] is not None:
+                    row[i] = iso_datetime(row[i])
+        buffer.append(encode(row))
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
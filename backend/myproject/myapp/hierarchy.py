@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from . import versioning
+from .models import BranchState, BranchLocation, SubLocation, Pincode
+
+
+TREE_MODELS = (BranchState, BranchLocation, SubLocation, Pincode)
+CACHE_TIMEOUT = getattr(settings, 'LOCATION_HIERARCHY_CACHE_TIMEOUT', 60 * 60)
+
+
+def build_tree(state_id=None):
+    """
+    Nested State → Location → SubLocation → Pincode tree of active rows.
+
+    Always four queries, one per level, however big the tree is. Pass `state_id`
+    to build only that state's subtree.
+    """
+    scope = {'branch_state_id': state_id} if state_id is not None else {}
+    states = BranchState.objects.filter(status=True).order_by('name')
+    if state_id is not None:
+        states = states.filter(pk=state_id)
+
+    tree, locations, sublocations = [], {}, {}
+    state_nodes = {}
+    for pk, name in states.values_list('id', 'name'):
+        state_nodes[pk] = {'id': pk, 'name': name, 'locations': []}
+        tree.append(state_nodes[pk])
+
+    for pk, name, parent in (BranchLocation.objects.filter(status=True, **scope)
+                             .order_by('name').values_list('id', 'name', 'branch_state_id')):
+        if parent in state_nodes:
+            locations[pk] = {'id': pk, 'name': name, 'sublocations': []}
+            state_nodes[parent]['locations'].append(locations[pk])
+
+    for pk, name, parent in (SubLocation.objects.filter(status=True, **scope)
+                             .order_by('name').values_list('id', 'name', 'branch_location_id')):
+        if parent in locations:
+            sublocations[pk] = {'id': pk, 'name': name, 'pincodes': []}
+            locations[parent]['sublocations'].append(sublocations[pk])
+
+    for pk, code, parent in (Pincode.objects.filter(status=True, **scope)
+                             .order_by('pincode').values_list('id', 'pincode', 'sub_location_id')):
+        if parent in sublocations:
+            sublocations[parent]['pincodes'].append({'id': pk, 'pincode': code})
+
+    return tree
+
+
+def _cache_key(state_id):
+    # Every write bumps its table's version in the writer's transaction, so each
+    # process sees a new key as soon as the write commits, whichever process
+    # made it. modified_at tells apart a version reused after a rollback.
+    versions = versioning.current_many(TREE_MODELS)
+    stamp = ':'.join(f'{version}-{modified_at.timestamp() if modified_at else 0}'
+                     for version, modified_at in versions.values())
+    return f'location-hierarchy:{stamp}:{state_id or "all"}'
+
+
+def get_tree(state_id=None):
+    """Cached `build_tree`, keyed by the versions of the four tables: one query when cached."""
+    key = _cache_key(state_id)
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_tree(state_id)
+        cache.set(key, tree, CACHE_TIMEOUT)
+    return tree
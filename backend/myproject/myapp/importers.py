@@ -0,0 +1,208 @@
+import csv
+import io
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+
+from .models import BranchState, BranchLocation, SubLocation, Pincode
+from .serializers import PincodeSerializer
+from .signals import bulk_changed
+
+
+# Accepted spellings of each CSV column (matched case-insensitively)
+COLUMN_ALIASES = {
+    'pincode': ('pincode', 'pin', 'pin_code'),
+    'state': ('state', 'branch_state', 'state_name'),
+    'location': ('location', 'branch_location', 'location_name'),
+    'sub_location': ('sub_location', 'sublocation', 'sub_location_name'),
+    'status': ('status', 'active'),
+}
+REQUIRED_COLUMNS = ('pincode', 'state', 'location', 'sub_location')
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'inactive'}
+
+
+def _key(name):
+    return ' '.join(name.split()).casefold()
+
+
+class PincodeImporter:
+    """
+    Stream a CSV of `pincode,state,location,sub_location[,status]` rows into the
+    location master.
+
+    Names are resolved through in-memory maps loaded once up front, so a row costs
+    no queries of its own. Rows are written `chunk_size` at a time with
+    `bulk_create`, one transaction per chunk. A bad row is reported and skipped;
+    it never aborts the rest of the file. With `create_missing`, unknown states,
+    locations and sublocations are created alongside the pincodes that need them.
+    """
+
+    def __init__(self, chunk_size=1000, create_missing=False):
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        self.created = 0
+        self.rows = 0
+        self.errors = []
+        self._load_maps()
+
+    def _load_maps(self):
+        self.states = {_key(name): pk for pk, name in BranchState.objects.values_list('id', 'name')}
+        self.locations = {
+            (state_id, _key(name)): pk
+            for pk, state_id, name in BranchLocation.objects.values_list('id', 'branch_state_id', 'name')
+        }
+        self.sublocations = {
+            (location_id, _key(name)): pk
+            for pk, location_id, name in SubLocation.objects.values_list('id', 'branch_location_id', 'name')
+        }
+        self.pincodes = set(Pincode.objects.values_list('pincode', flat=True))
+
+    # -- input ----------------------------------------------------------------
+
+    def import_file(self, fileobj, encoding='utf-8-sig'):
+        """Import from a binary file object (an upload or `open(path, 'rb')`)."""
+        return self.import_lines(io.TextIOWrapper(fileobj, encoding=encoding, newline=''))
+
+    def import_lines(self, lines):
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            raise serializers.ValidationError({'file': 'The file is empty'})
+        columns = self._map_header(header)
+
+        rows = ((reader.line_num, record) for record in reader if any(cell.strip() for cell in record))
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk([
+                (line, {name: (record[i].strip() if i < len(record) else '') for name, i in columns.items()})
+                for line, record in chunk
+            ])
+        return self.result()
+
+    def _map_header(self, header):
+        positions = {_key(cell).replace(' ', '_'): i for i, cell in enumerate(header)}
+        columns = {}
+        for name, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in positions:
+                    columns[name] = positions[alias]
+                    break
+        missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+        if missing:
+            raise serializers.ValidationError({'file': f"Missing column(s): {', '.join(missing)}"})
+        return columns
+
+    def result(self):
+        return {'rows': self.rows, 'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+    # -- per chunk ------------------------------------------------------------
+
+    def _import_chunk(self, chunk):
+        self.rows += len(chunk)
+        # Hierarchy entries this chunk would create, keyed like the maps
+        new_states, new_locations, new_sublocations = {}, {}, {}
+        accepted = []
+
+        for line, row in chunk:
+            errors = self._validate(row, new_states, new_locations, new_sublocations)
+            if errors:
+                self.errors.append({'line': line, 'pincode': row['pincode'], 'errors': errors})
+            else:
+                accepted.append((line, row))
+                self.pincodes.add(row['pincode'])
+
+        if not accepted:
+            return
+        try:
+            with transaction.atomic():
+                created = self._create_hierarchy(new_states, new_locations, new_sublocations)
+                created[Pincode] = Pincode.objects.bulk_create([self._build(row) for _, row in accepted])
+                for model, objs in created.items():
+                    if objs:
+                        bulk_changed.send(sender=model, pks=[obj.pk for obj in objs], operation='create')
+        except DatabaseError as exc:
+            # The whole chunk rolled back: forget the ids it handed out and report its rows
+            self._load_maps()
+            for line, row in accepted:
+                self.errors.append({'line': line, 'pincode': row['pincode'], 'errors': {'non_field_errors': [str(exc)]}})
+            return
+        self.created += len(accepted)
+
+    def _validate(self, row, new_states, new_locations, new_sublocations):
+        errors = {}
+        try:
+            PincodeSerializer().validate_pincode(row['pincode'])
+        except serializers.ValidationError as exc:
+            errors['pincode'] = exc.detail
+        else:
+            if row['pincode'] in self.pincodes:
+                errors['pincode'] = ['Pincode already exists']
+
+        for name in ('state', 'location', 'sub_location'):
+            if not row[name]:
+                errors[name] = ['This field is required']
+        if errors:
+            return errors
+
+        state, location, sub_location = _key(row['state']), _key(row['location']), _key(row['sub_location'])
+        state_id = self.states.get(state)
+        location_id = self.locations.get((state_id, location)) if state_id else None
+        sub_location_id = self.sublocations.get((location_id, sub_location)) if location_id else None
+        if sub_location_id:
+            return None
+
+        if not self.create_missing:
+            if not state_id:
+                errors['state'] = [f"Unknown state '{row['state']}'"]
+            elif not location_id:
+                errors['location'] = [f"Location '{row['location']}' does not belong to state '{row['state']}'"]
+            else:
+                errors['sub_location'] = [
+                    f"Sub-location '{row['sub_location']}' does not belong to location '{row['location']}'"
+                ]
+            return errors
+
+        if not state_id:
+            new_states.setdefault(state, row['state'])
+        if not location_id:
+            new_locations.setdefault((state, location), row['location'])
+        new_sublocations.setdefault((state, location, sub_location), row['sub_location'])
+        return None
+
+    def _create_hierarchy(self, new_states, new_locations, new_sublocations):
+        states = BranchState.objects.bulk_create([BranchState(name=name) for name in new_states.values()])
+        for obj in states:
+            self.states[_key(obj.name)] = obj.pk
+
+        locations = [
+            BranchLocation(name=name, branch_state_id=self.states[state])
+            for (state, _), name in new_locations.items()
+        ]
+        locations = BranchLocation.objects.bulk_create(locations)
+        for obj in locations:
+            self.locations[(obj.branch_state_id, _key(obj.name))] = obj.pk
+
+        sublocations = []
+        for (state, location, _), name in new_sublocations.items():
+            state_id = self.states[state]
+            sublocations.append(SubLocation(
+                name=name, branch_state_id=state_id, branch_location_id=self.locations[(state_id, location)],
+            ))
+        sublocations = SubLocation.objects.bulk_create(sublocations)
+        for obj in sublocations:
+            self.sublocations[(obj.branch_location_id, _key(obj.name))] = obj.pk
+        return {BranchState: states, BranchLocation: locations, SubLocation: sublocations}
+
+    def _build(self, row):
+        state_id = self.states[_key(row['state'])]
+        location_id = self.locations[(state_id, _key(row['location']))]
+        return Pincode(
+            pincode=row['pincode'],
+            branch_state_id=state_id,
+            branch_location_id=location_id,
+            sub_location_id=self.sublocations[(location_id, _key(row['sub_location']))],
+            status=row.get('status', '').casefold() not in FALSE_VALUES,
+        )
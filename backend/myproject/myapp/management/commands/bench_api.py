@@ -0,0 +1,168 @@
+import json
+import platform
+import resource
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from myapp import search
+from myapp.authentication import get_tokens_for_user
+from myapp.benchmarks import measure, scratch_database, seed_location_master, seed_users, summarize
+from myapp.models import User, BranchState, Pincode
+from myapp.urls import router
+
+
+VOLUMES = {'states': 40, 'locations': 2000, 'sublocations': 20000, 'pincodes': 150000, 'users': 50000}
+
+
+def peak_rss_mb():
+    # The process's high-water mark so far: one figure for the whole run, not per endpoint.
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def peak_alloc_kib(fetch):
+    """Peak Python heap allocated by one call of `fetch`, on a fresh trace (tracemalloc is slow: untimed)."""
+    tracemalloc.start()
+    try:
+        fetch()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def endpoints():
+    """Every GET route in myapp/urls.py, with real ids and query strings filled in."""
+    pincode = Pincode.objects.order_by('id').values_list('pincode', flat=True).first()
+    state = BranchState.objects.filter(status=True).values_list('id', flat=True).first()
+    paths = []
+    for prefix, viewset, _ in router.registry:
+        paths.append(f'/api/{prefix}/')
+        paths.append(f'/api/{prefix}/?page_size=50')
+        pk = viewset.queryset.values_list('pk', flat=True).first()
+        if pk is not None:
+            paths.append(f'/api/{prefix}/{pk}/')
+    paths += [
+        f'/api/pincodes/?branch_state={state}',
+        f'/api/pincodes/lookup/{pincode}/',
+        f'/api/pincodes/autocomplete/?q={pincode[:3]}',
+        '/api/sublocations/?status=1',
+        '/api/users/',
+        '/api/trainer-only/',
+        '/api/location-hierarchy/',
+        f'/api/location-hierarchy/?state={state}',
+        '/api/search/?q=bench locaton 12',
+        '/api/exports/pincodes.csv',
+        '/api/exports/users.ndjson',
+        '/api/async/branch-states/',
+        '/api/async/banks/',
+        f'/api/async/pincodes/?branch_state={state}',
+    ]
+    return paths
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with production-sized master data and users, drive every GET "
+        "endpoint through the test client and report latency percentiles, queries, response size "
+        "and peak Python allocation per request, and the run's peak RSS. Results can be saved as "
+        "JSON and compared between commits."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply every volume, e.g. 0.1 for a quick run')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--only', help='Only endpoints whose path contains this text')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Print p50 / query changes against an earlier JSON result')
+
+    def handle(self, *args, **options):
+        volumes = {name: max(1, int(options[name] * options['scale'])) for name in VOLUMES}
+        baseline = self._load(options['compare']) if options['compare'] else {}
+
+        # Production-like request handling: no DEBUG query log or debug pages
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost']), scratch_database():
+            seed_location_master(
+                states=volumes['states'], locations=volumes['locations'],
+                sublocations=volumes['sublocations'], pincodes=volumes['pincodes'],
+            )
+            seed_users(volumes['users'])
+            search.rebuild()
+            admin = User.objects.create_superuser(email='bench-admin@example.com', password='bench', role='trainer')
+            client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(admin)['access']}")
+
+            results = []
+            for path in endpoints():
+                if options['only'] and options['only'] not in path:
+                    continue
+                result = self._bench(client, path, options['repeat'], options['warmup'])
+                results.append(result)
+                self._print(result, baseline.get(path))
+            rss = peak_rss_mb()
+            self.stdout.write(f"peak RSS of the whole run: {rss} MB")
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({
+                    'revision': git_revision(),
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'database': connection.vendor,
+                    'volumes': volumes,
+                    'repeat': options['repeat'],
+                    'peak_rss_mb': rss,
+                    'results': results,
+                }, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _bench(self, client, path, repeat, warmup):
+        def fetch():
+            response = client.get(path)
+            if response.streaming:
+                return response.status_code, sum(len(chunk) for chunk in response.streaming_content)
+            return response.status_code, len(response.content)
+
+        with CaptureQueriesContext(connection) as queries:
+            status, size = fetch()
+        query_count = len(queries)  # read before the next request resets the query log
+        samples = measure(fetch, repeat=repeat, warmup=warmup)
+        return {
+            'path': path, 'status': status, 'queries': query_count, 'bytes': size,
+            **summarize(samples), 'peak_alloc_kib': peak_alloc_kib(fetch),
+        }
+
+    def _print(self, result, before=None):
+        line = (
+            f"{result['path'][:48]:48} {result['status']}  p50={result['p50_ms']:9.2f}  "
+            f"p95={result['p95_ms']:9.2f}  p99={result['p99_ms']:9.2f} ms  q={result['queries']:3}  "
+            f"{result['bytes'] / 1024:9.1f} KiB  alloc={result['peak_alloc_kib']:9.1f} KiB"
+        )
+        if before:
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            line += f"  p50 {change:+.0f}%"
+            if result['queries'] != before['queries']:
+                line += f"  queries {before['queries']}->{result['queries']}"
+        self.stdout.write(line)
+
+    def _load(self, path):
+        try:
+            with open(path) as fh:
+                return {result['path']: result for result in json.load(fh)['results']}
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
@@ -0,0 +1,124 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+from myapp.benchmarks import percentile, scratch_database, seed_location_master
+from myapp.models import BranchState
+
+
+HOST = 'localhost'
+
+
+def _split(path):
+    path, _, query = path.partition('?')
+    return path, query
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the sync DRF routes through the WSGI handler (a thread per request, like a "
+        "threaded server) against the /api/async/ routes through the ASGI handler, in-process, "
+        "on a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and path')
+        parser.add_argument('--pincodes', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            seed_location_master(states=40, locations=400, sublocations=4000, pincodes=options['pincodes'])
+            state = BranchState.objects.filter(status=True).values_list('id', flat=True).first()
+            endpoints = ['branch-states/', 'banks/', f'pincodes/?branch_state={state}']
+
+            wsgi, asgi = get_wsgi_application(), get_asgi_application()
+            for endpoint in endpoints:
+                for name, run in (('wsgi', self._run_wsgi), ('asgi', self._run_asgi)):
+                    path = f'/api/{endpoint}' if name == 'wsgi' else f'/api/async/{endpoint}'
+                    handler = wsgi if name == 'wsgi' else asgi
+                    elapsed, samples = run(handler, path, options['requests'], options['concurrency'])
+                    self.stdout.write(
+                        f"{endpoint:32} {name}  req/s={len(samples) / elapsed:8.1f}  "
+                        f"p50={percentile(samples, 50):7.2f} ms  p99={percentile(samples, 99):7.2f} ms"
+                    )
+            connections.close_all()
+
+    # -- WSGI: a pool of threads, one request each at a time -------------------
+
+    def _run_wsgi(self, app, path, total, concurrency):
+        path, query = _split(path)
+
+        def call(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            start = time.perf_counter()
+            statuses = []
+            body = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            b''.join(body)
+            body.close()
+            assert statuses[0].startswith('200'), statuses[0]
+            return (time.perf_counter() - start) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(call, range(total)))
+        return time.perf_counter() - started, samples
+
+    # -- ASGI: one event loop, `concurrency` requests in flight ----------------
+
+    def _run_asgi(self, app, path, total, concurrency):
+        path, query = _split(path)
+
+        async def call():
+            done = asyncio.Event()
+            messages = []
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if message['type'] == 'http.response.body' and not message.get('more_body'):
+                    done.set()
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+                'root_path': '', 'headers': [(b'host', HOST.encode())],
+                'client': ('127.0.0.1', 50000), 'server': (HOST, 80),
+            }
+            start = time.perf_counter()
+            await app(scope, receive, send)
+            assert messages[0]['status'] == 200, messages[0]['status']
+            return (time.perf_counter() - start) * 1000
+
+        async def main():
+            samples, remaining = [], iter(range(total))
+
+            async def worker():
+                for _ in remaining:
+                    samples.append(await call())
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return time.perf_counter() - started, samples
+
+        return asyncio.run(main())
@@ -0,0 +1,147 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+
+from myapp.benchmarks import measure, rolled_back, seed_location_master, summarize
+from myapp.models import (
+    BranchState, BranchLocation, SubLocation, Pincode,
+    BranchInnerState, BranchInnerLocation, Bank, TypeOfAccount,
+)
+
+
+# Indexes added for the location master filter paths (migration 0003)
+BENCHMARKED_INDEXES = {
+    Pincode: ['pincode_state_created_idx', 'pincode_location_created_idx', 'pincode_active_state_idx'],
+    SubLocation: ['subloc_active_state_idx', 'subloc_active_location_idx'],
+    BranchInnerLocation: ['innerloc_active_state_idx', 'innerloc_active_location_idx'],
+    Bank: ['bank_active_idx'],
+    TypeOfAccount: ['typeofaccount_active_idx'],
+}
+
+# Single-column FK indexes the composites replaced; recreated for the "before" run
+BASELINE_INDEXES = {
+    Pincode: [
+        models.Index(fields=['branch_state'], name='bench_pincode_state_idx'),
+        models.Index(fields=['branch_location'], name='bench_pincode_location_idx'),
+    ],
+}
+
+
+def access_paths():
+    """The querysets the list viewsets build for their common filter combinations."""
+    state = BranchState.objects.filter(name__startswith='Bench').order_by('id').first()
+    location = BranchLocation.objects.filter(branch_state=state).order_by('id').first()
+    sub_location = SubLocation.objects.filter(branch_location=location).order_by('id').first()
+    inner_state = BranchInnerState.objects.filter(name__startswith='Bench').order_by('id').first()
+
+    pincodes = Pincode.objects.select_related('branch_state', 'branch_location', 'sub_location')
+    sublocations = SubLocation.objects.select_related('branch_state', 'branch_location')
+    inner_locations = BranchInnerLocation.objects.select_related('branch_inner_state', 'branch_location')
+    return {
+        'pincodes?branch_state': pincodes.filter(branch_state=state),
+        'pincodes?branch_state&status': pincodes.filter(branch_state=state, status=True),
+        'pincodes?branch_location&status': pincodes.filter(branch_location=location, status=True),
+        'pincodes?sub_location&status': pincodes.filter(sub_location=sub_location, status=True),
+        'sublocations?branch_state&status': sublocations.filter(branch_state=state, status=True),
+        'sublocations/by-location (status=True)': sublocations.filter(branch_location=location, status=True),
+        'branch-inner-locations?branch_inner_state&status': inner_locations.filter(
+            branch_inner_state=inner_state, status=True
+        ),
+        'branch-inner-locations?branch_location&status': inner_locations.filter(
+            branch_location=location, status=True
+        ),
+        'banks': Bank.objects.filter(status=True),
+        'typeofaccounts': TypeOfAccount.objects.filter(status=True),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic location master inside a rolled-back transaction and compare "
+        "EXPLAIN plans and latency of the list filters with and without the filter indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--states', type=int, default=40)
+        parser.add_argument('--locations', type=int, default=2000)
+        parser.add_argument('--sublocations', type=int, default=20000)
+        parser.add_argument('--pincodes', type=int, default=120000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        results = {}
+        with rolled_back():
+            self.stdout.write('Seeding...')
+            counts = seed_location_master(
+                states=options['states'], locations=options['locations'],
+                sublocations=options['sublocations'], pincodes=options['pincodes'],
+            )
+            self.stdout.write(', '.join(f'{name}={count}' for name, count in counts.items()))
+
+            self._analyze()
+            self._toggle_indexes(drop=True)
+            self._analyze()
+            results['before'] = self._run(options['repeat'])
+
+            self._toggle_indexes(drop=False)
+            self._analyze()
+            results['after'] = self._run(options['repeat'])
+
+        self._report(results)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump({'seed': counts, **results}, fh, indent=2)
+
+    def _toggle_indexes(self, drop):
+        # Plain DDL rather than `with schema_editor()`: SQLite refuses the editor
+        # context inside an open transaction, and the index statements don't need it.
+        editor = connection.schema_editor()
+        drop_sql = lambda index: f'DROP INDEX {editor.quote_name(index.name)}'
+        with connection.cursor() as cursor:
+            for model, names in BENCHMARKED_INDEXES.items():
+                for index in model._meta.indexes:
+                    if index.name in names:
+                        cursor.execute(drop_sql(index) if drop else str(index.create_sql(model, editor)))
+            for model, indexes in BASELINE_INDEXES.items():
+                for index in indexes:
+                    cursor.execute(str(index.create_sql(model, editor)) if drop else drop_sql(index))
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _run(self, repeat):
+        results = {}
+        for label, queryset in access_paths().items():
+            sql, params = queryset.query.sql_with_params()
+
+            def fetch():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+
+            # `db` is the query alone; `orm` adds model instantiation as the viewsets see it
+            db = summarize(measure(fetch, repeat=repeat))
+            orm = summarize(measure(lambda: list(queryset.all()), repeat=repeat))
+            results[label] = {
+                'rows': queryset.count(),
+                'plan': queryset.explain(),
+                **db,
+                'orm_p50_ms': orm['p50_ms'],
+            }
+        return results
+
+    def _report(self, results):
+        for label, before in results['before'].items():
+            after = results['after'][label]
+            speedup = before['p50_ms'] / after['p50_ms'] if after['p50_ms'] else float('inf')
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}  ({after["rows"]} rows)'))
+            for name, run, suffix in (('before', before, ''), ('after', after, f'  ({speedup:.1f}x)')):
+                self.stdout.write(
+                    f'  {name + ":":7} db p50 {run["p50_ms"]:.3f} ms  p95 {run["p95_ms"]:.3f} ms  '
+                    f'orm p50 {run["orm_p50_ms"]:.3f} ms{suffix}'
+                )
+                for line in run['plan'].splitlines():
+                    self.stdout.write(f'           {line}')
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.benchmarks import rolled_back, scratch_database
+from myapp.models import User
+from myapp.provisioning import UserProvisioner
+
+
+class Command(BaseCommand):
+    help = (
+        "Users per second created one create_user() call at a time (what UserManagementView.post does) "
+        "and through UserProvisioner with 1 and N hashing processes, on a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    def records(self, prefix):
+        return [
+            {'email': f'{prefix}{i}@example.com', 'full_name': f'Provisioned {i}',
+             'employee_id': f'{prefix[:3].upper()}{i:06d}', 'role': 'trainee', 'password': f'password-{i}'}
+            for i in range(self.count)
+        ]
+
+    def handle(self, *args, **options):
+        self.count = options['users']
+        paths = {
+            'create_user()': self.create_user,
+            'provisioner (1 process)': lambda records: UserProvisioner(workers=1).provision(records),
+        }
+        if options['workers'] > 1:
+            paths[f"provisioner ({options['workers']} processes)"] = (
+                lambda records: UserProvisioner(workers=options['workers']).provision(records))
+
+        baseline = None
+        with scratch_database():
+            for label, run in paths.items():
+                records = self.records('bench')
+                with rolled_back():
+                    started = time.perf_counter()
+                    run(records)
+                    elapsed = time.perf_counter() - started
+                rate = self.count / elapsed
+                baseline = baseline or rate
+                self.stdout.write(f"{label:28} {elapsed:8.2f} s  {rate:8.1f} users/s  x{rate / baseline:.1f}")
+
+    def create_user(self, records):
+        for record in records:
+            User.objects.create_user(**record)
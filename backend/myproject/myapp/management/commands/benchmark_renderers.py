@@ -0,0 +1,58 @@
+import io
+import statistics
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from myapp import representations
+from myapp.benchmarks import measure, scratch_database, seed_location_master, seed_users
+from myapp.models import User, Pincode, SubLocation
+from myapp.renderers import FastJSONParser, FastJSONRenderer, MessagePackParser, MessagePackRenderer, msgpack, orjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode and decode the largest master lists with DRF's stdlib JSON renderer / parser, "
+        "FastJSONRenderer / FastJSONParser and, when msgpack is installed, MessagePack, "
+        "on a scratch database. Reports MB/s of output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pincodes', type=int, default=50000)
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson is not installed: FastJSONRenderer is the stdlib renderer.')
+
+        formats = [
+            ('json (stdlib)', JSONRenderer(), JSONParser()),
+            ('json (fast)', FastJSONRenderer(), FastJSONParser()),
+        ]
+        if msgpack is not None:
+            formats.append(('msgpack', MessagePackRenderer(), MessagePackParser()))
+
+        with scratch_database():
+            seed_location_master(states=40, locations=2000, sublocations=20000, pincodes=options['pincodes'])
+            seed_users(options['users'])
+            payloads = {
+                'pincodes': representations.PINCODE.render(representations.PINCODE.rows(Pincode.objects.all())),
+                'sublocations': representations.SUB_LOCATION.render(
+                    representations.SUB_LOCATION.rows(SubLocation.objects.all())),
+                # Raw datetimes (not pre-formatted strings) exercise the encoder's default hook
+                'users (datetime objects)': list(User.objects.values('id', 'email', 'full_name', 'created_at')),
+            }
+
+        for name, data in payloads.items():
+            for label, renderer, parser in formats:
+                content = renderer.render(data)
+                encode = statistics.median(measure(lambda: renderer.render(data), options['repeat'], warmup=1))
+                decode = statistics.median(measure(lambda: parser.parse(io.BytesIO(content)), options['repeat'],
+                                                   warmup=1))
+                megabytes = len(content) / 1e6
+                self.stdout.write(
+                    f"{name:26} {label:14} {megabytes:7.2f} MB  encode={megabytes / (encode / 1000):8.1f} MB/s  "
+                    f"decode={megabytes / (decode / 1000):8.1f} MB/s"
+                )
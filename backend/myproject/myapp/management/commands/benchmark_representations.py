@@ -0,0 +1,70 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from myapp import representations, serializers
+from myapp.benchmarks import measure, scratch_database, seed_location_master, seed_users
+from myapp.models import User, Designation, SubLocation, Pincode, BranchInnerLocation
+
+
+# name -> (serializer, queryset as the list view builds it, representation)
+CASES = {
+    'pincodes': (
+        serializers.PincodeSerializer,
+        lambda: Pincode.objects.select_related('branch_state', 'branch_location', 'sub_location'),
+        representations.PINCODE,
+    ),
+    'sublocations': (
+        serializers.SubLocationSerializer,
+        lambda: SubLocation.objects.select_related('branch_state', 'branch_location'),
+        representations.SUB_LOCATION,
+    ),
+    'branch-inner-locations': (
+        serializers.BranchInnerLocationSerializer,
+        lambda: BranchInnerLocation.objects.select_related('branch_inner_state', 'branch_location'),
+        representations.BRANCH_INNER_LOCATION,
+    ),
+    'designations': (
+        serializers.DesignationSerializer,
+        lambda: Designation.objects.select_related('department'),
+        representations.DESIGNATION,
+    ),
+    'users': (serializers.UserSerializer, lambda: User.objects.exclude(role='admin'), representations.USER),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Rows per second for the list endpoints' two rendering paths on a scratch database: "
+        "ModelSerializer(many=True) over model instances, and the values_list() representation "
+        "(myapp/representations.py). Both include the query and the JSON rendering."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pincodes', type=int, default=50000)
+        parser.add_argument('--sublocations', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        with scratch_database():
+            seed_location_master(states=40, locations=2000, sublocations=options['sublocations'],
+                                 pincodes=options['pincodes'])
+            seed_users(options['users'])
+
+            for name, (serializer_class, queryset, representation) in CASES.items():
+                rows = queryset().count()
+                serialized = lambda: renderer.render(serializer_class(queryset(), many=True).data)
+                compiled = lambda: renderer.render(representation.render(representation.rows(queryset())))
+                if serialized() != compiled():
+                    self.stderr.write(f'{name}: the two paths render different JSON')
+
+                results = {}
+                for path, fn in (('serializer', serialized), ('values', compiled)):
+                    results[path] = rows / (statistics.median(measure(fn, options['repeat'], warmup=1)) / 1000)
+                self.stdout.write(
+                    f"{name:24} rows={rows:7}  serializer={results['serializer']:10.0f} rows/s  "
+                    f"values={results['values']:10.0f} rows/s  x{results['values'] / results['serializer']:.1f}"
+                )
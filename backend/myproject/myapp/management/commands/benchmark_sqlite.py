@@ -0,0 +1,176 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from myapp.benchmarks import percentile
+from myapp.models import BranchState, BranchLocation, SubLocation, Pincode
+from myapp.sqlite import apply_pragmas, pragmas
+
+
+# What a connection looked like before the tuned profile: rollback journal,
+# synchronous=FULL, the sqlite3 module's 5 s lock timeout and deferred BEGIN.
+PROFILES = {
+    'default': {'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, 'timeout': 5, 'begin': 'BEGIN'},
+    'tuned': {'pragmas': None, 'timeout': 20, 'begin': 'BEGIN IMMEDIATE'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure read/write throughput of parallel workers on a scratch copy of the database, "
+        "with the default SQLite settings and with the tuned profile (myapp/sqlite.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--pincodes', type=int, default=50000, help='Rows to seed into the scratch copy')
+        parser.add_argument('--rows-per-write', type=int, default=20, help='Rows updated per write transaction')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write('This benchmark only applies to SQLite databases.')
+            return
+
+        with tempfile.TemporaryDirectory() as tmp:
+            template = Path(tmp) / 'template.sqlite3'
+            connection.ensure_connection()
+            with sqlite3.connect(template) as target:
+                connection.connection.backup(target)
+            self._seed(template, options['pincodes'])
+
+            for name, profile in PROFILES.items():
+                path = Path(tmp) / f'{name}.sqlite3'
+                with sqlite3.connect(template) as source, sqlite3.connect(path) as target:
+                    source.backup(target)
+                result = self._run(path, profile, options)
+                self.stdout.write(
+                    f"{name:8} reads/s={result['reads'] / options['seconds']:9.1f}  "
+                    f"writes/s={result['writes'] / options['seconds']:7.1f}  "
+                    f"read p95={result['read_p95']:7.2f} ms  write p95={result['write_p95']:7.2f} ms  "
+                    f"locked errors={result['locked']}"
+                )
+
+    # -- scratch data ----------------------------------------------------------
+
+    def _seed(self, path, count):
+        """Top the scratch copy up to `count` pincodes spread over a few states."""
+        db = sqlite3.connect(path, isolation_level=None)
+        pincode = Pincode._meta.db_table
+        existing = db.execute(f'SELECT COUNT(*) FROM {pincode}').fetchone()[0]
+        if existing < count:
+            db.execute('BEGIN')
+            rng = random.Random(0)
+            subs = []
+            for s in range(10):
+                state = db.execute(
+                    f'INSERT INTO {BranchState._meta.db_table} (name, status) VALUES (?, 1)', (f'Bench DB State {s}',)
+                ).lastrowid
+                for l in range(10):
+                    location = db.execute(
+                        f'INSERT INTO {BranchLocation._meta.db_table} (name, status, branch_state_id) VALUES (?, 1, ?)',
+                        (f'Bench DB Location {s}-{l}', state),
+                    ).lastrowid
+                    sub = db.execute(
+                        f'INSERT INTO {SubLocation._meta.db_table} (name, status, branch_state_id, branch_location_id) '
+                        'VALUES (?, 1, ?, ?)', (f'Bench DB Sub {s}-{l}', state, location),
+                    ).lastrowid
+                    subs.append((state, location, sub))
+            taken = {row[0] for row in db.execute(f'SELECT pincode FROM {pincode}')}
+            codes = (code for code in map(str, range(100000, 1000000)) if code not in taken)
+            rows = []
+            for _, code in zip(range(count - existing), codes):
+                state, location, sub = rng.choice(subs)
+                rows.append((code, state, location, sub, rng.random() > 0.2))
+            db.executemany(
+                f'INSERT INTO {pincode} (pincode, branch_state_id, branch_location_id, sub_location_id, status, '
+                "created_at) VALUES (?, ?, ?, ?, ?, datetime('now'))", rows,
+            )
+            db.execute('COMMIT')
+        db.close()
+
+    # -- workload -------------------------------------------------------------
+
+    def _connect(self, path, profile):
+        db = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+        values = profile['pragmas'] if profile['pragmas'] is not None else pragmas()
+        if 'busy_timeout' not in values:
+            values = {**values, 'busy_timeout': int(profile['timeout'] * 1000)}
+        apply_pragmas(db.cursor(), values)
+        return db
+
+    def _run(self, path, profile, options):
+        table = Pincode._meta.db_table
+        setup = self._connect(path, profile)
+        states = [row[0] for row in setup.execute(f'SELECT DISTINCT branch_state_id FROM {table}')]
+        max_id = setup.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0]
+        setup.close()
+
+        stop = time.monotonic() + options['seconds']
+        lock = threading.Lock()
+        totals = {'reads': 0, 'writes': 0, 'locked': 0}
+        read_samples, write_samples = [], []
+
+        def reader(seed):
+            db, rng, samples, done = self._connect(path, profile), random.Random(seed), [], 0
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    db.execute(
+                        f'SELECT id, pincode, status FROM {table} WHERE branch_state_id = ? '
+                        'ORDER BY created_at DESC LIMIT 50', (rng.choice(states),),
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    with lock:
+                        totals['locked'] += 1
+                    continue
+                samples.append((time.perf_counter() - start) * 1000)
+                done += 1
+            db.close()
+            with lock:
+                totals['reads'] += done
+                read_samples.extend(samples)
+
+        def writer(seed):
+            db, rng, samples, done = self._connect(path, profile), random.Random(seed), [], 0
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    db.execute(profile['begin'])
+                    db.executemany(
+                        f'UPDATE {table} SET status = NOT status WHERE id = ?',
+                        [(rng.randint(1, max_id),) for _ in range(options['rows_per_write'])],
+                    )
+                    db.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    if db.in_transaction:
+                        db.execute('ROLLBACK')
+                    with lock:
+                        totals['locked'] += 1
+                    continue
+                samples.append((time.perf_counter() - start) * 1000)
+                done += 1
+            db.close()
+            with lock:
+                totals['writes'] += done
+                write_samples.extend(samples)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {
+            **totals,
+            'read_p95': percentile(read_samples, 95),
+            'write_p95': percentile(write_samples, 95),
+        }
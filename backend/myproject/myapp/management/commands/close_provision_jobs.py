@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from myapp.models import ProvisionJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark bulk provisioning jobs cut short by a server restart as failed. Their rows lived only in the "
+        "old process, so they cannot be resumed; `processed` tells which lines to upload again. "
+        "Run it at startup, before the server takes requests."
+    )
+
+    def handle(self, *args, **options):
+        count = ProvisionJob.objects.filter(state__in=['pending', 'running']).update(
+            state='failed', error='Interrupted by a server restart', finished_at=timezone.now(),
+        )
+        self.stdout.write(self.style.SUCCESS(f"{count} interrupted provisioning jobs closed"))
@@ -0,0 +1,44 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from myapp.importers import PincodeImporter
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV of pincode,state,location,sub_location[,status] rows into the location master."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Create states, locations and sublocations that do not exist yet',
+        )
+        parser.add_argument('--errors', dest='errors_path', help='Write the per-row errors to this JSON file')
+
+    def handle(self, *args, **options):
+        importer = PincodeImporter(chunk_size=options['chunk_size'], create_missing=options['create_missing'])
+        try:
+            with open(options['path'], 'rb') as fh:
+                result = importer.import_file(fh)
+        except OSError as exc:
+            raise CommandError(exc)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise CommandError(f"Unreadable CSV: {exc} ({importer.created} rows imported before it)")
+
+        for error in result['errors'][:20]:
+            self.stderr.write(f"line {error['line']} ({error['pincode']}): {error['errors']}")
+        if len(result['errors']) > 20:
+            self.stderr.write(f"... and {len(result['errors']) - 20} more")
+        if options['errors_path']:
+            with open(options['errors_path'], 'w') as fh:
+                json.dump(result['errors'], fh, indent=2, default=str)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} of {result['rows']} rows imported, {result['failed']} failed"
+        ))
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from myapp.provisioning import COLUMNS, UserProvisioner
+
+
+class Command(BaseCommand):
+    help = (
+        f"Create trainers and trainees from a CSV ({','.join(COLUMNS)}) or a JSON list of objects, "
+        "hashing the passwords on a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, help='Hashing processes (default: PROVISION_WORKERS or every CPU)')
+        parser.add_argument('--errors', dest='errors_path', help='Write the per-row errors to this JSON file')
+
+    def handle(self, *args, **options):
+        provisioner = UserProvisioner(chunk_size=options['chunk_size'], workers=options['workers'])
+        try:
+            with open(options['path'], 'rb') as fh:
+                if options['path'].lower().endswith('.json'):
+                    records = json.load(fh)
+                    if not isinstance(records, list):
+                        raise CommandError('The JSON file must hold a list of users')
+                    result = provisioner.provision(records)
+                else:
+                    result = provisioner.provision_file(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        for error in result['errors'][:20]:
+            self.stderr.write(f"line {error['line']} ({error['email']}): {error['errors']}")
+        if len(result['errors']) > 20:
+            self.stderr.write(f"... and {len(result['errors']) - 20} more")
+        if options['errors_path']:
+            with open(options['errors_path'], 'w') as fh:
+                json.dump(result['errors'], fh, indent=2, default=str)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} of {result['rows']} users created, {result['failed']} failed"
+        ))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myapp import events
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete change events older than EVENTS_RETENTION_DAYS. Streams only replay recent events "
+        "on reconnect, so old ones are never read again. Run it daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Override EVENTS_RETENTION_DAYS')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else getattr(settings, 'EVENTS_RETENTION_DAYS', 7)
+        count = events.prune(timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} change events'))
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from myapp import changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete deletion records older than CHANGES_TOMBSTONE_DAYS. Clients holding a token older "
+        "than that get 410 from /api/changes/ and resync from scratch. Run it daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Override CHANGES_TOMBSTONE_DAYS')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        count = changes.prune(timedelta(days=days) if days is not None else None)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} tombstones'))
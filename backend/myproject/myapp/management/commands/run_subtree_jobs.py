@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from myapp.models import SubtreeJob
+from myapp.subtree import run_job
+
+
+class Command(BaseCommand):
+    help = "Run subtree delete / archive jobs left pending or interrupted (e.g. by a server restart)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('job_ids', nargs='*', type=int, help='Only these jobs (default: every unfinished job)')
+
+    def handle(self, *args, **options):
+        jobs = SubtreeJob.objects.filter(state__in=['pending', 'running']).order_by('id')
+        if options['job_ids']:
+            jobs = jobs.filter(pk__in=options['job_ids'])
+
+        for job_id in jobs.values_list('id', flat=True):
+            job = run_job(job_id)
+            line = f"job {job.pk}: {job.mode} {job.kind} {job.root_id} -> {job.state} ({job.processed}/{job.total})"
+            self.stdout.write(self.style.SUCCESS(line) if job.state == 'done' else self.style.ERROR(line))
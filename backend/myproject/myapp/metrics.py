@@ -0,0 +1,226 @@
+"""
+Per-request timings and per-endpoint histograms, filled in by
+PerformanceMiddleware (middleware.py) and exposed on /api/metrics/ in the
+Prometheus text format.
+
+Histograms are cumulative per process, as Prometheus expects; windows and
+rates are taken at query time (e.g. `rate(..._bucket[5m])`). With several
+server processes each one is scraped (or summed) separately.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Upper bounds in seconds; +Inf is implied
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOWEST_QUERIES = 3
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Where one request spent its time, in milliseconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.render_ms = 0.0
+        self.slowest = []  # [(ms, sql)], longest first
+        self._active = set()
+
+    def record_query(self, sql, ms):
+        self.queries += 1
+        self.db_ms += ms
+        if len(self.slowest) < SLOWEST_QUERIES or ms > self.slowest[-1][0]:
+            self.slowest = sorted(self.slowest + [(ms, sql)], key=lambda item: -item[0])[:SLOWEST_QUERIES]
+
+    @contextmanager
+    def measure(self, bucket):
+        """Add the block's duration to `<bucket>_ms`, ignoring nested measures of the same bucket."""
+        if bucket in self._active:
+            yield
+            return
+        self._active.add(bucket)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active.discard(bucket)
+            setattr(self, f'{bucket}_ms', getattr(self, f'{bucket}_ms') + (time.perf_counter() - start) * 1000)
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms):
+        view_ms = max(total_ms - self.db_ms - self.serialize_ms - self.render_ms, 0.0)
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize_ms:.1f}',
+            f'render;dur={self.render_ms:.1f}',
+            f'view;dur={view_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def query_timer(execute, sql, params, many, context):
+    """Execute wrapper feeding the current request's timings (see instrument_connection)."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.record_query(sql, (time.perf_counter() - start) * 1000)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+    `connection_created` receiver: every connection, on whichever thread opens it,
+    times its queries. The async ORM and sync views under ASGI query from
+    sync_to_async threads, so the wrapper cannot be installed per request on the
+    thread that handles the request. Outside a measured request it costs one
+    ContextVar lookup per query.
+    """
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_timer)
+
+
+#-------------------------------------------------------------------------------#
+# Serializer / renderer timing
+
+
+def _timed_property(prop, bucket):
+    getter = prop.fget
+
+    @functools.wraps(getter)
+    def timed(self):
+        timings = _current.get()
+        if timings is None:
+            return getter(self)
+        with timings.measure(bucket):
+            return getter(self)
+
+    timed.__timed__ = True
+    return property(timed)
+
+
+def instrument_drf():
+    """
+    Time `serializer.data` and `Response.rendered_content`, the two places DRF
+    turns models into JSON. Outside a measured request the wrappers cost one
+    ContextVar lookup.
+    """
+    from rest_framework import response, serializers
+
+    for owner, name, bucket in (
+        (serializers.Serializer, 'data', 'serialize'),
+        (serializers.ListSerializer, 'data', 'serialize'),
+        (response.Response, 'rendered_content', 'render'),
+    ):
+        prop = owner.__dict__[name]
+        if not getattr(prop.fget, '__timed__', False):
+            setattr(owner, name, _timed_property(prop, bucket))
+
+
+#-------------------------------------------------------------------------------#
+# Per-endpoint histograms
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}  # (endpoint, method, status) -> count
+        self._latency = {}   # (endpoint, method) -> Histogram
+        self._db = {}        # (endpoint, method) -> Histogram
+        self._queries = {}   # (endpoint, method) -> count
+
+    def observe(self, endpoint, method, status, timings, total_ms):
+        key = (endpoint, method)
+        with self._lock:
+            self._requests[(endpoint, method, str(status))] = self._requests.get((endpoint, method, str(status)), 0) + 1
+            self._latency.setdefault(key, Histogram()).observe(total_ms / 1000)
+            self._db.setdefault(key, Histogram()).observe(timings.db_ms / 1000)
+            self._queries[key] = self._queries.get(key, 0) + timings.queries
+
+    def reset(self):
+        with self._lock:
+            self.__init__()
+
+    def render(self):
+        """The Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            lines = [
+                '# HELP api_requests_total Requests handled, by endpoint, method and status.',
+                '# TYPE api_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'api_requests_total{_labels(endpoint, method, status=status)} {count}')
+            lines += _histogram_lines('api_request_duration_seconds', 'Time to produce the response.', self._latency)
+            lines += _histogram_lines('api_request_db_seconds', 'Time spent in SQL per request.', self._db)
+            lines += [
+                '# HELP api_request_queries_total SQL queries run, by endpoint and method.',
+                '# TYPE api_request_queries_total counter',
+            ]
+            for (endpoint, method), count in sorted(self._queries.items()):
+                lines.append(f'api_request_queries_total{_labels(endpoint, method)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(endpoint, method, **extra):
+    labels = {'endpoint': endpoint, 'method': method, **extra}
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram_lines(name, help_text, histograms):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for (endpoint, method), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(endpoint, method, le=repr(bound))} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(endpoint, method, le="+Inf")} {histogram.count}')
+        lines.append(f'{name}_sum{_labels(endpoint, method)} {histogram.sum:.6f}')
+        lines.append(f'{name}_count{_labels(endpoint, method)} {histogram.count}')
+    return lines
+
+
+registry = Registry()
@@ -0,0 +1,104 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import metrics, profiling
+
+
+logger = logging.getLogger('myapp.performance')
+
+
+class PerformanceMiddleware:
+    """
+    Times every request: query count and SQL time, serializer and renderer time
+    (see metrics.instrument_drf) and the rest of the view. The breakdown goes out
+    as a `Server-Timing` header, feeds the per-endpoint histograms on /api/metrics/,
+    and requests slower than PERFORMANCE_SLOW_REQUEST_MS are logged with their
+    slowest SQL.
+
+    Sync and async: under ASGI, requests stay on the event loop. Queries are
+    timed by a wrapper on every connection (metrics.instrument_connection), so
+    the ones the async ORM runs on other threads are counted too.
+
+    For streaming responses (exports) the numbers cover the time to the first
+    byte; the body is produced after the headers have gone out.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with metrics.collect() as timings:
+            response = self.get_response(request)
+            # Plain responses are rendered by now; make sure of it so render time is counted
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                response.render()
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        # The async handler renders responses before they get here
+        with metrics.collect() as timings:
+            response = await self.get_response(request)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        total_ms = timings.total_ms()
+        response['Server-Timing'] = timings.server_timing(total_ms)
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match else '<unmatched>'
+        metrics.registry.observe(endpoint, request.method, response.status_code, timings, total_ms)
+
+        threshold = getattr(settings, 'PERFORMANCE_SLOW_REQUEST_MS', 500)
+        if threshold is not None and total_ms >= threshold:
+            logger.warning(
+                'Slow request %s %s -> %s in %.1f ms (%d queries, db %.1f ms, serialize %.1f ms, render %.1f ms)%s',
+                request.method, request.get_full_path(), response.status_code, total_ms, timings.queries,
+                timings.db_ms, timings.serialize_ms, timings.render_ms,
+                ''.join(f'\n  {ms:8.1f} ms  {sql}' for ms, sql in timings.slowest),
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Runs requests that ask for it (`?profile=1` / `X-Profile: 1`, admins only)
+    under a profiler and points to the stored report with `X-Profile-Id`.
+    See profiling.py. Sync and async; requests that don't ask stay on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = profiling.requested_mode(request)
+        if mode is None or not profiling.is_admin(request):
+            return self.get_response(request)
+        return self._mark(*profiling.profile_request(self.get_response, request, mode))
+
+    async def __acall__(self, request):
+        mode = profiling.requested_mode(request)
+        # is_admin() may load the user: only requests asking to be profiled pay for the thread hop
+        if mode is None or not await sync_to_async(profiling.is_admin)(request):
+            return await self.get_response(request)
+        return self._mark(*await profiling.aprofile_request(self.get_response, request, mode))
+
+    def _mark(self, response, profile_id):
+        if profile_id is None:
+            response['X-Profile'] = 'busy'
+        else:
+            response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pincode',
+            index=models.Index(fields=['created_at', 'id'], name='pincode_created_id_idx'),
+        ),
+    ]
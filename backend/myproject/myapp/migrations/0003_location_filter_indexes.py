@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_pincode_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pincode',
+            name='branch_location',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pincodes', to='myapp.branchlocation'),
+        ),
+        migrations.AlterField(
+            model_name='pincode',
+            name='branch_state',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pincodes', to='myapp.branchstate'),
+        ),
+        migrations.AddIndex(
+            model_name='bank',
+            index=models.Index(condition=models.Q(('status', True)), fields=['id'], name='bank_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='branchinnerlocation',
+            index=models.Index(condition=models.Q(('status', True)), fields=['branch_inner_state'], name='innerloc_active_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='branchinnerlocation',
+            index=models.Index(condition=models.Q(('status', True)), fields=['branch_location'], name='innerloc_active_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pincode',
+            index=models.Index(fields=['branch_state', 'created_at'], name='pincode_state_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pincode',
+            index=models.Index(fields=['branch_location', 'created_at'], name='pincode_location_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pincode',
+            index=models.Index(condition=models.Q(('status', True)), fields=['branch_state', 'created_at'], name='pincode_active_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sublocation',
+            index=models.Index(condition=models.Q(('status', True)), fields=['branch_state'], name='subloc_active_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sublocation',
+            index=models.Index(condition=models.Q(('status', True)), fields=['branch_location'], name='subloc_active_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='typeofaccount',
+            index=models.Index(condition=models.Q(('status', True)), fields=['id'], name='typeofaccount_active_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:55
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_versions(apps, schema_editor):
+    # Start every versioned table at v1 so validators carry a Last-Modified from day one
+    TableVersion = apps.get_model('myapp', 'TableVersion')
+    now = timezone.now()
+    for label in ('myapp.department', 'myapp.branchstate', 'myapp.branchinnerstate', 'myapp.bank', 'myapp.typeofaccount'):
+        TableVersion.objects.get_or_create(label=label, defaults={'version': 1, 'modified_at': now})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_location_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('label', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('modified_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(seed_versions, migrations.RunPython.noop),
+    ]
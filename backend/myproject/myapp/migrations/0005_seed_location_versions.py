@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:57
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def seed_versions(apps, schema_editor):
+    # Location tables joined the versioned set for the pincode index
+    TableVersion = apps.get_model('myapp', 'TableVersion')
+    now = timezone.now()
+    for label in ('myapp.branchlocation', 'myapp.sublocation', 'myapp.pincode'):
+        TableVersion.objects.get_or_create(label=label, defaults={'version': 1, 'modified_at': now})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_tableversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_versions, migrations.RunPython.noop),
+    ]
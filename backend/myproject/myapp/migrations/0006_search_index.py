@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+SEARCH_TABLE = 'myapp_search'
+ROWID_STRIDE = 8
+
+# (model, name field, kind code) -- mirrors search.SEARCH_MODELS
+SOURCES = (
+    ('SubLocation', 'name', 1),
+    ('BranchLocation', 'name', 2),
+    ('BranchInnerLocation', 'name', 3),
+    ('Bank', 'bank_name', 4),
+    ('Designation', 'name', 5),
+)
+
+
+def create_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use the ORM fallback in search.py
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(name, status UNINDEXED, tokenize='trigram')"
+    )
+    for model_name, field, code in SOURCES:
+        table = apps.get_model('myapp', model_name)._meta.db_table
+        schema_editor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, status) '
+            f'SELECT id * {ROWID_STRIDE} + {code}, "{field}", status FROM "{table}"'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_seed_location_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
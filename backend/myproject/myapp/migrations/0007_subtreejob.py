@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubtreeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('branch-state', 'Branch State'), ('branch-location', 'Branch Location'), ('sub-location', 'Sub Location')], max_length=20)),
+                ('root_id', models.PositiveIntegerField()),
+                ('mode', models.CharField(choices=[('delete', 'Delete'), ('archive', 'Archive')], default='delete', max_length=10)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('step', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('myapp', '0009_changeevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', True), models.Q(('role', 'admin'), _negated=True)), fields=['id'], name='user_active_directory_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_active', False), models.Q(('role', 'admin'), _negated=True)), fields=['id'], name='user_inactive_directory_idx'),
+        ),
+    ]
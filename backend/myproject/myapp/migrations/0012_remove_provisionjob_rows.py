@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0011_provisionjob'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='provisionjob',
+            name='rows',
+        ),
+    ]
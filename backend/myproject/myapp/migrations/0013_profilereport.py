@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_remove_provisionjob_rows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileReport',
+            fields=[
+                ('id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('mode', models.CharField(max_length=10)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.TextField()),
+                ('status', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('summary', models.TextField()),
+                ('pstats', models.BinaryField(null=True)),
+                ('collapsed', models.TextField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
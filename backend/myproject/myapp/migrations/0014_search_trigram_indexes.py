@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+# (table, name column) -- mirrors search.SEARCH_MODELS
+SOURCES = (
+    ('myapp_sublocation', 'name'),
+    ('myapp_branchlocation', 'name'),
+    ('myapp_branchinnerlocation', 'name'),
+    ('myapp_bank', 'bank_name'),
+    ('myapp_designation', 'name'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    # pg_trgm backs search._pg_candidates; SQLite has the FTS5 table from 0006 instead
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in SOURCES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{table}_{column}_trgm" ON "{table}" USING gin ("{column}" gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in SOURCES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_{column}_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0013_profilereport'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0014_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='tokens_valid_after',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,118 @@
+import hashlib
+
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import changes, subtree, versioning
+from .signals import bulk_changed
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators for viewsets over slowly changing tables.
+
+    The validators come from the table's change version (see versioning.py), so
+    answering `If-None-Match` / `If-Modified-Since` with a 304 costs one primary-key
+    lookup; the list query and the serializer never run.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
+
+    def get_validators(self, request):
+        version, modified_at = versioning.current(self.get_queryset().model)
+        # The same table version renders differently per URL and per Accept header
+        variant = f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+        digest = hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+        stamp = int(modified_at.timestamp()) if modified_at else 0
+        return f'"{version}.{stamp}-{digest}"', (stamp or None)
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept'])
+        patch_cache_control(response, no_cache=True)  # cache, but revalidate every time
+        return response
+
+
+class RepresentationListMixin:
+    """
+    Serve `list` from `list_representation` (see representations.py): rows come
+    from `values_list()` with the related names joined in, and no model instances
+    or serializers are built. The JSON is the same as the serializer's; retrieve
+    and the write routes keep using `serializer_class`.
+    """
+    list_representation = None
+
+    def list(self, request, *args, **kwargs):
+        representation = self.list_representation
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(representation.values(queryset))
+        if page is not None:
+            return self.get_paginated_response(representation.render(page))
+        return Response(representation.render(representation.rows(queryset)))
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=['activate', 'deactivate', 'delete'])
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_ids(self, value):
+        limit = self.context['max_size']
+        if len(value) > limit:
+            raise serializers.ValidationError(f'At most {limit} ids per batch')
+        return list(dict.fromkeys(value))
+
+
+class BatchActionMixin:
+    """
+    `POST <list url>/batch/` with `{"action": "activate" | "deactivate" | "delete", "ids": [...]}`.
+
+    The change is one set-based UPDATE (or a set-based delete per table, see
+    subtree.delete_rows) over `get_batch_queryset()`, inside a single transaction. Ids outside that scope are returned as `missing`.
+    """
+    batch_max_size = 1000
+
+    def get_batch_queryset(self):
+        """Rows a batch may change; by default what the detail routes see."""
+        return self.get_queryset()
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request, *args, **kwargs):
+        serializer = BatchRequestSerializer(data=request.data, context={'max_size': self.batch_max_size})
+        serializer.is_valid(raise_exception=True)
+        operation, ids = serializer.validated_data['action'], serializer.validated_data['ids']
+
+        queryset = self.get_batch_queryset()
+        manager = queryset.model._default_manager
+        with transaction.atomic():
+            found = dict(queryset.filter(pk__in=ids).values_list('pk', 'status'))
+            if operation == 'delete':
+                # Set-based, cascades included; one bulk_changed per table instead of per-row signals
+                count = subtree.delete_rows(queryset.model, list(found))
+            else:
+                active = operation == 'activate'
+                changed = [pk for pk, current in found.items() if current != active]
+                count = manager.filter(pk__in=changed).update(**changes.touched(queryset.model, status=active)) if changed else 0
+                if changed:
+                    bulk_changed.send(sender=queryset.model, pks=changed, operation='update', fields=['status'])
+
+        return Response(
+            {'action': operation, 'count': count, 'missing': [pk for pk in ids if pk not in found]},
+            status=status.HTTP_200_OK,
+        )
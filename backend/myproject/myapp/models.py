@@ -40,25 +40,55 @@ class User(AbstractUser):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='trainee')
     contact_info = models.BigIntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Tokens issued before this (to the second) are revoked; see authentication.revoke_tokens
+    tokens_valid_after = models.DateTimeField(null=True, blank=True, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []  # no extra required fields
 
     objects = CustomUserManager()  # attach custom manager
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Employee directory (employees.py): non-admin users split by is_active, in id order.
+            # The predicates match the list queries exactly, so each page is an index range scan.
+            models.Index(
+                fields=['id'], condition=models.Q(is_active=True) & ~models.Q(role='admin'),
+                name='user_active_directory_idx',
+            ),
+            models.Index(
+                fields=['id'], condition=models.Q(is_active=False) & ~models.Q(role='admin'),
+                name='user_inactive_directory_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.email
 
 
 
 
+class LoadedValuesMixin:
+    """
+    Remembers the column values an instance was loaded with, so a later save
+    can report which fields it changed (see events.py) without re-reading the row.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
 #----------------# Other models can be defined here as needed----------------------#
 
 # Department table
 
-class Department(models.Model):
+class Department(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     status = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
 
     def __str__(self):
         return self.name
@@ -69,10 +99,11 @@ class Department(models.Model):
 # Designation table
 
 
-class Designation(models.Model):
+class Designation(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='designations')
     status = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
 
     def __str__(self):
         return self.name
@@ -82,18 +113,20 @@ class Designation(models.Model):
 
 
 # Update BranchState model in models.py
-class BranchState(models.Model):
+class BranchState(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     status = models.BooleanField(default=True)  # Add this field
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
     
     def __str__(self):
         return self.name
 
 
-class BranchLocation(models.Model):
+class BranchLocation(LoadedValuesMixin, models.Model):
     branch_state = models.ForeignKey(BranchState, on_delete=models.CASCADE, related_name='branch_locations')
     name = models.CharField(max_length=100)
     status = models.BooleanField(default=True)  # Add this field
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
     
     def __str__(self):
         return f"{self.name} ({self.branch_state.name})"
@@ -107,33 +140,54 @@ class BranchLocation(models.Model):
 
 # SubLocation table
 
-class SubLocation(models.Model):
+class SubLocation(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=100)
     branch_state = models.ForeignKey(BranchState, on_delete=models.CASCADE, related_name='sublocations')
     branch_location = models.ForeignKey(BranchLocation, on_delete=models.CASCADE, related_name='sublocations')
     status = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
 
     def __str__(self):
         return self.name
 
     class Meta:
         unique_together = ['name', 'branch_location']  # Unique name per location
+        indexes = [
+            # Active-only lists (SubLocationViewSet ?status=true, SubLocationByLocationView).
+            # Django renders status=True as a bare `WHERE status`, which can only use
+            # an index whose predicate matches, not a (fk, status) composite.
+            models.Index(fields=['branch_state'], condition=models.Q(status=True), name='subloc_active_state_idx'),
+            models.Index(fields=['branch_location'], condition=models.Q(status=True), name='subloc_active_location_idx'),
+        ]
 
 
 # Pincode table
-class Pincode(models.Model):
+class Pincode(LoadedValuesMixin, models.Model):
     pincode = models.CharField(max_length=6, unique=True)
-    branch_state = models.ForeignKey(BranchState, on_delete=models.CASCADE, related_name='pincodes')
-    branch_location = models.ForeignKey(BranchLocation, on_delete=models.CASCADE, related_name='pincodes')
+    # No single-column indexes: the (fk, created_at) composites in Meta cover them
+    branch_state = models.ForeignKey(BranchState, on_delete=models.CASCADE, related_name='pincodes', db_index=False)
+    branch_location = models.ForeignKey(BranchLocation, on_delete=models.CASCADE, related_name='pincodes', db_index=False)
     sub_location = models.ForeignKey(SubLocation, on_delete=models.CASCADE, related_name='pincodes')
     status = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
 
     def __str__(self):
         return f"{self.pincode} - {self.sub_location.name} / {self.branch_location.name} / {self.branch_state.name}"
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Seek key for keyset pagination of /api/pincodes/
+            models.Index(fields=['created_at', 'id'], name='pincode_created_id_idx'),
+            # PincodeViewSet filters, already in Meta.ordering order (no sort step)
+            models.Index(fields=['branch_state', 'created_at'], name='pincode_state_created_idx'),
+            models.Index(fields=['branch_location', 'created_at'], name='pincode_location_created_idx'),
+            models.Index(
+                fields=['branch_state', 'created_at'], condition=models.Q(status=True),
+                name='pincode_active_state_idx',
+            ),
+        ]
 
 
 
@@ -143,6 +197,7 @@ class Pincode(models.Model):
 class BranchInnerState(models.Model):
     name = models.CharField(max_length=100, unique=True)
     status = models.BooleanField(default=True)  # Add this field
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
     
     def __str__(self):
         return self.name
@@ -154,31 +209,172 @@ class BranchInnerLocation(models.Model):
     branch_inner_state = models.ForeignKey(BranchInnerState, on_delete=models.CASCADE, related_name='inner_locations')
     branch_location = models.ForeignKey(BranchLocation, on_delete=models.CASCADE, related_name='inner_locations', null=True, blank=True) # optional
     status = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
 
     def __str__(self):
         return f"{self.name} ({self.branch_inner_state.name})"
 
     class Meta:
         unique_together = ['name', 'branch_inner_state']
+        indexes = [
+            # Active-only BranchInnerLocationViewSet filters
+            models.Index(
+                fields=['branch_inner_state'], condition=models.Q(status=True), name='innerloc_active_state_idx'
+            ),
+            models.Index(
+                fields=['branch_location'], condition=models.Q(status=True), name='innerloc_active_location_idx'
+            ),
+        ]
 
 
 
 
 
 
-class Bank(models.Model):
+class Bank(LoadedValuesMixin, models.Model):
     bank_name = models.CharField(max_length=100, unique=True)
     status = models.BooleanField(default=True)  # Add this field
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
     
     def __str__(self):
         return self.bank_name
 
+    class Meta:
+        indexes = [
+            # BankViewSet only ever lists active banks
+            models.Index(fields=['id'], condition=models.Q(status=True), name='bank_active_idx'),
+        ]
+
 
 
 
-class TypeOfAccount(models.Model):
+class TypeOfAccount(LoadedValuesMixin, models.Model):
     account_type = models.CharField(max_length=100, unique=True)
     status = models.BooleanField(default=True)  # Add this field
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # delta sync, see changes.py
     
     def __str__(self):
-        return self.account_type
\ No newline at end of file
+        return self.account_type
+
+    class Meta:
+        indexes = [
+            # TypeOfAccountViewSet only ever lists active account types
+            models.Index(fields=['id'], condition=models.Q(status=True), name='typeofaccount_active_idx'),
+        ]
+
+
+#-------------------------------------------------------------------------------#
+
+# Change version per table, bumped on every write (see versioning.py)
+
+class TableVersion(models.Model):
+    label = models.CharField(max_length=100, primary_key=True)  # model label, e.g. 'myapp.bank'
+    version = models.PositiveBigIntegerField(default=0)
+    modified_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+#-------------------------------------------------------------------------------#
+
+# Background removal of a location subtree (see subtree.py)
+
+class SubtreeJob(models.Model):
+    KIND_CHOICES = [
+        ('branch-state', 'Branch State'),
+        ('branch-location', 'Branch Location'),
+        ('sub-location', 'Sub Location'),
+    ]
+    MODE_CHOICES = [
+        ('delete', 'Delete'),
+        ('archive', 'Archive'),  # status=False on every row, nothing removed
+    ]
+    STATE_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    root_id = models.PositiveIntegerField()
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='delete')
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    step = models.CharField(max_length=100, blank=True)  # model being processed
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.mode} {self.kind} {self.root_id} ({self.state})"
+
+
+# Background bulk user provisioning (see provisioning.py)
+class ProvisionJob(models.Model):
+    STATE_CHOICES = SubtreeJob.STATE_CHOICES
+
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='pending')
+    # The rows themselves (with their passwords) are never stored: only the worker holds them
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # [{line, email, errors}] for rows that were skipped
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"provision {self.total} users ({self.state})"
+
+
+# On-demand request profiles (see profiling.py). Kept in the database, not the
+# per-process cache, so any worker can serve /api/profiles/<id>/.
+class ProfileReport(models.Model):
+    id = models.CharField(max_length=32, primary_key=True)
+    mode = models.CharField(max_length=10)
+    method = models.CharField(max_length=10)
+    path = models.TextField()
+    status = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    summary = models.TextField()
+    pstats = models.BinaryField(null=True)  # cprofile mode
+    collapsed = models.TextField(null=True)  # sample mode
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.mode} {self.method} {self.path}"
+
+
+#-------------------------------------------------------------------------------#
+
+# Deleted master rows, so delta-sync clients can drop them (see changes.py)
+
+class Tombstone(models.Model):
+    model = models.CharField(max_length=50)  # app_label.model_name
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+
+# Master-data change feed for the /api/events/ stream (see events.py). Written in
+# the same transaction as the change; every server process polls it for new ids.
+class ChangeEvent(models.Model):
+    OPERATION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    model = models.CharField(max_length=50)  # app_label.model_name
+    object_id = models.BigIntegerField()
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    fields = models.JSONField(null=True, blank=True)  # changed field names; null when unknown
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.operation} {self.model} #{self.object_id}"
@@ -0,0 +1,38 @@
+"""
+Keep the denormalised parent ids of the location tree in step with moves.
+
+SubLocation stores its state next to its location, and Pincode stores both
+next to its sub-location. When a location moves to another state, or a
+sub-location to another location, the rows below are rewritten with one
+set-based UPDATE per table, touching only rows whose copies disagree. When
+nothing moved, each call costs a single SELECT.
+"""
+from . import changes
+from .models import SubLocation, Pincode
+from .signals import bulk_changed
+
+
+def _realign(model, queryset, **values):
+    pks = list(queryset.exclude(**values).values_list('pk', flat=True))
+    if pks:
+        model.objects.filter(pk__in=pks).update(**changes.touched(model, **values))
+        bulk_changed.send(sender=model, pks=pks, operation='update',
+                          fields=sorted(name.removesuffix('_id') for name in values))
+    return len(pks)
+
+
+def location_moved(location):
+    """Give the sub-locations and pincodes under `location` its current state."""
+    state_id = location.branch_state_id
+    return (
+        _realign(SubLocation, SubLocation.objects.filter(branch_location_id=location.pk), branch_state_id=state_id)
+        + _realign(Pincode, Pincode.objects.filter(branch_location_id=location.pk), branch_state_id=state_id)
+    )
+
+
+def sublocation_moved(sub_location):
+    """Give the pincodes under `sub_location` its current location and state."""
+    return _realign(
+        Pincode, Pincode.objects.filter(sub_location_id=sub_location.pk),
+        branch_state_id=sub_location.branch_state_id, branch_location_id=sub_location.branch_location_id,
+    )
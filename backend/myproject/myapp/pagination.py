@@ -0,0 +1,170 @@
+import base64
+import datetime
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (seek) pagination.
+
+    Clients that send neither `cursor` nor `page_size` get the plain, unpaginated
+    list as before. Otherwise every page is fetched with a
+    `WHERE (key) > (last key) ORDER BY key LIMIT n` query, so the cost of a page
+    does not depend on how deep it is. Views choose the key with `keyset_ordering`;
+    the last field must be unique (normally `id`) to break ties.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+        self.fields = {
+            name: queryset.model._meta.get_field(name)
+            for name in (field.lstrip('-') for field in self.ordering)
+        }
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self._reverse(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek(ordering, position))
+
+        # One extra row tells us whether there is another page in this direction
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.first_position = self._position(rows[0]) if rows else position
+        self.last_position = self._position(rows[-1]) if rows else position
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.encode_cursor(self.first_position, reverse=True)
+
+    # -- cursor encoding ------------------------------------------------------
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.fields.values(), payload['p'], strict=True)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get('r'))
+
+    def _position(self, row):
+        values = []
+        for name, field in self.fields.items():
+            value = row[name] if isinstance(row, dict) else getattr(row, field.attname)
+            if isinstance(value, (datetime.date, datetime.time)):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    # -- seek predicate -------------------------------------------------------
+
+    @staticmethod
+    def _reverse(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    @staticmethod
+    def _seek(ordering, position):
+        """Row-value comparison `(a, b, ...) > (x, y, ...)` spelled out with AND/OR."""
+        condition = Q()
+        equal_prefix = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+
+
+class PageLimitPagination(BasePagination):
+    """
+    `?page=&limit=` pages, answered as `{"data": [...], "total": n, "page": p, "limit": l}`:
+    the shape the admin dashboard's employee lists read.
+
+    Every request is paginated (the first page by default). The total is a
+    COUNT over the same filtered queryset, so list views using this should
+    have an index whose predicate matches their filter.
+    """
+    page_query_param = 'page'
+    limit_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE or 50
+    max_limit = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page = self._positive_int(request, self.page_query_param, 1)
+        self.limit = min(self._positive_int(request, self.limit_query_param, self.page_size), self.max_limit)
+        self.total = queryset.count()
+        offset = (self.page - 1) * self.limit
+        return list(queryset[offset:offset + self.limit]) if offset < self.total else []
+
+    def get_paginated_response(self, data):
+        return Response({'data': data, 'total': self.total, 'page': self.page, 'limit': self.limit})
+
+    @staticmethod
+    def _positive_int(request, name, default):
+        try:
+            return max(int(request.query_params[name]), 1)
+        except (KeyError, ValueError):
+            return default
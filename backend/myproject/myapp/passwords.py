@@ -0,0 +1,11 @@
+"""
+Password hashing for worker processes (see provisioning.py).
+
+Nothing here imports settings or models: the parent process picks the hasher
+and sends it along, so a spawned worker needs no django.setup() and hashes
+exactly as make_password() would in the parent.
+"""
+
+
+def hash_passwords(hasher, passwords):
+    return [hasher.encode(password, hasher.salt()) for password in passwords]
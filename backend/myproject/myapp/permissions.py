@@ -5,7 +5,7 @@ class IsTrainer(BasePermission):
     Allows access only to users with role 'trainer'
     """
     def has_permission(self, request, view):
-        return request.user and request.user.role == "trainer"
+        return getattr(request.user, "role", None) == "trainer"
 
 
 class IsTrainee(BasePermission):
@@ -13,4 +13,4 @@ class IsTrainee(BasePermission):
     Allows access only to users with role 'trainee'
     """
     def has_permission(self, request, view):
-        return request.user and request.user.role == "trainee"
+        return getattr(request.user, "role", None) == "trainee"
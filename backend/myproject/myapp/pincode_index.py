@@ -0,0 +1,180 @@
+import bisect
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from .models import BranchState, BranchLocation, SubLocation, Pincode
+from .versioning import VersionWatch
+
+
+INDEXED_MODELS = (BranchState, BranchLocation, SubLocation, Pincode)
+# How often a process checks whether another process changed the indexed tables
+RECHECK_SECONDS = getattr(settings, 'PINCODE_INDEX_RECHECK_SECONDS', 2.0)
+
+logger = logging.getLogger(__name__)
+
+
+class PincodeIndex:
+    """
+    In-process index of every pincode and its hierarchy.
+
+    Codes live in a sorted list (binary search for lookups and prefix scans) next to
+    a dict of compact tuples; names are kept once per state / location / sublocation,
+    so renaming a parent is a single dict update. The index is built in four
+    queries when a server starts (`warm_up`, from wsgi.py / asgi.py), or else on
+    first use, and then maintained incrementally from the model signals.
+    Writes made by other processes are noticed through the table versions
+    (versioning.py), checked at most every RECHECK_SECONDS, and trigger a rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._watch = VersionWatch(INDEXED_MODELS)
+
+    # -- building -------------------------------------------------------------
+
+    def _build(self):
+        self._watch.changed()  # the versions this build reflects
+        states = dict(BranchState.objects.values_list('id', 'name'))
+        locations = {pk: (name, state) for pk, name, state in
+                     BranchLocation.objects.values_list('id', 'name', 'branch_state_id')}
+        sublocations = {pk: (name, location) for pk, name, location in
+                        SubLocation.objects.values_list('id', 'name', 'branch_location_id')}
+        by_code, code_of = {}, {}
+        for pk, code, sub, location, state, active in Pincode.objects.values_list(
+                'id', 'pincode', 'sub_location_id', 'branch_location_id', 'branch_state_id', 'status'):
+            by_code[code] = (pk, sub, location, state, active)
+            code_of[pk] = code
+
+        self._states, self._locations, self._sublocations = states, locations, sublocations
+        self._by_code, self._code_of = by_code, code_of
+        self._codes = sorted(by_code)
+        self._checked_at = time.monotonic()
+        self._built = True
+
+    def _ensure_fresh(self):
+        if self._built and time.monotonic() - self._checked_at < RECHECK_SECONDS:
+            return
+        with self._lock:
+            if not self._built:
+                self._build()
+                return
+            if time.monotonic() - self._checked_at < RECHECK_SECONDS:
+                return
+            if self._watch.changed():
+                self._build()  # someone else wrote to the tables
+            else:
+                self._checked_at = time.monotonic()
+
+    def build(self):
+        """Build now unless already built."""
+        with self._lock:
+            if not self._built:
+                self._build()
+
+    def invalidate(self):
+        with self._lock:
+            self._built = False
+
+    # -- reads ----------------------------------------------------------------
+
+    def _record(self, code, entry):
+        pk, sub, location, state, active = entry
+        return {
+            'id': pk,
+            'pincode': code,
+            'sub_location': sub,
+            'sub_location_name': self._sublocations.get(sub, (None,))[0],
+            'branch_location': location,
+            'location_name': self._locations.get(location, (None,))[0],
+            'branch_state': state,
+            'branch_state_name': self._states.get(state),
+            'status': active,
+        }
+
+    def lookup(self, code):
+        self._ensure_fresh()
+        entry = self._by_code.get(code)
+        return self._record(code, entry) if entry else None
+
+    def complete(self, prefix, limit=10, include_inactive=False):
+        """Pincodes starting with `prefix`, in code order."""
+        self._ensure_fresh()
+        results = []
+        # upsert/remove shift the list in place: scan it under the lock
+        with self._lock:
+            codes = self._codes
+            for i in range(bisect.bisect_left(codes, prefix), len(codes)):
+                code = codes[i]
+                if not code.startswith(prefix) or len(results) >= limit:
+                    break
+                entry = self._by_code.get(code)
+                if entry and (include_inactive or entry[4]):
+                    results.append(self._record(code, entry))
+        return results
+
+    # -- incremental maintenance (called after commit) --------------------------
+
+    def record_write(self, model, version):
+        """Note the table version a committed local write produced, so the next check doesn't rebuild for it."""
+        self._watch.written(model, version)
+
+    def upsert_pincodes(self, rows):
+        """rows: (id, pincode, sub_location_id, branch_location_id, branch_state_id, status)"""
+        if not self._built:
+            return
+        with self._lock:
+            for pk, code, sub, location, state, active in rows:
+                self._discard(pk)
+                self._by_code[code] = (pk, sub, location, state, active)
+                self._code_of[pk] = code
+                bisect.insort(self._codes, code)
+
+    def remove_pincodes(self, pks):
+        if not self._built:
+            return
+        with self._lock:
+            for pk in pks:
+                self._discard(pk)
+
+    def _discard(self, pk):
+        code = self._code_of.pop(pk, None)
+        if code is not None:
+            del self._by_code[code]
+            i = bisect.bisect_left(self._codes, code)
+            if i < len(self._codes) and self._codes[i] == code:
+                del self._codes[i]
+
+    def set_name(self, model, pk, name, parent=None):
+        if not self._built:
+            return
+        with self._lock:
+            if model is BranchState:
+                self._states[pk] = name
+            elif model is BranchLocation:
+                self._locations[pk] = (name, parent)
+            elif model is SubLocation:
+                self._sublocations[pk] = (name, parent)
+
+
+index = PincodeIndex()
+
+
+def warm_up():
+    """
+    Build the index while a server starts, so no request pays for it. Only the
+    server entry points (wsgi.py / asgi.py) call this, so management commands
+    never build it. If the database isn't ready (e.g. not migrated yet) the
+    index is left to build on first use.
+    """
+    try:
+        index.build()
+    except DatabaseError:
+        logger.warning('Pincode index not built at startup; it will be built on first use', exc_info=True)
+    finally:
+        if not connection.in_atomic_block:
+            connection.close()  # request threads and forked workers open their own
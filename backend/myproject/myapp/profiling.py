@@ -0,0 +1,247 @@
+"""
+On-demand profiling of single API requests for admins.
+
+Add `?profile=1` (or the `X-Profile: 1` header) to any request made with an
+admin token. The request then runs under cProfile, or under the built-in
+stack sampler with `profile=sample`. The report is kept in the database (the
+ProfileReport table, so any server process can serve it) for PROFILE_TTL
+seconds. The response carries its id in `X-Profile-Id`, and
+GET /api/profiles/<id>/ returns it:
+- JSON with a text summary by default
+- `?download=pstats` for the raw cProfile data (snakeviz, `python -m pstats`)
+- `?download=collapsed` for sampled stacks (flamegraph.pl, speedscope)
+
+Requests without the trigger pay one query-string lookup. No more than
+PROFILE_MAX_CONCURRENT requests are profiled at once in each server process,
+so with N workers up to N times that many overall (0 turns profiling off);
+requests over the cap run normally, with `X-Profile: busy`.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import ClaimsJWTAuthentication
+from .models import ProfileReport
+
+
+MODES = ('cprofile', 'sample')
+SUMMARY_LINES = 40
+
+_lock = threading.Lock()
+_running = 0
+
+
+def requested_mode(request):
+    """'cprofile', 'sample' or None when the request did not ask to be profiled."""
+    value = request.GET.get('profile') or request.META.get('HTTP_X_PROFILE')
+    if not value or value.lower() in ('0', 'false', 'no'):
+        return None
+    return value if value in MODES else 'cprofile'
+
+
+def is_admin(request):
+    # The view authenticates later; profiling has to decide before it runs
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return bool(user.is_staff)
+    try:
+        result = ClaimsJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and bool(result[0].is_staff)
+
+
+def _acquire():
+    global _running
+    with _lock:
+        if _running >= getattr(settings, 'PROFILE_MAX_CONCURRENT', 2):
+            return False
+        _running += 1
+        return True
+
+
+def _release():
+    global _running
+    with _lock:
+        _running -= 1
+
+
+#-------------------------------------------------------------------------------#
+# Profilers
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds from a helper thread."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_qualname} ({code.co_filename}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def summary(self):
+        # Samples per innermost frame, like the "self" column of a flame graph
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        lines = [f'{sum(self.stacks.values())} samples every {self.interval * 1000:g} ms']
+        lines += [f'{count:6} {count / total:6.1%}  {frame}' for frame, count in leaves.most_common(SUMMARY_LINES)]
+        return '\n'.join(lines) + '\n'
+
+
+def _run_cprofile(get_response, request):
+    profiler = cProfile.Profile()
+    response = profiler.runcall(get_response, request)
+    _render(response, profiler.runcall)
+    return response, _cprofile_report(profiler)
+
+
+async def _arun_cprofile(get_response, request):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = await get_response(request)
+    finally:
+        profiler.disable()
+    return response, _cprofile_report(profiler)
+
+
+def _cprofile_report(profiler):
+    profiler.create_stats()
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    return {'summary': text.getvalue(), 'pstats': marshal.dumps(profiler.stats)}
+
+
+def _run_sampler(get_response, request):
+    with StackSampler(getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.001)) as sampler:
+        response = get_response(request)
+        _render(response, lambda render: render())
+    return response, {'summary': sampler.summary(), 'collapsed': sampler.collapsed()}
+
+
+async def _arun_sampler(get_response, request):
+    with StackSampler(getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.001)) as sampler:
+        response = await get_response(request)
+    return response, {'summary': sampler.summary(), 'collapsed': sampler.collapsed()}
+
+
+def _render(response, call):
+    # DRF renders in the response middleware; do it here so rendering is profiled too
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        call(response.render)
+
+
+#-------------------------------------------------------------------------------#
+# Reports
+
+
+def profile_request(get_response, request, mode):
+    """Run the request under `mode` and store the report; returns (response, profile id or None)."""
+    if not _acquire():
+        return get_response(request), None
+    try:
+        started = time.perf_counter()
+        run = _run_sampler if mode == 'sample' else _run_cprofile
+        response, report = run(get_response, request)
+        duration_ms = (time.perf_counter() - started) * 1000
+    finally:
+        _release()
+    return response, _store(request, response, mode, report, duration_ms)
+
+
+async def aprofile_request(get_response, request, mode):
+    """
+    profile_request() for the ASGI stack. The profilers watch the event loop
+    thread while the request runs, so other requests' coroutines can show up
+    too, and the ORM's sync_to_async work appears as time spent waiting.
+    """
+    if not _acquire():
+        return await get_response(request), None
+    try:
+        started = time.perf_counter()
+        run = _arun_sampler if mode == 'sample' else _arun_cprofile
+        response, report = await run(get_response, request)
+        duration_ms = (time.perf_counter() - started) * 1000
+    finally:
+        _release()
+    return response, await sync_to_async(_store)(request, response, mode, report, duration_ms)
+
+
+def _store(request, response, mode, report, duration_ms):
+    # Expired reports go as new ones come in
+    ProfileReport.objects.filter(created_at__lt=timezone.now() - _ttl()).delete()
+    profile = ProfileReport.objects.create(
+        id=uuid.uuid4().hex,
+        mode=mode,
+        method=request.method,
+        path=request.get_full_path(),
+        status=response.status_code,
+        duration_ms=round(duration_ms, 1),
+        summary=report['summary'],
+        pstats=report.get('pstats'),
+        collapsed=report.get('collapsed'),
+    )
+    return profile.id
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, 'PROFILE_TTL', 3600))
+
+
+def get_report(profile_id):
+    """The stored report as a dict (`pstats` / `collapsed` only for the mode that has them), or None."""
+    profile = ProfileReport.objects.filter(pk=profile_id, created_at__gte=timezone.now() - _ttl()).first()
+    if profile is None:
+        return None
+    report = {
+        'id': profile.id,
+        'mode': profile.mode,
+        'method': profile.method,
+        'path': profile.path,
+        'status': profile.status,
+        'duration_ms': profile.duration_ms,
+        'created_at': profile.created_at.isoformat(),
+        'summary': profile.summary,
+    }
+    if profile.pstats is not None:
+        report['pstats'] = bytes(profile.pstats)
+    if profile.collapsed is not None:
+        report['collapsed'] = profile.collapsed
+    return report
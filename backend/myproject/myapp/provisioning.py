@@ -0,0 +1,250 @@
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import User, ProvisionJob
+from .passwords import hash_passwords
+from .serializers import UserProvisionSerializer
+from .signals import bulk_changed
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('email', 'full_name', 'employee_id', 'role', 'contact_info', 'password')
+
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def default_workers():
+    return getattr(settings, 'PROVISION_WORKERS', None) or os.cpu_count() or 1
+
+
+def shared_pool():
+    """The process's hashing pool, PROVISION_WORKERS wide, started on first use and shared by every job."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(default_workers(), mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def read_csv(fileobj, encoding='utf-8-sig'):
+    """(line, dict) for each row of a binary CSV file object with a header row of COLUMNS."""
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding=encoding, newline=''))
+    if reader.fieldnames is None:
+        raise serializers.ValidationError({'file': 'The file is empty'})
+    if 'email' not in (name.strip() for name in reader.fieldnames):
+        raise serializers.ValidationError({'file': 'Missing column: email'})
+    # Empty cells are left out, so optional fields fall back to their defaults
+    return (
+        (reader.line_num, {key.strip(): value.strip() for key, value in record.items()
+                           if key and key.strip() in COLUMNS and value and value.strip()})
+        for record in reader
+    )
+
+
+class UserProvisioner:
+    """
+    Create trainers and trainees in bulk.
+
+    Each row is validated with UserProvisionSerializer (UserSerializer plus a
+    password). Emails and employee ids are checked against the database once per
+    chunk and against the earlier rows of the input. The passwords of a chunk are
+    hashed in parallel on a process pool, and the chunk is inserted with one
+    `bulk_create` in its own transaction. Bad rows are reported and skipped.
+
+    Hashing is the whole cost of creating a user (PBKDF2 is meant to be slow),
+    so `workers` processes give close to `workers` times the throughput of
+    create_user(). By default the process-wide pool is used (shared_pool());
+    an explicit `workers` gets a pool of its own for this run. Pools use
+    `spawn`: safe to start from a threaded server, and their workers never touch
+    the database. With one worker, or for a single password, hashing stays in
+    this process.
+
+    `progress`, if given, is called with the provisioner after every chunk.
+    """
+
+    def __init__(self, chunk_size=1000, workers=None, progress=None):
+        self.chunk_size = chunk_size
+        self.workers = workers or default_workers()
+        self.hasher = get_hasher()
+        self.progress = progress
+        self.created = 0
+        self.rows = 0
+        self.errors = []
+        self.emails = set()
+        self.employee_ids = set()
+        self._own_pool = workers is not None
+        self._pool = None
+
+    # -- input ----------------------------------------------------------------
+
+    def provision(self, records):
+        """Provision a list of user dicts (the JSON body of the API)."""
+        return self.provision_rows(enumerate(records, start=1))
+
+    def provision_file(self, fileobj, encoding='utf-8-sig'):
+        """Provision from a binary CSV file object with a header row of COLUMNS."""
+        return self.provision_rows(read_csv(fileobj, encoding))
+
+    def provision_rows(self, rows):
+        """`rows` yields (line, dict); `line` is what errors are reported against."""
+        rows = iter(rows)
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self._provision_chunk(chunk)
+                if self.progress is not None:
+                    self.progress(self)
+        finally:
+            if self._own_pool and self._pool is not None:
+                self._pool.shutdown()
+            self._pool = None
+        return self.result()
+
+    def result(self):
+        return {'rows': self.rows, 'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+    # -- per chunk ------------------------------------------------------------
+
+    def _provision_chunk(self, chunk):
+        self.rows += len(chunk)
+        accepted = []
+        for line, record in chunk:
+            if not isinstance(record, dict):
+                self._error(line, None, {'non_field_errors': ['Expected an object']})
+                continue
+            serializer = UserProvisionSerializer(data=record)
+            if not serializer.is_valid():
+                self._error(line, record.get('email'), serializer.errors)
+                continue
+            data = serializer.validated_data
+            data['email'] = User.objects.normalize_email(data['email'])
+            data['employee_id'] = data.get('employee_id') or None  # blank ids must not collide
+            accepted.append((line, data))
+
+        accepted = self._unique(accepted)
+        if not accepted:
+            return
+        hashes = self._hash([data.pop('password', None) for _, data in accepted])
+        users = [(line, User(password=password, **data)) for (line, data), password in zip(accepted, hashes)]
+        self._insert(users)
+
+    def _unique(self, accepted):
+        emails = [data['email'] for _, data in accepted]
+        employee_ids = [data['employee_id'] for _, data in accepted if data['employee_id']]
+        taken_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        taken_ids = set(User.objects.filter(employee_id__in=employee_ids).values_list('employee_id', flat=True))
+
+        unique = []
+        for line, data in accepted:
+            errors = {}
+            if data['email'] in taken_emails or data['email'] in self.emails:
+                errors['email'] = ['user with this email already exists.']
+            if data['employee_id'] and (data['employee_id'] in taken_ids or data['employee_id'] in self.employee_ids):
+                errors['employee_id'] = ['user with this employee id already exists.']
+            if errors:
+                self._error(line, data['email'], errors)
+                continue
+            self.emails.add(data['email'])
+            if data['employee_id']:
+                self.employee_ids.add(data['employee_id'])
+            unique.append((line, data))
+        return unique
+
+    def _hash(self, passwords):
+        """Encoded passwords in order; rows without one get an unusable password, as in create_user()."""
+        usable = [password for password in passwords if password is not None]
+        if self.workers > 1 and len(usable) > 1:
+            if self._pool is None:
+                self._pool = (ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+                              if self._own_pool else shared_pool())
+            size = -(-len(usable) // self.workers)
+            slices = [usable[i:i + size] for i in range(0, len(usable), size)]
+            encoded = iter([h for part in self._pool.map(hash_passwords, repeat(self.hasher), slices) for h in part])
+        else:
+            encoded = iter(hash_passwords(self.hasher, usable))
+        return [next(encoded) if password is not None else make_password(None) for password in passwords]
+
+    def _insert(self, users):
+        try:
+            with transaction.atomic():
+                created = User.objects.bulk_create([user for _, user in users])
+                bulk_changed.send(sender=User, pks=[user.pk for user in created], operation='create')
+        except IntegrityError:
+            # Another writer took an email or employee id since _unique(): retry row by row
+            created = []
+            for line, user in users:
+                try:
+                    with transaction.atomic():
+                        user.save(force_insert=True)
+                except IntegrityError as exc:
+                    self._error(line, user.email, {'non_field_errors': [str(exc)]})
+                else:
+                    created.append(user)
+        self.created += len(created)
+
+    def _error(self, line, email, errors):
+        self.errors.append({'line': line, 'email': email, 'errors': errors})
+
+
+#-------------------------------------------------------------------------------#
+# Background jobs (POST /api/users/bulk/)
+
+
+def run_job(job_id, rows):
+    """
+    Provision `rows` ((line, record) pairs) for a job, saving progress and
+    errors after every chunk.
+
+    The rows, passwords included, exist only in this process's memory: the job
+    row never holds them. A job cut short by a restart cannot be resumed; the
+    `close_provision_jobs` command marks it failed, with `processed` telling how
+    far it got.
+    """
+    job = ProvisionJob.objects.get(pk=job_id)
+    job.state = 'running'
+    job.save(update_fields=['state'])
+
+    def progress(provisioner):
+        job.processed, job.created, job.errors = provisioner.rows, provisioner.created, provisioner.errors
+        job.save(update_fields=['processed', 'created', 'errors'])
+
+    try:
+        UserProvisioner(progress=progress).provision_rows(rows)
+    except Exception as exc:
+        logger.exception('Provisioning job %s failed', job.pk)
+        job.state, job.error = 'failed', str(exc)
+    else:
+        job.state = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['state', 'error', 'finished_at'])
+    return job
+
+
+def _run_in_thread(job_id, rows):
+    try:
+        run_job(job_id, rows)
+    finally:
+        connection.close()  # the thread's own connection
+
+
+def start(job, rows):
+    """Provision `rows` for `job` on a background thread once the transaction that created it commits."""
+    transaction.on_commit(lambda: threading.Thread(
+        target=_run_in_thread, args=(job.pk, rows), name=f'provision-job-{job.pk}', daemon=True,
+    ).start())
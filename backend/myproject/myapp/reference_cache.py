@@ -0,0 +1,143 @@
+import copy
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Department, Designation, BranchState, BranchInnerState, Bank, TypeOfAccount
+from .versioning import VersionWatch
+
+
+CACHED_MODELS = (Department, Designation, BranchState, BranchInnerState, Bank, TypeOfAccount)
+
+
+def _recheck_seconds():
+    # How often a process checks whether another process wrote to the cached tables
+    return getattr(settings, 'REFERENCE_CACHE_RECHECK_SECONDS', 1.0)
+
+
+class ReferenceCache:
+    """
+    Per-process read-through cache of the small reference tables, keyed by id.
+
+    A miss loads the one row and keeps it; later reads of that id cost no query.
+    Inside a transaction the row is kept only once that commits, so a row the
+    transaction wrote and may still roll back is never cached. Callers get a
+    copy, so changing it can never change the cache.
+
+    Local writes evict their rows from the model signals twice: at once, so the
+    writing transaction reads its own change, and again after commit, in case
+    another thread re-read the old row meanwhile. Writes made by other processes
+    are noticed through the table versions (versioning.VersionWatch), checked at
+    most every REFERENCE_CACHE_RECHECK_SECONDS, and drop the whole table.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rows = {model: {} for model in CACHED_MODELS}
+        self._models = {model._meta.label_lower: model for model in CACHED_MODELS}
+        # Bumped on every eviction: a miss that raced with one must not store what it read
+        self._generations = Counter()
+        self._watch = VersionWatch(CACHED_MODELS)
+        self._checked_at = float('-inf')
+        self.hits, self.misses, self.invalidations = Counter(), Counter(), Counter()
+
+    def caches(self, model):
+        return model in self._rows
+
+    # -- reads ----------------------------------------------------------------
+
+    def get(self, model, pk):
+        """A copy of `model`'s row `pk`, or None if there is no such row."""
+        self._ensure_fresh()
+        label = model._meta.label_lower
+        with self._lock:
+            instance = self._rows[model].get(pk)
+            if instance is not None:
+                self.hits[label] += 1
+                return copy.copy(instance)
+            self.misses[label] += 1
+            generation = self._generations[model]
+
+        instance = model._default_manager.filter(pk=pk).first()
+        if instance is None:
+            return None
+        # Runs at once outside a transaction
+        transaction.on_commit(lambda: self._store(model, instance, generation))
+        return copy.copy(instance)
+
+    def _store(self, model, instance, generation):
+        with self._lock:
+            if self._generations[model] == generation:
+                self._rows[model][instance.pk] = instance
+
+    def _ensure_fresh(self):
+        interval = _recheck_seconds()
+        if time.monotonic() - self._checked_at < interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at < interval:
+                return
+            for label in self._watch.changed():
+                self._drop(self._models[label])  # someone else wrote to the table
+            self._checked_at = time.monotonic()
+
+    # -- invalidation -----------------------------------------------------------
+
+    def written(self, model, pks):
+        """Called for every local write to rows `pks` of `model`."""
+        if not self.caches(model):
+            return
+        pks = list(pks)
+        self.evict(model, pks)
+        transaction.on_commit(lambda: self.evict(model, pks))
+
+    def record_write(self, model, version):
+        """Note the table version a committed local write produced, so the next check keeps the table."""
+        self._watch.written(model, version)
+
+    def evict(self, model, pks):
+        with self._lock:
+            rows = self._rows[model]
+            for pk in pks:
+                rows.pop(pk, None)
+            self._generations[model] += 1
+
+    def _drop(self, model):
+        self._rows[model] = {}
+        self._generations[model] += 1
+        self.invalidations[model._meta.label_lower] += 1
+
+    def clear(self):
+        with self._lock:
+            for model in CACHED_MODELS:
+                self._rows[model] = {}
+                self._generations[model] += 1
+            self._watch.reset()
+            self._checked_at = float('-inf')
+
+    # -- metrics ----------------------------------------------------------------
+
+    def metric_lines(self):
+        """Prometheus text lines for /api/metrics/."""
+        with self._lock:
+            sizes = {model._meta.label_lower: len(rows) for model, rows in self._rows.items()}
+            families = (
+                ('reference_cache_hits_total', 'counter', 'Reads answered from the cache.', self.hits),
+                ('reference_cache_misses_total', 'counter', 'Reads that had to query the row.', self.misses),
+                ('reference_cache_invalidations_total', 'counter',
+                 'Whole tables dropped after another process wrote to them.', self.invalidations),
+                ('reference_cache_entries', 'gauge', 'Rows currently cached.', sizes),
+            )
+            lines = []
+            for name, kind, help_text, values in families:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for model in CACHED_MODELS:
+                    label = model._meta.label_lower
+                    lines.append(f'{name}{{table="{label}"}} {values.get(label, 0)}')
+        return lines
+
+
+cache = ReferenceCache()
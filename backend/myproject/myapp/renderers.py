@@ -0,0 +1,153 @@
+"""
+JSON (and optional MessagePack) renderers and parsers built on the fast
+C encoders when they are installed.
+
+FastJSONRenderer matches DRF's JSONRenderer for what the API sends:
+- compact separators, UTF-8
+- U+2028/U+2029 escaped
+- datetimes, decimals, lazy strings and the other non-JSON types converted
+  by DRF's own encoder
+orjson differs from `json` on a few inputs; those are handed to DRF's
+renderer, as is everything when orjson is missing:
+- integers wider than 64 bits, and an `indent` request from the browsable API
+- floats Python writes with an exponent (1e-07, 1e+16; orjson writes 1e-7,
+  1e16 and 0.00001). Output that might hold one is re-rendered, so a string
+  that merely looks like one only costs speed.
+- NaN and Infinity, which orjson writes as null and DRF refuses (STRICT_JSON)
+  or writes as NaN. Values a `default` conversion produces are not scanned.
+
+FastJSONParser likewise leaves bodies with 19 or more digits in a row to
+DRF's parser: orjson reads integers outside 64 bits as lossy floats.
+
+MessagePack needs the `msgpack` package. settings.py only offers it for
+negotiation (`Accept` / `Content-Type: application/msgpack`) when the package
+is importable.
+"""
+import io
+import math
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+_encoder = JSONEncoder()
+_drf = renderers.JSONRenderer()
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder too (millisecond precision, `Z` for UTC)
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+# Where orjson's float format may differ from repr(): exponents, and 0.0000x (repr: x e-05)
+_FLOAT_FORMAT = re.compile(rb'\de[-\d]|0\.0000')
+# Integer tokens this long may not fit in 64 bits
+_WIDE_NUMBER = re.compile(rb'\d{19}')
+
+
+def encode_default(obj):
+    """The conversions DRF's JSONEncoder applies to non-JSON types."""
+    if isinstance(obj, Decimal) and not obj.is_finite():
+        raise TypeError('Non-finite decimal')  # leave NaN handling to DRF
+    return _encoder.default(obj)
+
+
+def _has_non_finite(data):
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+def dumps(data):
+    """`data` as compact UTF-8 JSON, as JSONRenderer writes it (see the module docstring)."""
+    # orjson only writes compact, non-ASCII-escaped JSON: DRF's defaults (COMPACT_JSON, UNICODE_JSON)
+    if orjson is not None and _drf.compact and not _drf.ensure_ascii:
+        try:
+            content = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        except TypeError:  # orjson.JSONEncodeError, e.g. an int wider than 64 bits
+            pass
+        else:
+            if _FLOAT_FORMAT.search(content) or (b'null' in content and _has_non_finite(data)):
+                return _drf.render(data)
+            # JSONRenderer escapes these two so the output is also valid JavaScript
+            if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+                content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+            return content
+    return _drf.render(data)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(parsers.JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if _WIDE_NUMBER.search(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+#-------------------------------------------------------------------------------#
+# MessagePack (internal consumers)
+
+
+def _msgpack_default(obj):
+    value = encode_default(obj)
+    if isinstance(value, tuple):  # querysets / generators come back as tuples
+        return list(value)
+    return value
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
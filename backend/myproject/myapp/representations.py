@@ -0,0 +1,133 @@
+from django.db import models
+from django.utils import timezone
+
+from .models import (
+    User, Department, Designation, BranchState, BranchLocation, SubLocation, Pincode,
+    BranchInnerState, BranchInnerLocation, Bank, TypeOfAccount,
+)
+
+
+def iso_datetime(value):
+    """Same text as DRF's DateTimeField: ISO 8601 in the current timezone, `Z` for UTC."""
+    value = timezone.localtime(value) if timezone.is_aware(value) else value
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+class Representation:
+    """
+    Read-only rendering of a serializer's output straight from `values_list()` rows.
+
+    `columns` is [(output key, ORM path)] in the serializer's field order; related
+    names are joined in by the query instead of loaded per object. Used where the
+    same JSON has to be produced without building model instances and serializers:
+    the async views and the list endpoints (see RepresentationListMixin).
+
+    Like DRF, a name read through a nullable foreign key that is empty is left
+    out of the object rather than rendered as null.
+    """
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.keys = [key for key, _ in columns]
+        self.paths = [path for _, path in columns]
+        self.datetime_positions = [
+            i for i, path in enumerate(self.paths)
+            if '__' not in path and isinstance(model._meta.get_field(path), models.DateTimeField)
+        ]
+        self.optional_positions = [
+            i for i, path in enumerate(self.paths)
+            if '__' in path and model._meta.get_field(path.split('__', 1)[0]).null
+        ]
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.paths)
+
+    def values(self, queryset):
+        """`values()` rows, for callers that need the columns by name (keyset pagination)."""
+        return queryset.values(*self.paths)
+
+    async def arows(self, queryset, chunk_size=2000):
+        # values_list().aiterator() would run its query on the event loop (Django's
+        # ValuesListIterable is not a generator), so stream through values() instead
+        async for row in queryset.values(*self.paths).aiterator(chunk_size=chunk_size):
+            yield tuple(row[path] for path in self.paths)
+
+    def to_dict(self, row):
+        if self.datetime_positions:
+            row = list(row)
+            for i in self.datetime_positions:
+                if row[i] is not None:
+                    row[i] = iso_datetime(row[i])
+        data = dict(zip(self.keys, row))
+        for i in self.optional_positions:
+            if row[i] is None:
+                del data[self.keys[i]]
+        return data
+
+    def render(self, rows):
+        """Serializer output for `rows()` tuples or `values()` dicts."""
+        to_dict, paths = self.to_dict, self.paths
+        return [to_dict(tuple(row[path] for path in paths) if isinstance(row, dict) else row) for row in rows]
+
+
+# Mirror the serializers of the same names in serializers.py; a field added to one
+# of those has to be added here too (RepresentationListTests / ChangesTests compare them).
+DEPARTMENT = Representation(Department, [
+    ('id', 'id'), ('name', 'name'), ('status', 'status'), ('updated_at', 'updated_at'),
+])
+
+BRANCH_STATE = Representation(BranchState, [
+    ('id', 'id'), ('name', 'name'), ('status', 'status'), ('updated_at', 'updated_at'),
+])
+
+# fields = '__all__' puts relations after the plain fields
+BRANCH_LOCATION = Representation(BranchLocation, [
+    ('id', 'id'), ('name', 'name'), ('status', 'status'), ('updated_at', 'updated_at'),
+    ('branch_state', 'branch_state_id'),
+])
+
+BRANCH_INNER_STATE = Representation(BranchInnerState, [
+    ('id', 'id'), ('name', 'name'), ('status', 'status'), ('updated_at', 'updated_at'),
+])
+
+BANK = Representation(Bank, [
+    ('id', 'id'), ('bank_name', 'bank_name'), ('status', 'status'), ('updated_at', 'updated_at'),
+])
+
+TYPE_OF_ACCOUNT = Representation(TypeOfAccount, [
+    ('id', 'id'), ('account_type', 'account_type'), ('status', 'status'), ('updated_at', 'updated_at'),
+])
+
+PINCODE = Representation(Pincode, [
+    ('id', 'id'), ('pincode', 'pincode'),
+    ('branch_state', 'branch_state_id'), ('branch_state_name', 'branch_state__name'),
+    ('branch_location', 'branch_location_id'), ('location_name', 'branch_location__name'),
+    ('sub_location', 'sub_location_id'), ('sub_location_name', 'sub_location__name'),
+    ('status', 'status'), ('created_at', 'created_at'),
+])
+
+SUB_LOCATION = Representation(SubLocation, [
+    ('id', 'id'), ('name', 'name'),
+    ('branch_state', 'branch_state_id'), ('branch_state_name', 'branch_state__name'),
+    ('branch_location', 'branch_location_id'), ('branch_location_name', 'branch_location__name'),
+    ('status', 'status'),
+])
+
+BRANCH_INNER_LOCATION = Representation(BranchInnerLocation, [
+    ('id', 'id'), ('name', 'name'),
+    ('branch_inner_state', 'branch_inner_state_id'), ('branch_inner_state_name', 'branch_inner_state__name'),
+    ('branch_location', 'branch_location_id'), ('branch_location_name', 'branch_location__name'),
+    ('status', 'status'),
+])
+
+DESIGNATION = Representation(Designation, [
+    ('id', 'id'), ('name', 'name'),
+    ('department', 'department_id'), ('department_name', 'department__name'),
+    ('status', 'status'),
+])
+
+USER = Representation(User, [
+    ('id', 'id'), ('full_name', 'full_name'), ('email', 'email'), ('employee_id', 'employee_id'),
+    ('role', 'role'), ('contact_info', 'contact_info'), ('created_at', 'created_at'),
+])
@@ -0,0 +1,220 @@
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Greatest, Length
+
+from .models import SubLocation, BranchLocation, BranchInnerLocation, Bank, Designation
+
+
+# kind -> (model, name field, code). The code is folded into the FTS rowid
+# (object id * ROWID_STRIDE + code), so a row is found and replaced by rowid.
+SEARCH_MODELS = {
+    'sublocation': (SubLocation, 'name', 1),
+    'location': (BranchLocation, 'name', 2),
+    'inner-location': (BranchInnerLocation, 'name', 3),
+    'bank': (Bank, 'bank_name', 4),
+    'designation': (Designation, 'name', 5),
+}
+KIND_OF_MODEL = {model: kind for kind, (model, _, _) in SEARCH_MODELS.items()}
+KIND_OF_CODE = {code: kind for kind, (_, _, code) in SEARCH_MODELS.items()}
+ROWID_STRIDE = 8
+
+SEARCH_TABLE = 'myapp_search'
+MAX_QUERY_LENGTH = 64
+MIN_SIMILARITY = 0.3
+CANDIDATES_PER_RESULT = 5
+
+_fts_available = None
+
+
+def fts_available():
+    """True when the database has the FTS5 search table (SQLite with the trigram tokenizer)."""
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def _normalize(text):
+    return ' '.join(text.split()).casefold()
+
+
+def _trigrams(text):
+    text = _normalize(text)
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(query, name):
+    """Share of trigrams the two strings have in common (0..1), like pg_trgm's similarity()."""
+    a, b = _trigrams(query), _trigrams(name)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+#-------------------------------------------------------------------------------#
+# Index maintenance
+
+
+def _rowid(kind, pk):
+    return pk * ROWID_STRIDE + SEARCH_MODELS[kind][2]
+
+
+def index_objects(model, objs):
+    """Add or replace rows for model instances (or (pk, name, status) tuples)."""
+    if not fts_available() or model not in KIND_OF_MODEL:
+        return
+    kind = KIND_OF_MODEL[model]
+    field = SEARCH_MODELS[kind][1]
+    rows = [
+        obj if isinstance(obj, tuple) else (obj.pk, getattr(obj, field), obj.status)
+        for obj in objs
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(_rowid(kind, pk),) for pk, _, _ in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, status) VALUES (%s, %s, %s)',
+            [(_rowid(kind, pk), name, bool(active)) for pk, name, active in rows],
+        )
+
+
+def reindex(model, pks):
+    """Re-read rows by primary key, e.g. after a bulk write."""
+    if not fts_available() or model not in KIND_OF_MODEL:
+        return
+    field = SEARCH_MODELS[KIND_OF_MODEL[model]][1]
+    index_objects(model, list(model.objects.filter(pk__in=pks).values_list('pk', field, 'status')))
+
+
+def remove_objects(model, pks):
+    if not fts_available() or model not in KIND_OF_MODEL:
+        return
+    kind = KIND_OF_MODEL[model]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(_rowid(kind, pk),) for pk in pks])
+
+
+def rebuild():
+    """Re-create the whole index from the tables, e.g. after seeding with bulk_create."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        for model, field, code in SEARCH_MODELS.values():
+            qn = connection.ops.quote_name
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, name, status) '
+                f'SELECT {qn(model._meta.pk.column)} * {ROWID_STRIDE} + {code}, {qn(field)}, {qn("status")} '
+                f'FROM {qn(model._meta.db_table)}'
+            )
+
+
+#-------------------------------------------------------------------------------#
+# Querying
+
+
+def _fts_candidates(query, kinds, include_inactive, limit):
+    """Best `limit` rows by bm25 that share at least one trigram with the query."""
+    codes = [SEARCH_MODELS[kind][2] for kind in kinds]
+    conditions, params = [f'(rowid %% {ROWID_STRIDE}) IN ({", ".join(["%s"] * len(codes))})'], list(codes)
+    if not include_inactive:
+        conditions.append('status = 1')
+
+    trigrams = _trigrams(query)
+    if trigrams:
+        match = ' OR '.join('"%s"' % gram.replace('"', '""') for gram in sorted(trigrams))
+        where, order, params = f'{SEARCH_TABLE} MATCH %s', 'ORDER BY rank', [match] + params
+    else:
+        # Too short for a trigram: a prefix scan over the (small) index instead
+        pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        where, order, params = "name LIKE %s ESCAPE '\\'", '', [pattern] + params
+    sql = f'SELECT rowid, name FROM {SEARCH_TABLE} WHERE {where} AND {" AND ".join(conditions)} {order} LIMIT %s'
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for rowid, name in cursor.fetchall():
+            yield KIND_OF_CODE[rowid % ROWID_STRIDE], rowid // ROWID_STRIDE, name
+
+
+def _pg_candidates(query, kinds, include_inactive, limit):
+    """
+    Postgres: pg_trgm's `%` operator (served by the GIN indexes from migration
+    0014) picks the rows and similarity() orders them before the LIMIT.
+    """
+    from django.contrib.postgres.lookups import TrigramSimilar
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    for kind in kinds:
+        model, field, _ = SEARCH_MODELS[kind]
+        queryset = model.objects.filter(Q(TrigramSimilar(F(field), query)) | Q(**{f'{field}__icontains': query}))
+        if not include_inactive:
+            queryset = queryset.filter(status=True)
+        queryset = queryset.annotate(similarity=TrigramSimilarity(field, query)).order_by('-similarity', 'pk')
+        for pk, name in queryset.values_list('pk', field)[:limit]:
+            yield kind, pk, name
+
+
+def _orm_candidates(query, kinds, include_inactive, limit):
+    """
+    Portable fallback: rows whose name contains any of the query's trigrams,
+    ranked in SQL (query as typed first, then estimated similarity) before the LIMIT.
+    """
+    trigrams = _trigrams(query)
+    for kind in kinds:
+        model, field, _ = SEARCH_MODELS[kind]
+        queryset = model.objects.all()
+        if not include_inactive:
+            queryset = queryset.filter(status=True)
+        if trigrams:
+            condition, shared = Q(), Value(0)
+            for gram in trigrams:
+                condition |= Q(**{f'{field}__icontains': gram})
+                shared += Case(When(**{f'{field}__icontains': gram}, then=1), default=0)
+            # |a & b| / |a | b|, with the name's trigram count taken as its length - 2
+            union = Greatest(Value(len(trigrams)) + Length(field) - 2 - shared, Value(1))
+            queryset = queryset.filter(condition).annotate(
+                contains=Case(When(**{f'{field}__icontains': query}, then=1), default=0),
+                similarity=Cast(shared, FloatField()) / Cast(union, FloatField()),
+            ).order_by('-contains', '-similarity', 'pk')
+        else:
+            queryset = queryset.filter(**{f'{field}__istartswith': query}).order_by(Length(field), 'pk')
+        for pk, name in queryset.values_list('pk', field)[:limit]:
+            yield kind, pk, name
+
+
+def search(query, kinds=None, limit=20, include_inactive=False):
+    """
+    Ranked, typo-tolerant name search across the location and bank masters.
+
+    Candidates come from the FTS5 trigram index on SQLite, pg_trgm on Postgres,
+    or a portable ORM scan elsewhere, and are ranked by trigram similarity,
+    with names that contain the query as typed first. Returns a list of
+    {type, id, name, score} dicts.
+    """
+    query = _normalize(query)[:MAX_QUERY_LENGTH]
+    kinds = [kind for kind in (kinds or SEARCH_MODELS) if kind in SEARCH_MODELS]
+    if not query or not kinds:
+        return []
+
+    if fts_available():
+        fetch = _fts_candidates
+    elif connection.vendor == 'postgresql' and len(query) >= 3:
+        fetch = _pg_candidates
+    else:
+        fetch = _orm_candidates
+    candidates = fetch(query, kinds, include_inactive, limit * CANDIDATES_PER_RESULT)
+
+    results = []
+    for kind, pk, name in candidates:
+        normalized = _normalize(name)
+        contains = query in normalized
+        score = 1.0 if normalized == query else similarity(query, name)
+        if contains or score >= MIN_SIMILARITY:
+            results.append((not contains, -score, name, kind, pk))
+    results.sort()
+    return [
+        {'type': kind, 'id': pk, 'name': name, 'score': round(-score, 3)}
+        for _, score, name, kind, pk in results[:limit]
+    ]
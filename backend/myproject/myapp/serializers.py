@@ -1,5 +1,60 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
-from .models import User,Department,Designation,BranchState,BranchLocation,SubLocation, Pincode,BranchInnerState, BranchInnerLocation , Bank ,TypeOfAccount
+from . import moves
+from .mixins import BatchRequestSerializer
+from .models import User,Department,Designation,BranchState,BranchLocation,SubLocation, Pincode,BranchInnerState, BranchInnerLocation , Bank ,TypeOfAccount, SubtreeJob, ProvisionJob
+from .reference_cache import cache as reference_cache
+from .subtree import ROOTS
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that looks up ids of the reference tables in the
+    reference cache, so validating a known id costs no query. Filtered querysets
+    and other models are looked up as usual.
+    """
+
+    def to_internal_value(self, data):
+        queryset = self.get_queryset()
+        model = queryset.model
+        if self.pk_field is not None or not reference_cache.caches(model) or queryset.query.has_filters():
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        instance = reference_cache.get(model, pk) if pk is not None else None
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class CachedNameField(serializers.CharField):
+    """
+    Read-only `<foreign key>.<field>` (e.g. source='department.name') answered
+    from the reference cache when the related object is not loaded yet, instead
+    of a query per object.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        relation, attr = self.source_attrs
+        field = instance._meta.get_field(relation)
+        pk = getattr(instance, field.attname)
+        if pk is None or field.is_cached(instance) or not reference_cache.caches(field.related_model):
+            return super().get_attribute(instance)
+        related = reference_cache.get(field.related_model, pk)
+        if related is None:
+            return None
+        field.set_cached_value(instance, related)
+        return getattr(related, attr)
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,6 +63,26 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+# One row of a bulk provisioning request (see provisioning.py)
+class UserProvisionSerializer(UserSerializer):
+    password = serializers.CharField(write_only=True, required=False, max_length=128, trim_whitespace=False)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['password']
+        # Uniqueness is checked once per chunk by the provisioner, not with a query per row
+        extra_kwargs = {'email': {'validators': []}, 'employee_id': {'validators': []}}
+
+    def validate_role(self, value):
+        if value == 'admin':
+            raise serializers.ValidationError('Admins cannot be provisioned in bulk')
+        return value
+
+
+# Employee directory: users are activated and deactivated, never deleted in batches
+class UserBatchSerializer(BatchRequestSerializer):
+    action = serializers.ChoiceField(choices=['activate', 'deactivate'])
+
+
 
 
 
@@ -19,8 +94,8 @@ class DepartmentSerializer(serializers.ModelSerializer):
 
 
 class DesignationSerializer(serializers.ModelSerializer):
-    department_name = serializers.CharField(source='department.name', read_only=True)
-    department = serializers.PrimaryKeyRelatedField(queryset=Department.objects.all())
+    department_name = CachedNameField(source='department.name')
+    department = CachedPrimaryKeyRelatedField(queryset=Department.objects.all())
     
     class Meta:
         model = Designation
@@ -48,10 +123,19 @@ class BranchStateSerializer(serializers.ModelSerializer):
 
 
 class BranchLocationSerializer(serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
     class Meta:
         model = BranchLocation
         fields = '__all__'
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        if 'branch_state' in validated_data:
+            moves.location_moved(instance)
+        return instance
+
 
 
 
@@ -61,12 +145,15 @@ class BranchLocationSerializer(serializers.ModelSerializer):
 # SubLocation serializer
 
 class SubLocationSerializer(serializers.ModelSerializer):
-    branch_state_name = serializers.CharField(source='branch_state.name', read_only=True)
+    serializer_related_field = CachedPrimaryKeyRelatedField
+    branch_state_name = CachedNameField(source='branch_state.name')
     branch_location_name = serializers.CharField(source='branch_location.name', read_only=True)
     
     class Meta:
         model = SubLocation
         fields = ['id', 'name', 'branch_state', 'branch_state_name', 'branch_location', 'branch_location_name', 'status']
+        # Derived from branch_location when left out
+        extra_kwargs = {'branch_state': {'required': False}}
     
     def validate_name(self, value):
         """Validate that sublocation name is not empty"""
@@ -74,12 +161,6 @@ class SubLocationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Sub Location name is required")
         return value.strip()
     
-    def validate_branch_state(self, value):
-        """Validate that branch state exists"""
-        if not value:
-            raise serializers.ValidationError("Branch State is required")
-        return value
-    
     def validate_branch_location(self, value):
         """Validate that branch location exists"""
         if not value:
@@ -87,21 +168,35 @@ class SubLocationSerializer(serializers.ModelSerializer):
         return value
     
     def validate(self, data):
-        """Custom validation to ensure branch_location belongs to branch_state"""
-        branch_state = data.get('branch_state')
+        """The location decides the state; a state sent alongside it must match (compared by id, no extra load)"""
         branch_location = data.get('branch_location')
-        
-        if branch_state and branch_location:
-            if branch_location.branch_state != branch_state:
-                raise serializers.ValidationError(
-                    {"branch_location": "Selected location does not belong to the selected state"}
-                )
+        if branch_location is not None:
+            state_id = branch_location.branch_state_id
+        elif self.instance is not None:
+            state_id = self.instance.branch_state_id
+        else:
+            return data  # branch_location is required; its own error is reported
+
+        branch_state = data.pop('branch_state', None)
+        if branch_state is not None and branch_state.pk != state_id:
+            raise serializers.ValidationError(
+                {"branch_location": "Selected location does not belong to the selected state"}
+            )
+        data['branch_state_id'] = state_id
         return data
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        if 'branch_location' in validated_data:
+            moves.sublocation_moved(instance)
+        return instance
+
 
 # Pincode serializer
 class PincodeSerializer(serializers.ModelSerializer):
-    branch_state_name = serializers.CharField(source='branch_state.name', read_only=True)
+    serializer_related_field = CachedPrimaryKeyRelatedField
+    branch_state_name = CachedNameField(source='branch_state.name')
     location_name = serializers.CharField(source='branch_location.name', read_only=True)
     sub_location_name = serializers.CharField(source='sub_location.name', read_only=True)
 
@@ -109,6 +204,8 @@ class PincodeSerializer(serializers.ModelSerializer):
         model = Pincode
         fields = ['id', 'pincode', 'branch_state', 'branch_state_name', 'branch_location', 'location_name', 'sub_location', 'sub_location_name', 'status', 'created_at']
         read_only_fields = ['id', 'created_at', 'branch_state_name', 'location_name', 'sub_location_name']
+        # Derived from sub_location when left out
+        extra_kwargs = {'branch_state': {'required': False}, 'branch_location': {'required': False}}
 
     def validate_pincode(self, value):
         # Ensure 6 digit numeric string
@@ -117,19 +214,26 @@ class PincodeSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, data):
-        # Ensure location belongs to state and sublocation belongs to location
-        branch_state = data.get('branch_state')
-        branch_location = data.get('branch_location')
+        # The sub-location decides the location and state: clients may send only
+        # `sub_location`. Parents sent alongside it must match; the check compares
+        # the sub-location's raw *_id columns, so it loads nothing more.
         sub_location = data.get('sub_location')
-
-        if branch_state and branch_location:
-            if branch_location.branch_state != branch_state:
-                raise serializers.ValidationError({'branch_location': 'Selected location does not belong to the selected state'})
-
-        if branch_location and sub_location:
-            if sub_location.branch_location != branch_location:
-                raise serializers.ValidationError({'sub_location': 'Selected sub-location does not belong to the selected location'})
-
+        instance = sub_location if sub_location is not None else self.instance
+        if instance is None:
+            return data  # sub_location is required; its own error is reported
+        parents = {'branch_state': instance.branch_state_id, 'branch_location': instance.branch_location_id}
+
+        branch_state = data.pop('branch_state', None)
+        branch_location = data.pop('branch_location', None)
+        if branch_state is not None and branch_location is not None and branch_location.branch_state_id != branch_state.pk:
+            raise serializers.ValidationError({'branch_location': 'Selected location does not belong to the selected state'})
+        if branch_location is not None and branch_location.pk != parents['branch_location']:
+            raise serializers.ValidationError({'sub_location': 'Selected sub-location does not belong to the selected location'})
+        if branch_state is not None and branch_state.pk != parents['branch_state']:
+            raise serializers.ValidationError({'branch_location': 'Selected location does not belong to the selected state'})
+
+        data['branch_state_id'] = parents['branch_state']
+        data['branch_location_id'] = parents['branch_location']
         return data
 
 
@@ -143,7 +247,8 @@ class BranchInnerStateSerializer(serializers.ModelSerializer):
 
 
 class BranchInnerLocationSerializer(serializers.ModelSerializer):
-    branch_inner_state_name = serializers.CharField(source='branch_inner_state.name', read_only=True)
+    serializer_related_field = CachedPrimaryKeyRelatedField
+    branch_inner_state_name = CachedNameField(source='branch_inner_state.name')
     branch_location_name = serializers.CharField(source='branch_location.name', read_only=True)
 
     class Meta:
@@ -173,3 +278,47 @@ class TypeOfAccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = TypeOfAccount
         fields = '__all__'
+
+
+# Background subtree delete / archive job
+class SubtreeJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SubtreeJob
+        fields = ['id', 'kind', 'root_id', 'mode', 'state', 'total', 'processed', 'progress', 'step', 'error',
+                  'created_at', 'finished_at']
+        read_only_fields = ['state', 'total', 'processed', 'step', 'error', 'created_at', 'finished_at']
+
+    def get_progress(self, obj):
+        if obj.state == 'done':
+            return 100
+        return int(obj.processed * 100 / obj.total) if obj.total else 0
+
+    def validate(self, data):
+        if not ROOTS[data['kind']].objects.filter(pk=data['root_id']).exists():
+            raise serializers.ValidationError({'root_id': f"No {data['kind']} with id {data['root_id']}"})
+        if SubtreeJob.objects.filter(kind=data['kind'], root_id=data['root_id'],
+                                     state__in=['pending', 'running']).exists():
+            raise serializers.ValidationError({'root_id': 'A job for this subtree is already in progress'})
+        return data
+
+
+# Background bulk provisioning job (the rows themselves are never sent back)
+class ProvisionJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    failed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProvisionJob
+        fields = ['id', 'state', 'total', 'processed', 'progress', 'created', 'failed', 'errors', 'error',
+                  'created_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        if obj.state == 'done':
+            return 100
+        return int(obj.processed * 100 / obj.total) if obj.total else 0
+
+    def get_failed(self, obj):
+        return len(obj.errors)
@@ -0,0 +1,188 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from . import changes, events, reference_cache, search, versioning
+from .pincode_index import index as pincode_index
+from .authentication import REVOKING_FIELDS, revoke_tokens
+from .models import User, BranchState, BranchLocation, SubLocation, Pincode
+
+
+# Sent by code that writes with bulk_create / update / raw deletes, which bypass
+# the per-object model signals. Arguments: sender (model), pks, operation
+# ('create' | 'update' | 'delete') and optionally fields (names an update set).
+bulk_changed = Signal()
+
+
+HIERARCHY_MODELS = (BranchState, BranchLocation, SubLocation, Pincode)
+
+
+# The cached location hierarchy needs no receivers: its cache key is made of the
+# four tables' versions (see hierarchy.py), which the receivers below bump.
+
+
+# Table change versions are bumped inside the writing transaction, so a rolled-back
+# write never advertises a new version.
+# The version each write produced is handed to the in-process indexes once it has
+# committed, so they can tell it from a write made by another process.
+def _bump_version(sender, **kwargs):
+    _version_written(sender, versioning.bump(sender))
+
+
+def _version_written(sender, version):
+    if sender in HIERARCHY_MODELS:
+        transaction.on_commit(partial(pincode_index.record_write, sender, version))
+    if reference_cache.cache.caches(sender):
+        transaction.on_commit(partial(reference_cache.cache.record_write, sender, version))
+
+
+for model in versioning.VERSIONED_MODELS:
+    post_save.connect(_bump_version, sender=model, dispatch_uid=f'version-save-{model.__name__}')
+    post_delete.connect(_bump_version, sender=model, dispatch_uid=f'version-delete-{model.__name__}')
+
+
+@receiver(bulk_changed, dispatch_uid='version-bulk')
+def _bump_version_bulk(sender, **kwargs):
+    if sender in versioning.VERSIONED_MODELS:
+        _version_written(sender, versioning.bump(sender))
+
+
+# Keep the in-process pincode index in step with committed writes
+def _index_saved(sender, instance, **kwargs):
+    def apply():
+        if sender is Pincode:
+            pincode_index.upsert_pincodes([(
+                instance.pk, instance.pincode, instance.sub_location_id,
+                instance.branch_location_id, instance.branch_state_id, instance.status,
+            )])
+        elif sender is BranchState:
+            pincode_index.set_name(sender, instance.pk, instance.name)
+        else:
+            pincode_index.set_name(sender, instance.pk, instance.name, instance.branch_state_id
+                                   if sender is BranchLocation else instance.branch_location_id)
+    transaction.on_commit(apply)
+
+
+def _index_deleted(sender, instance, **kwargs):
+    pk = instance.pk  # the collector clears instance.pk before on_commit runs
+
+    def apply():
+        if sender is Pincode:
+            pincode_index.remove_pincodes([pk])
+    transaction.on_commit(apply)
+
+
+for model in HIERARCHY_MODELS:
+    post_save.connect(_index_saved, sender=model, dispatch_uid=f'pincode-index-save-{model.__name__}')
+    post_delete.connect(_index_deleted, sender=model, dispatch_uid=f'pincode-index-delete-{model.__name__}')
+
+
+@receiver(bulk_changed, dispatch_uid='pincode-index-bulk')
+def _index_bulk(sender, pks=(), operation=None, **kwargs):
+    if sender not in HIERARCHY_MODELS:
+        return
+
+    def apply():
+        if sender is Pincode and operation == 'delete':
+            pincode_index.remove_pincodes(pks)
+        elif sender is Pincode:
+            pincode_index.upsert_pincodes(Pincode.objects.filter(pk__in=pks).values_list(
+                'id', 'pincode', 'sub_location_id', 'branch_location_id', 'branch_state_id', 'status'))
+        else:
+            # Names of bulk-written parents are cheaper to reload than to patch
+            pincode_index.invalidate()
+    transaction.on_commit(apply)
+
+
+# Reference cache: evict written rows (see reference_cache.py)
+def _reference_saved(sender, instance, **kwargs):
+    reference_cache.cache.written(sender, [instance.pk])
+
+
+for model in reference_cache.CACHED_MODELS:
+    post_save.connect(_reference_saved, sender=model, dispatch_uid=f'reference-save-{model.__name__}')
+    post_delete.connect(_reference_saved, sender=model, dispatch_uid=f'reference-delete-{model.__name__}')
+
+
+@receiver(bulk_changed, dispatch_uid='reference-bulk')
+def _reference_bulk(sender, pks=(), **kwargs):
+    reference_cache.cache.written(sender, pks)
+
+
+# The search index lives in the same database, so it is written inside the
+# transaction and rolls back with it.
+def _search_saved(sender, instance, **kwargs):
+    search.index_objects(sender, [instance])
+
+
+def _search_deleted(sender, instance, **kwargs):
+    search.remove_objects(sender, [instance.pk])
+
+
+for model in search.KIND_OF_MODEL:
+    post_save.connect(_search_saved, sender=model, dispatch_uid=f'search-save-{model.__name__}')
+    post_delete.connect(_search_deleted, sender=model, dispatch_uid=f'search-delete-{model.__name__}')
+
+
+@receiver(bulk_changed, dispatch_uid='search-bulk')
+def _search_bulk(sender, pks=(), operation=None, **kwargs):
+    if operation == 'delete':
+        search.remove_objects(sender, pks)
+    else:
+        search.reindex(sender, pks)
+
+
+# Deletions are logged for delta-sync clients (changes.py), inside the deleting
+# transaction like the search index.
+def _tombstone_deleted(sender, instance, **kwargs):
+    changes.record_deletions(sender, [instance.pk])
+
+
+for model in changes.TRACKED_MODELS:
+    post_delete.connect(_tombstone_deleted, sender=model, dispatch_uid=f'tombstone-delete-{model.__name__}')
+
+
+@receiver(bulk_changed, dispatch_uid='tombstone-bulk')
+def _tombstone_bulk(sender, pks=(), operation=None, **kwargs):
+    if operation == 'delete':
+        changes.record_deletions(sender, pks)
+
+
+# Change feed for the /api/events/ stream (events.py), also written in the transaction
+def _event_saved(sender, instance, created, update_fields=None, **kwargs):
+    events.record_save(instance, created, update_fields)
+
+
+def _event_deleted(sender, instance, **kwargs):
+    events.record(sender, [instance.pk], 'delete')
+
+
+for model in events.EVENT_MODELS:
+    post_save.connect(_event_saved, sender=model, dispatch_uid=f'event-save-{model.__name__}')
+    post_delete.connect(_event_deleted, sender=model, dispatch_uid=f'event-delete-{model.__name__}')
+
+
+@receiver(bulk_changed, dispatch_uid='event-bulk')
+def _event_bulk(sender, pks=(), operation=None, fields=None, **kwargs):
+    events.record(sender, pks, operation, fields if operation == 'update' else None)
+
+
+# Tokens carry the user's role and flags; changing them (or the password) ends
+# the user's sessions. Saves limited to other fields, e.g. last_login, do not.
+@receiver(post_save, sender=User, dispatch_uid='revoke-tokens-save')
+def _revoke_tokens_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or REVOKING_FIELDS & set(update_fields)):
+        revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User, dispatch_uid='revoke-tokens-delete')
+def _revoke_tokens_deleted(sender, instance, **kwargs):
+    revoke_tokens(instance.pk)
+
+
+@receiver(bulk_changed, sender=User, dispatch_uid='revoke-tokens-bulk')
+def _revoke_tokens_bulk(sender, pks=(), operation=None, fields=None, **kwargs):
+    if operation == 'delete' or (operation == 'update' and (fields is None or REVOKING_FIELDS & set(fields))):
+        revoke_tokens(*pks)
@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import changes
+from .models import BranchState, BranchLocation, SubLocation, Pincode, BranchInnerLocation, SubtreeJob
+from .signals import bulk_changed
+
+
+logger = logging.getLogger(__name__)
+
+ROOTS = {
+    'branch-state': BranchState,
+    'branch-location': BranchLocation,
+    'sub-location': SubLocation,
+}
+# Rows per transaction; small batches keep SQLite's write lock short
+BATCH_SIZE = getattr(settings, 'SUBTREE_BATCH_SIZE', 1000)
+# Pause between batches so queued writers get the lock
+BATCH_PAUSE = getattr(settings, 'SUBTREE_BATCH_PAUSE_SECONDS', 0.0)
+
+
+def plan(kind, root_id):
+    """
+    Every row the CASCADE rules would remove with the root, as (model, queryset)
+    steps ordered leaves first, so each batch can be deleted without the collector.
+    """
+    if kind == 'branch-state':
+        locations = BranchLocation.objects.filter(branch_state_id=root_id)
+        sublocations = SubLocation.objects.filter(Q(branch_state_id=root_id) | Q(branch_location__in=locations))
+        pincodes = Pincode.objects.filter(
+            Q(branch_state_id=root_id) | Q(branch_location__in=locations) | Q(sub_location__in=sublocations)
+        )
+    elif kind == 'branch-location':
+        locations = BranchLocation.objects.filter(pk=root_id)
+        sublocations = SubLocation.objects.filter(branch_location_id=root_id)
+        pincodes = Pincode.objects.filter(Q(branch_location_id=root_id) | Q(sub_location__in=sublocations))
+    else:
+        locations = BranchLocation.objects.none()
+        sublocations = SubLocation.objects.filter(pk=root_id)
+        pincodes = Pincode.objects.filter(sub_location_id=root_id)
+
+    steps = [
+        (Pincode, pincodes),
+        (BranchInnerLocation, BranchInnerLocation.objects.filter(branch_location__in=locations)),
+        (SubLocation, sublocations),
+        (BranchLocation, locations),
+    ]
+    if kind == 'branch-state':
+        steps.append((BranchState, BranchState.objects.filter(pk=root_id)))
+    return steps
+
+
+def _raw_delete(model, pks):
+    table, column = connection.ops.quote_name(model._meta.db_table), connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(pks))})', pks)
+
+
+def _cascade_depths(model, depth=0, depths=None):
+    # Longest CASCADE path from `model` to each dependent model, so parents go after their children
+    depths = {} if depths is None else depths
+    depths[model] = max(depths.get(model, 0), depth)
+    for relation in model._meta.related_objects:
+        if not relation.many_to_many and relation.on_delete is models.CASCADE:
+            _cascade_depths(relation.related_model, depth + 1, depths)
+    return depths
+
+
+def delete_rows(model, pks):
+    """
+    Delete `model` rows `pks` and every row the CASCADE rules remove with them,
+    without the collector: one SELECT per relation to find the dependent ids,
+    raw deletes leaves first, and a single `bulk_changed` per table. The query
+    count depends on the tables involved, not on how many rows go.
+    """
+    depths = _cascade_depths(model)
+    found = {model: set(pks)}
+    pending = [(model, set(pks))]
+    while pending:
+        parent, ids = pending.pop()
+        for relation in parent._meta.related_objects:
+            if relation.many_to_many or relation.on_delete is not models.CASCADE:
+                continue
+            child = relation.related_model
+            new = set(child._default_manager.filter(**{f'{relation.field.name}__in': ids})
+                      .values_list('pk', flat=True)) - found.setdefault(child, set())
+            if new:
+                found[child] |= new
+                pending.append((child, new))
+
+    for target in sorted(found, key=lambda m: -depths[m]):
+        target_pks = sorted(found[target])
+        if not target_pks:
+            continue
+        for i in range(0, len(target_pks), BATCH_SIZE):
+            _raw_delete(target, target_pks[i:i + BATCH_SIZE])
+        bulk_changed.send(sender=target, pks=target_pks, operation='delete')
+    return len(found[model])
+
+
+def _process(job, model, queryset):
+    if job.mode == 'archive':
+        queryset = queryset.filter(status=True)
+    job.step = model._meta.label_lower
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.order_by().values_list('pk', flat=True)[:BATCH_SIZE])
+            if not pks:
+                break
+            if job.mode == 'delete':
+                _raw_delete(model, pks)
+                bulk_changed.send(sender=model, pks=pks, operation='delete')
+            else:
+                model._default_manager.filter(pk__in=pks).update(**changes.touched(model, status=False))
+                bulk_changed.send(sender=model, pks=pks, operation='update', fields=['status'])
+            job.processed += len(pks)
+            job.save(update_fields=['processed', 'step'])
+        if BATCH_PAUSE:
+            time.sleep(BATCH_PAUSE)
+
+
+def run_job(job_id):
+    """
+    Work through a job's plan in bounded batches, one short transaction each.
+
+    Every batch re-selects what is left, so an interrupted job can simply be
+    run again (see the `run_subtree_jobs` command).
+    """
+    job = SubtreeJob.objects.get(pk=job_id)
+    steps = plan(job.kind, job.root_id)
+    if job.mode == 'archive':
+        remaining = sum(queryset.filter(status=True).count() for _, queryset in steps)
+    else:
+        remaining = sum(queryset.count() for _, queryset in steps)
+    job.state, job.total = 'running', job.processed + remaining
+    job.save(update_fields=['state', 'total'])
+    try:
+        for model, queryset in steps:
+            _process(job, model, queryset)
+    except Exception as exc:
+        logger.exception('Subtree job %s failed', job.pk)
+        job.state, job.error = 'failed', str(exc)
+    else:
+        job.state, job.step = 'done', ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['state', 'step', 'error', 'finished_at'])
+    return job
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        connection.close()  # the thread's own connection
+
+
+def start(job):
+    """Run `job` on a background thread once the transaction that created it commits."""
+    transaction.on_commit(
+        lambda: threading.Thread(target=_run_in_thread, args=(job.pk,), name=f'subtree-job-{job.pk}', daemon=True).start()
+    )
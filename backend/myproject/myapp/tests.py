@@ -1,3 +1,1690 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import (
+    User, Department, Designation, BranchState, BranchLocation, SubLocation,
+    Pincode, BranchInnerState, BranchInnerLocation, Bank, TypeOfAccount, ProvisionJob,
+)
+
+
+def seed_master_data(prefix, rows=3):
+    """Create `rows` records in every master table, linked through the location hierarchy."""
+    for i in range(rows):
+        department = Department.objects.create(name=f'{prefix} Department {i}')
+        inner_state = BranchInnerState.objects.create(name=f'{prefix} Inner State {i}')
+        Designation.objects.create(name=f'{prefix} Designation {i}', department=department)
+        state = BranchState.objects.create(name=f'{prefix} State {i}')
+        location = BranchLocation.objects.create(name=f'{prefix} Location {i}', branch_state=state)
+        sub_location = SubLocation.objects.create(
+            name=f'{prefix} SubLocation {i}', branch_state=state, branch_location=location
+        )
+        Pincode.objects.create(
+            pincode=f'{prefix[:3]}{i:03d}', branch_state=state,
+            branch_location=location, sub_location=sub_location,
+        )
+        BranchInnerLocation.objects.create(
+            name=f'{prefix} Inner Location {i}', branch_inner_state=inner_state, branch_location=location
+        )
+        Bank.objects.create(bank_name=f'{prefix} Bank {i}')
+        TypeOfAccount.objects.create(account_type=f'{prefix} Account {i}')
+        User.objects.create(email=f'{prefix.lower()}{i}@example.com', role='trainee')
+
+
+#-------------------------------------------------------------------------------#
+
+# Query budgets: every list endpoint must run a fixed number of queries
+
+class ListQueryBudgetTests(TestCase):
+    # endpoint -> number of queries allowed, regardless of row count
+    # (conditional-GET endpoints add one primary-key lookup of the table version)
+    BUDGETS = {
+        '/api/departments/': 2,
+        '/api/designations/': 1,
+        '/api/branch-states/': 2,
+        '/api/branch-locations/': 1,
+        '/api/sublocations/': 1,
+        '/api/pincodes/': 1,
+        '/api/branch-inner-states/': 2,
+        '/api/branch-inner-locations/': 1,
+        '/api/banks/': 2,
+        '/api/typeofaccounts/': 2,
+        '/api/users/': 1,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@example.com', password='pass1234')
+        seed_master_data('100', rows=3)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertWithinBudget(self, url):
+        with self.assertNumQueries(self.BUDGETS[url]):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_list_endpoints_stay_within_budget(self):
+        for url in self.BUDGETS:
+            with self.subTest(url=url):
+                self.assertWithinBudget(url)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        seed_master_data('200', rows=10)
+        for url in self.BUDGETS:
+            with self.subTest(url=url):
+                response = self.assertWithinBudget(url)
+                self.assertGreaterEqual(len(response.data), 10)
+
+    def test_filtered_lists_stay_within_budget(self):
+        state = BranchState.objects.first()
+        location = BranchLocation.objects.first()
+        urls = [
+            f'/api/sublocations/?branch_state={state.pk}&status=True',
+            f'/api/pincodes/?branch_state={state.pk}&branch_location={location.pk}',
+            f'/api/branch-inner-locations/?branch_location={location.pk}',
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_related_names_are_serialized(self):
+        response = self.client.get('/api/pincodes/')
+        row = response.data[0]
+        pincode = Pincode.objects.get(pk=row['id'])
+        self.assertEqual(row['branch_state_name'], pincode.branch_state.name)
+        self.assertEqual(row['location_name'], pincode.branch_location.name)
+        self.assertEqual(row['sub_location_name'], pincode.sub_location.name)
+
+
+#-------------------------------------------------------------------------------#
+
+# Keyset pagination
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_master_data('300', rows=7)
+        # Identical timestamps force the id tiebreaker to do its job
+        Pincode.objects.update(created_at=Pincode.objects.first().created_at)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url, queries=1):
+        pages, ids = 0, []
+        while url:
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return pages, ids
+
+    def test_requests_without_page_params_are_unpaginated(self):
+        response = self.client.get('/api/pincodes/')
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_walks_every_row_once_in_key_order(self):
+        pages, ids = self.walk('/api/pincodes/?page_size=3')
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, list(Pincode.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_default_ordering_is_by_id(self):
+        pages, ids = self.walk('/api/banks/?page_size=2', queries=2)
+        self.assertEqual(pages, 4)
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(ids), Bank.objects.count())
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.client.get('/api/branch-states/?page_size=3').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+
+    def test_filters_apply_before_seeking(self):
+        state = BranchState.objects.first()
+        _, ids = self.walk(f'/api/sublocations/?branch_state={state.pk}&page_size=1')
+        self.assertEqual(ids, list(state.sublocations.values_list('id', flat=True)))
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/pincodes/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+#-------------------------------------------------------------------------------#
+
+# Filter indexes
+
+class FilterIndexTests(TestCase):
+    def test_pincode_state_filter_needs_no_sort(self):
+        plan = Pincode.objects.filter(branch_state=1).explain()
+        self.assertIn('pincode_state_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_active_filters_use_partial_indexes(self):
+        self.assertIn('pincode_active_state_idx', Pincode.objects.filter(branch_state=1, status=True).explain())
+        self.assertIn('subloc_active_location_idx', SubLocation.objects.filter(branch_location=1, status=True).explain())
+
+
+#-------------------------------------------------------------------------------#
+
+# Bulk CSV import
+
+class PincodeImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.state = BranchState.objects.create(name='Telangana')
+        cls.location = BranchLocation.objects.create(name='Hyderabad', branch_state=cls.state)
+        cls.sub_location = SubLocation.objects.create(
+            name='Ameerpet', branch_state=cls.state, branch_location=cls.location
+        )
+        other_state = BranchState.objects.create(name='Karnataka')
+        BranchLocation.objects.create(name='Bengaluru', branch_state=other_state)
+
+    def upload(self, text, query=''):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        data = text if isinstance(text, bytes) else text.encode()
+        upload = SimpleUploadedFile('pincodes.csv', data, content_type='text/csv')
+        return APIClient().post(f'/api/pincodes/bulk-import/{query}', {'file': upload}, format='multipart')
+
+    def test_imports_valid_rows_and_reports_bad_ones(self):
+        response = self.upload(
+            'Pincode,State,Location,Sub Location\n'
+            '500016,telangana,Hyderabad,Ameerpet\n'
+            '50001X,Telangana,Hyderabad,Ameerpet\n'
+            '500017,Telangana,Bengaluru,Ameerpet\n'
+            '500016,Telangana,Hyderabad,Ameerpet\n'
+            '500018, Telangana , Hyderabad ,ameerpet\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['rows'], response.data['created'], response.data['failed']), (5, 2, 3))
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 4, 5])
+        self.assertIn('location', response.data['errors'][1]['errors'])
+        pincode = Pincode.objects.get(pincode='500018')
+        self.assertEqual(
+            (pincode.branch_state_id, pincode.branch_location_id, pincode.sub_location_id),
+            (self.state.pk, self.location.pk, self.sub_location.pk),
+        )
+
+    def test_create_missing_builds_the_hierarchy(self):
+        response = self.upload(
+            'pincode,state,location,sub_location,status\n'
+            '560001,Karnataka,Bengaluru,MG Road,true\n'
+            '560002,Karnataka,Bengaluru,MG Road,false\n'
+            '600001,Tamil Nadu,Chennai,Parrys,1\n',
+            query='?create_missing=true',
+        )
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(SubLocation.objects.filter(name='MG Road').count(), 1)
+        parrys = Pincode.objects.select_related('sub_location__branch_location__branch_state').get(pincode='600001')
+        self.assertEqual(parrys.sub_location.branch_location.branch_state.name, 'Tamil Nadu')
+        self.assertEqual(parrys.branch_state_id, parrys.sub_location.branch_state_id)
+        self.assertFalse(Pincode.objects.get(pincode='560002').status)
+
+    def test_query_count_does_not_depend_on_rows(self):
+        from .importers import PincodeImporter
+        lines = ['pincode,state,location,sub_location'] + [
+            f'5{i:05d},Telangana,Hyderabad,Ameerpet' for i in range(250)
+        ]
+        # 4 map loads + savepoint / insert / version bump / change events / release per chunk
+        with self.assertNumQueries(4 + 5 * 3):
+            result = PincodeImporter(chunk_size=100).import_lines(lines)
+        self.assertEqual(result['created'], 250)
+
+    def test_missing_columns_are_rejected(self):
+        response = self.upload('pincode,state\n500016,Telangana\n')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unreadable_files_are_rejected(self):
+        import tempfile
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        latin1 = 'pincode,state,location,sub_location\n500016,Telangana,Hyderabad,Ameerpét\n'.encode('latin-1')
+        response = self.upload(latin1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unreadable CSV', response.data['error'])
+        oversized = 'pincode,state,location,sub_location\n500016,' + 'x' * 200_000 + ',y,z\n'  # past csv.field_size_limit
+        self.assertEqual(self.upload(oversized).status_code, 400)
+        self.assertFalse(Pincode.objects.exists())
+
+        with tempfile.NamedTemporaryFile(suffix='.csv') as fh:
+            fh.write(latin1)
+            fh.flush()
+            with self.assertRaisesMessage(CommandError, 'Unreadable CSV'):
+                call_command('import_pincodes', fh.name)
+
+
+#-------------------------------------------------------------------------------#
+
+# Streaming exports
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@example.com', password='pass1234')
+        seed_master_data('400', rows=5)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_matches_the_serializer_columns(self):
+        import csv
+        response = APIClient().get('/api/exports/pincodes.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(self.read(response).splitlines()))
+        self.assertEqual(len(rows), 5)
+        listed = {row['id']: row for row in APIClient().get('/api/pincodes/').data}
+        for row in rows:
+            expected = listed[int(row['id'])]
+            self.assertEqual(list(row), list(expected))
+            self.assertEqual(row['sub_location_name'], expected['sub_location_name'])
+            self.assertEqual(row['created_at'], expected['created_at'])
+
+    def test_ndjson_export_runs_one_query(self):
+        import json
+        with self.assertNumQueries(1):
+            body = self.read(APIClient().get('/api/exports/branch-inner-locations.ndjson'))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(all(row['branch_location_name'] for row in rows))
+
+    def test_user_export_is_admin_only(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/exports/users.csv').status_code, 401)
+        client.force_authenticate(self.admin)
+        body = self.read(client.get('/api/exports/users.csv'))
+        self.assertEqual(len(body.splitlines()), 1 + 5)
+        self.assertNotIn('admin@example.com', body)
+
+    def test_unknown_export_is_404(self):
+        self.assertEqual(APIClient().get('/api/exports/banks.csv').status_code, 404)
+        self.assertEqual(APIClient().get('/api/exports/pincodes.xml').status_code, 404)
+
+
+#-------------------------------------------------------------------------------#
+
+# Cached location hierarchy
+
+class LocationHierarchyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_master_data('500', rows=3)
+        cls.state = BranchState.objects.order_by('id').first()
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+
+    def test_tree_is_nested_and_built_in_four_queries(self):
+        with self.assertNumQueries(1 + 4):  # the table versions, then one query per level
+            response = self.client.get('/api/location-hierarchy/')
+        self.assertEqual(len(response.data), 3)
+        pincode = Pincode.objects.filter(branch_state=self.state).first()
+        node = next(state for state in response.data if state['id'] == self.state.pk)
+        self.assertEqual(
+            node['locations'][0]['sublocations'][0]['pincodes'],
+            [{'id': pincode.pk, 'pincode': pincode.pincode}],
+        )
+
+    def test_second_request_is_served_from_cache(self):
+        self.client.get('/api/location-hierarchy/')
+        with self.assertNumQueries(1):  # the table versions only
+            self.client.get('/api/location-hierarchy/')
+
+    def test_writes_from_other_processes_are_seen(self):
+        from . import versioning
+        self.client.get('/api/location-hierarchy/')
+        # Another worker: a plain UPDATE (no signals in this process) plus its version bump
+        BranchState.objects.filter(pk=self.state.pk).update(name='Renamed Elsewhere')
+        versioning.bump(BranchState)
+        names = [state['name'] for state in self.client.get('/api/location-hierarchy/').data]
+        self.assertIn('Renamed Elsewhere', names)
+
+    def test_subtree_root(self):
+        response = self.client.get(f'/api/location-hierarchy/?state={self.state.pk}')
+        self.assertEqual([state['id'] for state in response.data], [self.state.pk])
+        self.assertEqual(self.client.get('/api/location-hierarchy/?state=999999').status_code, 404)
+
+    def test_writes_invalidate_the_cache(self):
+        self.client.get('/api/location-hierarchy/')
+        location = self.state.branch_locations.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            SubLocation.objects.create(name='Fresh', branch_state=self.state, branch_location=location)
+        names = [
+            sub['name']
+            for state in self.client.get('/api/location-hierarchy/').data if state['id'] == self.state.pk
+            for loc in state['locations'] for sub in loc['sublocations']
+        ]
+        self.assertIn('Fresh', names)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.state.status = False
+            self.state.save()
+        ids = [state['id'] for state in self.client.get('/api/location-hierarchy/').data]
+        self.assertNotIn(self.state.pk, ids)
+
+    def test_bulk_import_invalidates_the_cache(self):
+        from .importers import PincodeImporter
+        self.client.get('/api/location-hierarchy/')
+        with self.captureOnCommitCallbacks(execute=True):
+            PincodeImporter(create_missing=True).import_lines([
+                'pincode,state,location,sub_location', '999001,Goa,Panaji,Miramar',
+            ])
+        names = [state['name'] for state in self.client.get('/api/location-hierarchy/').data]
+        self.assertIn('Goa', names)
+
+
+#-------------------------------------------------------------------------------#
+
+# Conditional GET on slowly changing tables
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_master_data('600', rows=3)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_matching_etag_is_answered_with_304_from_the_version_alone(self):
+        first = self.client.get('/api/banks/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/banks/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.content, b'')
+
+    def test_if_modified_since(self):
+        first = self.client.get('/api/departments/')
+        response = self.client.get('/api/departments/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_the_validators(self):
+        first = self.client.get('/api/typeofaccounts/')
+        self.client.post('/api/typeofaccounts/', {'account_type': 'Salary'}, format='json')
+        response = self.client.get('/api/typeofaccounts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertIn('Salary', [row['account_type'] for row in response.data])
+
+    def test_validators_differ_per_url(self):
+        listing = self.client.get('/api/branch-states/')
+        detail = self.client.get(f"/api/branch-states/{listing.data[0]['id']}/")
+        self.assertNotEqual(listing['ETag'], detail['ETag'])
+        response = self.client.get('/api/branch-states/?page_size=1', HTTP_IF_NONE_MATCH=listing['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_writes_bump_the_version(self):
+        from . import versioning
+        from .signals import bulk_changed
+        version, _ = versioning.current(Bank)
+        bulk_changed.send(sender=Bank, pks=[], operation='update')
+        self.assertEqual(versioning.current(Bank)[0], version + 1)
+
+
+#-------------------------------------------------------------------------------#
+
+# In-memory pincode lookup / autocomplete
+
+class PincodeIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.state = BranchState.objects.create(name='Telangana')
+        cls.location = BranchLocation.objects.create(name='Hyderabad', branch_state=cls.state)
+        cls.sub_location = SubLocation.objects.create(
+            name='Ameerpet', branch_state=cls.state, branch_location=cls.location
+        )
+        for code in ('500016', '500001', '500081', '501101'):
+            Pincode.objects.create(
+                pincode=code, branch_state=cls.state, branch_location=cls.location, sub_location=cls.sub_location
+            )
+
+    def setUp(self):
+        from .pincode_index import index
+        index.invalidate()
+        self.index = index
+        self.client = APIClient()
+
+    def test_lookup_returns_the_hierarchy_without_queries_once_built(self):
+        self.client.get('/api/pincodes/lookup/500016/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/pincodes/lookup/500016/')
+        self.assertEqual(response.data['sub_location_name'], 'Ameerpet')
+        self.assertEqual(response.data['location_name'], 'Hyderabad')
+        self.assertEqual(response.data['branch_state'], self.state.pk)
+        self.assertEqual(self.client.get('/api/pincodes/lookup/999999/').status_code, 404)
+
+    def test_server_startup_builds_the_index(self):
+        from unittest import mock
+        from django.db import OperationalError
+        from .pincode_index import warm_up
+        with self.assertNumQueries(5):  # version check + four tables
+            warm_up()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/pincodes/lookup/500016/').status_code, 200)
+
+        self.index.invalidate()
+        with mock.patch.object(self.index, '_build', side_effect=OperationalError('no such table')), \
+                self.assertLogs('myapp.pincode_index', 'WARNING'):
+            warm_up()
+        self.assertEqual(self.client.get('/api/pincodes/lookup/500016/').status_code, 200)
+
+    def test_autocomplete_is_ordered_and_limited(self):
+        response = self.client.get('/api/pincodes/autocomplete/?q=5000')
+        self.assertEqual([row['pincode'] for row in response.data], ['500001', '500016', '500081'])
+        response = self.client.get('/api/pincodes/autocomplete/?q=50&limit=2')
+        self.assertEqual([row['pincode'] for row in response.data], ['500001', '500016'])
+        response = self.client.get('/api/pincodes/autocomplete/?q=501')
+        self.assertEqual([row['pincode'] for row in response.data], ['501101'])
+        self.assertEqual(self.client.get('/api/pincodes/autocomplete/?q=abc').status_code, 400)
+
+    def test_local_writes_update_the_index_incrementally(self):
+        self.index.lookup('500016')
+        with self.captureOnCommitCallbacks(execute=True):
+            Pincode.objects.create(
+                pincode='500002', branch_state=self.state, branch_location=self.location,
+                sub_location=self.sub_location,
+            )
+            self.sub_location.name = 'Ameerpet West'
+            self.sub_location.save()
+            Pincode.objects.filter(pincode='500081').get().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.lookup('500002')['sub_location_name'], 'Ameerpet West')
+            self.assertIsNone(self.index.lookup('500081'))
+        # The version check sees only our own writes, so no rebuild is needed
+        self.index._checked_at = 0
+        with self.assertNumQueries(1):
+            self.index.lookup('500002')
+
+    def test_writes_from_other_processes_trigger_a_rebuild(self):
+        from . import versioning
+        self.index.lookup('500016')
+        # Simulate another worker: data and version change without this process' signals
+        Pincode.objects.filter(pincode='500016').update(status=False)
+        versioning.bump(Pincode)
+        self.index._checked_at = 0
+        self.assertFalse(self.index.lookup('500016')['status'])
+
+    def test_a_check_between_commit_and_callbacks_misses_no_remote_write(self):
+        from . import versioning
+        self.index.lookup('500016')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Pincode.objects.create(
+                pincode='500002', branch_state=self.state, branch_location=self.location,
+                sub_location=self.sub_location,
+            )
+        # Another thread checks the versions before this write's callbacks have run
+        self.index._checked_at = 0
+        self.index.lookup('500016')
+        for callback in callbacks:
+            callback()
+        Pincode.objects.filter(pincode='500016').update(status=False)
+        versioning.bump(Pincode)
+        self.index._checked_at = 0
+        self.assertFalse(self.index.lookup('500016')['status'])
+
+
+#-------------------------------------------------------------------------------#
+
+# Name search across the masters
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        state = BranchState.objects.create(name='Telangana')
+        self.location = BranchLocation.objects.create(name='Hyderabad', branch_state=state)
+        self.ameerpet = SubLocation.objects.create(name='Ameerpet', branch_state=state, branch_location=self.location)
+        SubLocation.objects.create(name='Secunderabad', branch_state=state, branch_location=self.location)
+        self.bank = Bank.objects.create(bank_name='State Bank of India')
+        Bank.objects.create(bank_name='HDFC Bank')
+        Bank.objects.create(bank_name='Closed Bank', status=False)
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [(row['type'], row['name']) for row in response.data]
+
+    def test_misspelled_names_are_found(self):
+        self.assertEqual(self.names('/api/search/?q=hydrabad')[0], ('location', 'Hyderabad'))
+        self.assertEqual(self.names('/api/search/?q=amerpet'), [('sublocation', 'Ameerpet')])
+
+    def test_substring_matches_rank_first(self):
+        names = self.names('/api/search/?q=bank&types=bank')
+        self.assertEqual(names, [('bank', 'HDFC Bank'), ('bank', 'State Bank of India')])
+        self.assertIn(('bank', 'Closed Bank'), self.names('/api/search/?q=bank&types=bank&include_inactive=true'))
+        self.assertEqual(self.names('/api/search/?q=ho&types=bank'), [])
+        self.assertEqual(self.names('/api/search/?q=hd'), [('bank', 'HDFC Bank')])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.ameerpet.name = 'Begumpet'
+        self.ameerpet.save()
+        self.assertEqual(self.names('/api/search/?q=ameerpet'), [])
+        self.assertEqual(self.names('/api/search/?q=begumpet'), [('sublocation', 'Begumpet')])
+        self.bank.delete()
+        self.assertEqual(self.names('/api/search/?q=state bank&types=bank'), [])
+
+    def test_orm_fallback_ranks_the_same(self):
+        from unittest import mock
+        from . import search
+        expected = search.search('hydrabad') + search.search('bank')
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            self.assertEqual(search.search('hydrabad') + search.search('bank'), expected)
+
+    def test_orm_fallback_ranks_before_the_limit(self):
+        from unittest import mock
+        from . import search
+        for i in range(10):
+            BranchLocation.objects.create(name=f'Abad Layout {i}', branch_state=self.location.branch_state)
+        BranchLocation.objects.create(name='Secunderabad', branch_state=self.location.branch_state)
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            # 5 candidates for 11 rows sharing a trigram: the best one must be among them
+            self.assertEqual(search.search('secunderbad', kinds=['location'], limit=1)[0]['name'], 'Secunderabad')
+            self.assertEqual(search.search('se', kinds=['location'])[0]['name'], 'Secunderabad')
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/search/?q=x&types=planet').status_code, 400)
+
+
+#-------------------------------------------------------------------------------#
+
+# Login and claims-based JWT authentication
+
+# Password hashing alone is slower than the slow-request threshold
+@override_settings(PERFORMANCE_SLOW_REQUEST_MS=None)
+class TokenAuthTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = User.objects.create_user(email='trainer@example.com', password='secret-1', role='trainer',
+                                                full_name='Tina Trainer')
+
+    def login(self, email='trainer@example.com', password='secret-1'):
+        return self.client.post('/api/login/', {'email': email, 'password': password}, format='json')
+
+    def test_login_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['role'], 'trainer')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login(password='wrong').status_code, 401)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login(email='nobody@example.com').status_code, 401)
+
+    def test_inactive_users_cannot_log_in_but_inactive_superusers_can(self):
+        self.trainer.is_active = False
+        self.trainer.save()
+        self.assertEqual(self.login().status_code, 401)
+        User.objects.create_superuser(email='root@example.com', password='secret-2', is_active=False)
+        self.assertEqual(self.login('root@example.com', 'secret-2').status_code, 200)
+
+    def test_role_checks_run_without_queries(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.login().data['access']}")
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/trainer-only/')
+        self.assertEqual(response.data, {'message': 'Hello Trainer Tina Trainer!'})
+        self.assertEqual(self.client.get('/api/trainee-only/').status_code, 403)
+        self.assertEqual(APIClient().get('/api/trainer-only/').status_code, 401)
+
+    def test_role_change_revokes_tokens_and_refresh_picks_up_the_new_role(self):
+        from unittest import mock
+        from datetime import timedelta
+        from django.utils import timezone
+        # Tokens issued in an earlier second than the change are revoked
+        with mock.patch('rest_framework_simplejwt.tokens.aware_utcnow',
+                        return_value=timezone.now() - timedelta(seconds=2)):
+            tokens = self.login().data
+        self.trainer.role = 'trainee'
+        self.trainer.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get('/api/trainer-only/').status_code, 401)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']},
+                                          format='json').status_code, 401)
+
+        tokens = self.login().data
+        self.trainer.is_active = True  # saving unrelated fields only keeps the sessions
+        self.trainer.save(update_fields=['last_login'])
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.data['role'], 'trainee')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/trainee-only/').status_code, 200)
+
+    def test_revocations_are_stored_for_every_process(self):
+        from unittest import mock
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+        with mock.patch('rest_framework_simplejwt.tokens.aware_utcnow',
+                        return_value=timezone.now() - timedelta(seconds=2)):
+            tokens = self.login().data
+        self.trainer.set_password('secret-2')
+        self.trainer.save()
+        self.assertIsNotNone(User.objects.get(pk=self.trainer.pk).tokens_valid_after)
+        cache.clear()  # a process that did not see the revocation
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']},
+                                          format='json').status_code, 401)
+        self.assertEqual(self.login(password='secret-2').status_code, 200)
+
+
+#-------------------------------------------------------------------------------#
+
+# Batch status toggles and deletes
+
+class BatchActionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        seed_master_data('Batch', rows=4)
+        self.pincodes = list(Pincode.objects.order_by('id').values_list('id', flat=True))
+
+    def batch(self, url, action, ids):
+        return self.client.post(f'{url}batch/', {'action': action, 'ids': ids}, format='json')
+
+    def test_deactivate_is_one_update_and_reports_missing_ids(self):
+        from . import versioning
+        version = versioning.current(Pincode)[0]
+        response = self.batch('/api/pincodes/', 'deactivate', self.pincodes[:3] + [999999])
+        self.assertEqual(response.data, {'action': 'deactivate', 'count': 3, 'missing': [999999]})
+        self.assertEqual(Pincode.objects.filter(status=False).count(), 3)
+        self.assertEqual(versioning.current(Pincode)[0], version + 1)
+        # Rows already in the requested state are not counted again
+        response = self.batch('/api/pincodes/', 'deactivate', self.pincodes)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(self.batch('/api/pincodes/', 'activate', self.pincodes).data['count'], 4)
+
+    def test_hidden_inactive_rows_can_be_activated_again(self):
+        # Bank routes only list active banks; the batch still reaches the inactive ones
+        banks = list(Bank.objects.values_list('id', flat=True))
+        response = self.batch('/api/banks/', 'deactivate', banks[:1])
+        self.assertEqual(response.data, {'action': 'deactivate', 'count': 1, 'missing': []})
+        self.assertFalse(Bank.objects.get(pk=banks[0]).status)
+        response = self.batch('/api/banks/', 'activate', banks[:1])
+        self.assertEqual(response.data, {'action': 'activate', 'count': 1, 'missing': []})
+        self.assertTrue(Bank.objects.get(pk=banks[0]).status)
+
+    def test_delete_cascades(self):
+        from .models import Tombstone
+        states = list(BranchState.objects.values_list('id', flat=True))
+        response = self.batch('/api/branch-states/', 'delete', states[:2])
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(Pincode.objects.count(), 2)
+        self.assertEqual(SubLocation.objects.count(), 2)
+        self.assertEqual(Tombstone.objects.filter(model='myapp.pincode').count(), 2)
+
+    def test_delete_query_count_does_not_depend_on_rows(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        for i in range(8):
+            state = BranchState.objects.order_by('id').first()
+            Pincode.objects.create(pincode=f'60000{i}', branch_state=state, branch_location=state.branch_locations.first(),
+                                   sub_location=state.sublocations.first())
+        pincodes = list(Pincode.objects.order_by('id').values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.batch('/api/pincodes/', 'delete', pincodes[:2]).data['count'], 2)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(self.batch('/api/pincodes/', 'delete', pincodes[2:12]).data['count'], 10)
+        self.assertFalse(Pincode.objects.filter(pk__in=pincodes[:12]).exists())
+
+    def test_rejects_bad_payloads(self):
+        self.assertEqual(self.batch('/api/banks/', 'archive', [1]).status_code, 400)
+        self.assertEqual(self.batch('/api/banks/', 'delete', []).status_code, 400)
+        self.assertEqual(self.batch('/api/banks/', 'delete', ['x']).status_code, 400)
+        self.assertEqual(self.batch('/api/banks/', 'delete', list(range(1, 1002))).status_code, 400)
+
+
+#-------------------------------------------------------------------------------#
+
+# Reference-data cache
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        from .reference_cache import cache
+        self.cache = cache
+        cache.clear()
+        self.department = Department.objects.create(name='Training')
+        self.state = BranchState.objects.create(name='Telangana')
+        self.client = APIClient()
+
+    def counts(self, label):
+        return self.cache.hits[label], self.cache.misses[label]
+
+    def committed_get(self, model, pk):
+        # Misses are kept on commit; the test's own transaction never commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.cache.get(model, pk)
+
+    def test_fk_validation_and_names_come_from_the_cache(self):
+        from .serializers import DesignationSerializer
+        label = 'myapp.department'
+        hits, misses = self.counts(label)
+        with self.settings(REFERENCE_CACHE_RECHECK_SECONDS=3600):
+            with self.captureOnCommitCallbacks(execute=True):
+                serializer = DesignationSerializer(data={'name': 'Coach', 'department': self.department.pk})
+                self.assertTrue(serializer.is_valid())
+            self.assertEqual(self.counts(label), (hits, misses + 1))
+            with self.assertNumQueries(1):  # the name's uniqueness check only
+                serializer = DesignationSerializer(data={'name': 'Mentor', 'department': self.department.pk})
+                self.assertTrue(serializer.is_valid())
+            designation = serializer.save()
+            fetched = Designation.objects.get(pk=designation.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(DesignationSerializer(fetched).data['department_name'], 'Training')
+        self.assertEqual(self.counts(label), (hits + 2, misses + 1))
+
+    def test_unknown_and_malformed_ids_are_rejected(self):
+        from .serializers import DesignationSerializer, BranchLocationSerializer
+        for value, code in ((999999, 'does_not_exist'), ('abc', 'incorrect_type'), (True, 'incorrect_type')):
+            serializer = DesignationSerializer(data={'name': 'Coach', 'department': value})
+            self.assertFalse(serializer.is_valid())
+            self.assertEqual(serializer.errors['department'][0].code, code)
+        serializer = BranchLocationSerializer(data={'name': 'Hyderabad', 'branch_state': self.state.pk})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['branch_state'].name, 'Telangana')
+
+    def test_local_writes_evict_at_once(self):
+        from .serializers import DesignationSerializer
+        designation = Designation.objects.create(name='Coach', department=self.department)
+        self.assertEqual(DesignationSerializer(designation).data['department_name'], 'Training')
+        self.department.name = 'Learning'
+        self.department.save()
+        designation = Designation.objects.get(pk=designation.pk)
+        self.assertEqual(DesignationSerializer(designation).data['department_name'], 'Learning')
+        pk = self.department.pk
+        self.department.delete()
+        self.assertIsNone(self.cache.get(Department, pk))
+
+    def test_other_processes_writes_are_seen_after_the_version_check(self):
+        from . import versioning
+        self.assertEqual(self.committed_get(BranchState, self.state.pk).name, 'Telangana')
+        # Another process: a plain UPDATE (no signals here) plus its version bump
+        BranchState.objects.filter(pk=self.state.pk).update(name='Andhra Pradesh')
+        versioning.bump(BranchState)
+        with self.settings(REFERENCE_CACHE_RECHECK_SECONDS=3600):
+            self.assertEqual(self.cache.get(BranchState, self.state.pk).name, 'Telangana')
+        invalidations = self.cache.invalidations['myapp.branchstate']
+        with self.settings(REFERENCE_CACHE_RECHECK_SECONDS=0):
+            self.assertEqual(self.cache.get(BranchState, self.state.pk).name, 'Andhra Pradesh')
+        self.assertEqual(self.cache.invalidations['myapp.branchstate'], invalidations + 1)
+
+    def test_a_check_between_commit_and_callbacks_misses_no_remote_write(self):
+        from . import versioning
+        with self.settings(REFERENCE_CACHE_RECHECK_SECONDS=0):
+            self.committed_get(BranchState, self.state.pk)
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                BranchState.objects.create(name='Kerala')
+            # Another thread checks, and caches the row again, before this write's callbacks have run
+            self.assertEqual(self.committed_get(BranchState, self.state.pk).name, 'Telangana')
+            for callback in callbacks:
+                callback()
+            BranchState.objects.filter(pk=self.state.pk).update(name='Andhra Pradesh')
+            versioning.bump(BranchState)
+            self.assertEqual(self.cache.get(BranchState, self.state.pk).name, 'Andhra Pradesh')
+
+    def test_rows_read_in_a_transaction_are_kept_only_on_commit(self):
+        from django.db import transaction
+        try:
+            with transaction.atomic():
+                state = BranchState.objects.create(name='Kerala')
+                self.assertEqual(self.cache.get(BranchState, state.pk).name, 'Kerala')
+                raise RuntimeError('roll back')
+        except RuntimeError:
+            pass
+        self.assertIsNone(self.cache.get(BranchState, state.pk))
+        with self.settings(REFERENCE_CACHE_RECHECK_SECONDS=3600):
+            with self.assertNumQueries(1):
+                self.committed_get(Department, self.department.pk)
+            with self.assertNumQueries(0):
+                self.cache.get(Department, self.department.pk)
+
+    def test_copies_are_handed_out(self):
+        cached = self.cache.get(Department, self.department.pk)
+        cached.name = 'Changed locally'
+        self.assertEqual(self.cache.get(Department, self.department.pk).name, 'Training')
+
+    def test_metrics(self):
+        misses = self.cache.misses['myapp.department']
+        self.committed_get(Department, self.department.pk)
+        self.client.force_authenticate(User.objects.create_superuser(email='admin@example.com', password='x'))
+        text = self.client.get('/api/metrics/').content.decode()
+        self.assertIn(f'reference_cache_misses_total{{table="myapp.department"}} {misses + 1}', text)
+        self.assertIn('reference_cache_entries{table="myapp.department"} 1', text)
+
+
+#-------------------------------------------------------------------------------#
+
+# Employee directory
+
+class EmployeeDirectoryTests(TestCase):
+    def setUp(self):
+        User.objects.bulk_create([
+            User(email=f'emp{i}@example.com', full_name=f'Employee {i}', employee_id=f'E{i:03d}',
+                 role='trainer' if i % 2 else 'trainee', is_active=i < 7)
+            for i in range(10)
+        ])
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def ids(self, response):
+        return [row['id'] for row in response.data['data']]
+
+    def test_lists_are_paged_and_split_by_status(self):
+        active = list(User.objects.filter(is_active=True).exclude(role='admin').order_by('id').values_list('id', flat=True))
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get('/api/active-employees?page=2&limit=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total'], response.data['page'], response.data['limit']), (7, 2, 3))
+        self.assertEqual(self.ids(response), active[3:6])
+        self.assertEqual(set(response.data['data'][0]), {'id', 'full_name', 'email', 'employee_id', 'role',
+                                                        'contact_info', 'created_at'})
+        self.assertEqual(self.client.get('/api/inactive-employees/').data['total'], 3)
+        self.assertEqual(self.client.get('/api/active-employees?page=9&limit=3').data['data'], [])
+        self.assertEqual(self.client.get('/api/active-employees?limit=abc').data['limit'], 50)
+
+    def test_search_and_role_filters(self):
+        response = self.client.get('/api/active-employees?search=e003')
+        self.assertEqual([row['employee_id'] for row in response.data['data']], ['E003'])
+        response = self.client.get('/api/active-employees?search=EMP5@')
+        self.assertEqual([row['email'] for row in response.data['data']], ['emp5@example.com'])
+        response = self.client.get('/api/active-employees?role=trainer')
+        self.assertEqual(response.data['total'], 3)
+        self.assertTrue(all(row['role'] == 'trainer' for row in response.data['data']))
+        # The directory never lists admins
+        self.assertEqual(self.client.get('/api/active-employees?search=admin').data['total'], 0)
+
+    def test_activate_and_inactivate_one(self):
+        employee = User.objects.get(email='emp1@example.com')
+        response = self.client.post(f'/api/user/inactivate/{employee.pk}')
+        self.assertEqual(response.data, {'id': employee.pk, 'is_active': False})
+        self.assertFalse(User.objects.get(pk=employee.pk).is_active)
+        self.assertEqual(self.client.post(f'/api/user/activate/{employee.pk}/').status_code, 200)
+        self.assertTrue(User.objects.get(pk=employee.pk).is_active)
+        self.assertEqual(self.client.post(f'/api/user/inactivate/{self.admin.pk}').status_code, 404)
+        self.assertEqual(self.client.post('/api/user/inactivate/999999').status_code, 404)
+
+    def test_batch_is_one_update_and_revokes_tokens(self):
+        from unittest import mock
+        from datetime import timedelta
+        from django.utils import timezone
+        from .authentication import get_tokens_for_user
+        ids = list(User.objects.filter(is_active=True).exclude(role='admin').values_list('id', flat=True))
+        with mock.patch('rest_framework_simplejwt.tokens.aware_utcnow',
+                        return_value=timezone.now() - timedelta(seconds=2)):
+            access = get_tokens_for_user(User.objects.get(pk=ids[0]))['access']
+
+        with self.assertNumQueries(5):  # savepoint, select, update, revocation update, release
+            response = self.client.post('/api/users/batch/', {'action': 'deactivate', 'ids': ids + [999999]},
+                                        format='json')
+        self.assertEqual(response.data, {'action': 'deactivate', 'count': 7, 'missing': [999999]})
+        self.assertEqual(self.client.get('/api/active-employees').data['total'], 0)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(client.get('/api/trainer-only/').status_code, 401)
+
+        response = self.client.post('/api/users/batch/', {'action': 'delete', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 400)
+        client.force_authenticate(User.objects.get(pk=ids[0]))
+        self.assertEqual(client.post('/api/users/batch/', {'action': 'activate', 'ids': ids},
+                                     format='json').status_code, 403)
+
+
+#-------------------------------------------------------------------------------#
+
+# Bulk user provisioning
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserProvisioningTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(email='taken@example.com', password='x', employee_id='T-1')
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def records(self, count, prefix='new'):
+        return [{'email': f'{prefix}{i}@example.com', 'full_name': f'New {i}', 'employee_id': f'{prefix.upper()}-{i}',
+                 'role': 'trainer', 'password': f'pw-{i}'} for i in range(count)]
+
+    def test_creates_valid_rows_and_reports_bad_ones(self):
+        from .provisioning import UserProvisioner
+        records = self.records(2) + [
+            {'email': 'taken@example.com', 'password': 'x'},
+            {'email': 'other@example.com', 'employee_id': 'T-1'},
+            {'email': 'new0@example.com'},  # repeats an earlier row
+            {'email': 'not-an-email'},
+            {'email': 'boss@example.com', 'role': 'admin'},
+            'oops',
+            {'email': 'nopass@EXAMPLE.com', 'employee_id': ''},
+        ]
+        result = UserProvisioner(workers=1).provision(records)
+        self.assertEqual((result['rows'], result['created'], result['failed']), (9, 3, 6))
+        self.assertEqual({error['line']: set(error['errors']) for error in result['errors']}, {
+            3: {'email'}, 4: {'employee_id'}, 5: {'email'}, 6: {'email'}, 7: {'role'}, 8: {'non_field_errors'},
+        })
+        self.assertTrue(User.objects.get(email='new1@example.com').check_password('pw-1'))
+        no_password = User.objects.get(email='nopass@example.com')  # the domain is normalised, as in create_user
+        self.assertFalse(no_password.has_usable_password())
+        self.assertIsNone(no_password.employee_id)
+
+    def test_query_count_does_not_depend_on_rows(self):
+        from .provisioning import UserProvisioner
+        # 2 uniqueness lookups + savepoint / insert / release per chunk
+        with self.assertNumQueries(2 * 5):
+            result = UserProvisioner(chunk_size=50, workers=1).provision(self.records(100))
+        self.assertEqual(result['created'], 100)
+
+    def test_hashes_on_a_process_pool(self):
+        from .provisioning import UserProvisioner
+        result = UserProvisioner(workers=2).provision(self.records(4))
+        self.assertEqual(result['created'], 4)
+        for i, user in enumerate(User.objects.filter(email__startswith='new').order_by('id')):
+            self.assertTrue(user.password.startswith('md5$'))
+            self.assertTrue(user.check_password(f'pw-{i}'))
+
+    def test_runs_share_the_process_pool(self):
+        from . import provisioning
+        with self.settings(PROVISION_WORKERS=2):
+            self.assertEqual(provisioning.UserProvisioner().provision(self.records(2, prefix='a'))['created'], 2)
+            pool = provisioning.shared_pool()
+            self.assertEqual(provisioning.UserProvisioner().provision(self.records(2, prefix='b'))['created'], 2)
+        self.assertIs(provisioning.shared_pool(), pool)
+        self.assertFalse(pool._shutdown_thread)
+
+    def provision(self, **kwargs):
+        # The worker thread starts on commit; tests run the job inline, with the rows the thread would get
+        from unittest import mock
+        from . import provisioning
+        with mock.patch.object(provisioning.threading, 'Thread') as thread, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/bulk/', **kwargs)
+        self.assertEqual((response.status_code, response.data['state']), (202, 'pending'))
+        # Nothing of the rows, passwords least of all, was written to the job
+        self.assertNotIn('pw', str(ProvisionJob.objects.filter(pk=response.data['id']).values().get()))
+        provisioning.run_job(*thread.call_args.kwargs['args'])
+        return self.client.get(f"/api/provision-jobs/{response.data['id']}/").data
+
+    def test_api_queues_json_and_csv_as_jobs(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        job = self.provision(data=self.records(2), format='json')
+        self.assertEqual((job['state'], job['progress'], job['created'], job['failed']), ('done', 100, 2, 0))
+        upload = SimpleUploadedFile('users.csv', b'email,full_name,contact_info,password\n'
+                                                 b'csv1@example.com,Csv One,,pw\n'
+                                                 b'csv2@example.com,Csv Two,abc,pw\n', content_type='text/csv')
+        job = self.provision(data={'file': upload}, format='multipart')
+        self.assertEqual((job['processed'], job['created']), (2, 1))
+        self.assertEqual(job['errors'][0]['line'], 3)
+        self.assertIn('contact_info', job['errors'][0]['errors'])
+        self.assertTrue(User.objects.get(email='csv1@example.com').check_password('pw'))
+
+    def test_interrupted_jobs_are_closed(self):
+        import io
+        from django.core.management import call_command
+        running = ProvisionJob.objects.create(total=3, state='running', processed=1, created=1)
+        done = ProvisionJob.objects.create(total=1, state='done', processed=1, created=1)
+        call_command('close_provision_jobs', stdout=io.StringIO())
+        running.refresh_from_db()
+        done.refresh_from_db()
+        self.assertEqual((running.state, running.processed, done.state), ('failed', 1, 'done'))
+
+    def test_api_limits(self):
+        with self.settings(PROVISION_MAX_ROWS=2):
+            self.assertEqual(self.client.post('/api/users/bulk/', self.records(3), format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/users/bulk/', [], format='json').status_code, 400)
+        client = APIClient()
+        client.force_authenticate(User.objects.get(email='taken@example.com'))
+        self.assertEqual(client.post('/api/users/bulk/', self.records(1), format='json').status_code, 403)
+        self.assertEqual(client.get('/api/provision-jobs/').status_code, 403)
+
+
+#-------------------------------------------------------------------------------#
+
+# Background subtree delete / archive
+
+class SubtreeJobTests(TestCase):
+    def setUp(self):
+        from . import subtree
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email='admin@example.com', password='x'))
+        seed_master_data('Tree', rows=2)
+        self.state = BranchState.objects.order_by('id').first()
+        self.location = BranchLocation.objects.create(name='Second Location', branch_state=self.state)
+        sub = SubLocation.objects.create(name='Second Sub', branch_state=self.state, branch_location=self.location)
+        Pincode.objects.create(pincode='765432', branch_state=self.state, branch_location=self.location, sub_location=sub)
+        self.run_job = subtree.run_job
+
+    def create_job(self, **data):
+        # The worker thread starts on commit; tests run the job inline instead
+        with self.captureOnCommitCallbacks(execute=False):
+            return self.client.post('/api/subtree-jobs/', data, format='json')
+
+    def test_delete_removes_the_subtree_in_batches(self):
+        from unittest import mock
+        from . import search
+        self.assertIn('Second Sub', [row['name'] for row in search.search('Second Sub')])
+        response = self.create_job(kind='branch-state', root_id=self.state.pk)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['state'], 'pending')
+        with mock.patch('myapp.subtree.BATCH_SIZE', 1):
+            job = self.run_job(response.data['id'])
+        # 2 pincodes, 1 inner location, 2 sublocations, 2 locations, the state
+        self.assertEqual((job.state, job.total, job.processed), ('done', 8, 8))
+        self.assertFalse(BranchState.objects.filter(pk=self.state.pk).exists())
+        self.assertEqual(Pincode.objects.count(), 1)
+        self.assertEqual(BranchInnerLocation.objects.count(), 1)
+        # The raw deletes still reach the search index through bulk_changed
+        self.assertNotIn('Second Sub', [row['name'] for row in search.search('Second Sub')])
+
+        progress = self.client.get(f"/api/subtree-jobs/{job.pk}/").data
+        self.assertEqual((progress['state'], progress['progress']), ('done', 100))
+
+    def test_archive_deactivates_without_deleting(self):
+        response = self.create_job(kind='branch-location', root_id=self.location.pk, mode='archive')
+        job = self.run_job(response.data['id'])
+        self.assertEqual((job.state, job.processed), ('done', 3))
+        self.assertFalse(BranchLocation.objects.get(pk=self.location.pk).status)
+        self.assertFalse(Pincode.objects.get(pincode='765432').status)
+        self.assertEqual(Pincode.objects.filter(status=True).count(), 2)
+
+    def test_rejects_unknown_roots_and_duplicate_jobs(self):
+        self.assertEqual(self.create_job(kind='branch-state', root_id=999).status_code, 400)
+        self.assertEqual(self.create_job(kind='branch-state', root_id=self.state.pk).status_code, 202)
+        self.assertEqual(self.create_job(kind='branch-state', root_id=self.state.pk).status_code, 400)
+        self.assertEqual(APIClient().post('/api/subtree-jobs/', {}).status_code, 401)
+
+
+#-------------------------------------------------------------------------------#
+
+# Denormalised hierarchy ids
+
+class HierarchyWriteTests(TestCase):
+    def setUp(self):
+        self.state = BranchState.objects.create(name='Write State')
+        self.other_state = BranchState.objects.create(name='Other State')
+        self.location = BranchLocation.objects.create(name='Write Location', branch_state=self.state)
+        self.sub = SubLocation.objects.create(name='Write Sub', branch_state=self.state, branch_location=self.location)
+        self.client = APIClient()
+
+    def test_pincode_from_sub_location_only(self):
+        response = self.client.post('/api/pincodes/', {'pincode': '560001', 'sub_location': self.sub.pk}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['branch_state'], self.state.pk)
+        self.assertEqual(response.json()['location_name'], 'Write Location')
+        pincode = Pincode.objects.get(pincode='560001')
+        self.assertEqual((pincode.branch_state_id, pincode.branch_location_id), (self.state.pk, self.location.pk))
+
+    def test_parents_sent_with_the_leaf_are_checked_by_id(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .serializers import PincodeSerializer
+        data = {'pincode': '560002', 'sub_location': self.sub.pk,
+                'branch_state': self.state.pk, 'branch_location': self.location.pk}
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(PincodeSerializer(data=data).is_valid())
+        # pincode uniqueness + one load per related field; no lazy parent loads
+        self.assertEqual(len(queries), 4)
+
+        response = self.client.post('/api/pincodes/', {**data, 'branch_state': self.other_state.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('branch_location', response.json())
+
+    def test_sub_location_state_is_derived(self):
+        response = self.client.post('/api/sublocations/', {'name': 'Derived', 'branch_location': self.location.pk},
+                                    format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['branch_state'], self.state.pk)
+        response = self.client.post('/api/sublocations/', {'name': 'Wrong', 'branch_location': self.location.pk,
+                                                           'branch_state': self.other_state.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_moves_propagate_to_the_denormalised_columns(self):
+        Pincode.objects.create(pincode='560003', branch_state=self.state, branch_location=self.location,
+                               sub_location=self.sub)
+        other_location = BranchLocation.objects.create(name='Other Location', branch_state=self.other_state)
+
+        response = self.client.patch(f'/api/sublocations/{self.sub.pk}/', {'branch_location': other_location.pk},
+                                     format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        pincode = Pincode.objects.get(pincode='560003')
+        self.assertEqual((pincode.branch_state_id, pincode.branch_location_id), (self.other_state.pk, other_location.pk))
+
+        response = self.client.patch(f'/api/branch-locations/{other_location.pk}/', {'branch_state': self.state.pk},
+                                     format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(SubLocation.objects.get(pk=self.sub.pk).branch_state_id, self.state.pk)
+        self.assertEqual(Pincode.objects.get(pincode='560003').branch_state_id, self.state.pk)
+        # The in-process index saw the bulk update
+        from .pincode_index import index
+        self.assertEqual(index.lookup('560003')['branch_state'], self.state.pk)
+
+
+#-------------------------------------------------------------------------------#
+
+# Delta sync
+
+class ChangesTests(TestCase):
+    def setUp(self):
+        seed_master_data('Sync', rows=2)
+        self.client = APIClient()
+
+    def sync(self, **params):
+        response = self.client.get('/api/changes/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def later(self, token, seconds=10):
+        """A token from `seconds` after `token`, past the safety margin."""
+        return str(int(token) + seconds * 1_000_000)
+
+    def test_snapshot_rows_match_the_serializers(self):
+        from rest_framework.renderers import JSONRenderer
+        from .urls import router
+        from . import changes
+        viewsets = {prefix: viewset for prefix, viewset, _ in router.registry}
+        snapshot = self.sync()['changes']
+        self.assertEqual(set(snapshot), set(changes.RESOURCES))
+        for name, (model, _) in changes.RESOURCES.items():
+            with self.subTest(resource=name):
+                expected = viewsets[name].serializer_class(model.objects.order_by('id'), many=True).data
+                self.assertEqual(JSONRenderer().render(snapshot[name]['updated']), JSONRenderer().render(expected))
+
+    def test_only_changes_since_the_token(self):
+        from unittest import mock
+        from django.utils import timezone
+        first = self.sync(resources='banks,pincodes')
+        self.assertEqual(len(first['changes']['banks']['updated']), 2)
+
+        # Writes made after the token (plus its margin) are all that comes back
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timezone.timedelta(seconds=30)):
+            Bank.objects.create(bank_name='New Bank')
+            Bank.objects.filter(bank_name='Sync Bank 0').delete()
+            pincode = Pincode.objects.first()
+            self.client.post('/api/pincodes/batch/', {'action': 'deactivate', 'ids': [pincode.pk]}, format='json')
+        token = self.later(first['token'])
+        delta = self.sync(since=token, resources='banks,pincodes')['changes']
+        self.assertEqual([row['bank_name'] for row in delta['banks']['updated']], ['New Bank'])
+        self.assertEqual(len(delta['banks']['deleted']), 1)
+        self.assertEqual([(row['id'], row['status']) for row in delta['pincodes']['updated']], [(pincode.pk, False)])
+        self.assertEqual(delta['pincodes']['deleted'], [])
+
+    def test_cascades_and_subtree_jobs_leave_tombstones(self):
+        from .models import Tombstone
+        from .subtree import run_job
+        state = BranchState.objects.order_by('id').first()
+        pincodes = list(Pincode.objects.filter(branch_state=state).values_list('id', flat=True))
+        BranchState.objects.filter(pk=state.pk).delete()
+        self.assertEqual(set(Tombstone.objects.filter(model='myapp.pincode').values_list('object_id', flat=True)),
+                         set(pincodes))
+
+        other = BranchState.objects.order_by('id').first()
+        admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=False):
+            job = self.client.post('/api/subtree-jobs/', {'kind': 'branch-state', 'root_id': other.pk}).json()
+        run_job(job['id'])
+        self.assertTrue(Tombstone.objects.filter(model='myapp.branchstate', object_id=other.pk).exists())
+        self.assertEqual(Tombstone.objects.filter(model='myapp.pincode').count(), 2)
+
+    def test_bad_and_expired_tokens(self):
+        self.assertEqual(self.client.get('/api/changes/?since=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/api/changes/?resources=users').status_code, 400)
+        response = self.client.get('/api/changes/?since=1000000')
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()['reset'])
+
+    def test_prune(self):
+        import io
+        from datetime import timedelta
+        from django.core.management import call_command
+        from .models import Tombstone
+        Bank.objects.filter(bank_name='Sync Bank 0').delete()
+        Tombstone.objects.update(deleted_at=Tombstone.objects.get().deleted_at - timedelta(days=31))
+        Bank.objects.filter(bank_name='Sync Bank 1').delete()
+        call_command('prune_tombstones', stdout=io.StringIO())
+        self.assertEqual(Tombstone.objects.count(), 1)
+
+
+#-------------------------------------------------------------------------------#
+
+# Change events (SSE)
+
+class ChangeEventTests(TestCase):
+    def events(self):
+        from .models import ChangeEvent
+        return list(ChangeEvent.objects.order_by('id').values_list('model', 'operation', 'fields'))
+
+    def test_writes_are_recorded_with_their_fields(self):
+        client = APIClient()
+        bank = client.post('/api/banks/', {'bank_name': 'Event Bank'}, format='json').json()
+        client.patch(f"/api/banks/{bank['id']}/", {'bank_name': 'Renamed Bank'}, format='json')
+        client.patch(f"/api/banks/{bank['id']}/", {'bank_name': 'Renamed Bank'}, format='json')  # no change
+        client.post('/api/banks/batch/', {'action': 'deactivate', 'ids': [bank['id']]}, format='json')
+        Bank.objects.get(pk=bank['id']).delete()  # inactive banks are outside BankViewSet's queryset
+        self.assertEqual(self.events(), [
+            ('myapp.bank', 'create', None),
+            ('myapp.bank', 'update', ['bank_name']),
+            ('myapp.bank', 'update', ['status']),
+            ('myapp.bank', 'delete', None),
+        ])
+
+    def test_stream_replays_missed_events_then_pushes_new_ones(self):
+        import asyncio
+        from asgiref.sync import async_to_sync, sync_to_async
+        from django.test import AsyncClient
+        from .models import ChangeEvent
+
+        Bank.objects.create(bank_name='Before Bank')
+        BranchState.objects.create(name='Filtered State')
+        missed = ChangeEvent.objects.order_by('id').first().pk - 1
+
+        async def scenario():
+            response = await AsyncClient().get('/api/events/?resources=banks', headers={'Last-Event-ID': str(missed)})
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            chunks = aiter(response.streaming_content)
+            received = [await anext(chunks), await anext(chunks)]
+            await sync_to_async(Bank.objects.create)(bank_name='Live Bank')
+            received.append(await asyncio.wait_for(anext(chunks), timeout=5))
+            await chunks.aclose()
+            return [chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in received]
+
+        with self.settings(EVENTS_POLL_INTERVAL=0.01):
+            retry, replayed, live = async_to_sync(scenario)()
+        self.assertTrue(retry.startswith('retry:'))
+        self.assertIn('"model":"banks"', replayed)
+        self.assertIn('"operation":"create"', replayed)
+        self.assertIn('event: change', live)
+        self.assertEqual(live.split('\n')[0], f"id: {ChangeEvent.objects.order_by('-id').first().pk}")
+
+    def test_too_large_backlog_resets(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        for i in range(3):
+            Bank.objects.create(bank_name=f'Backlog Bank {i}')
+
+        async def scenario():
+            response = await AsyncClient().get('/api/events/', headers={'Last-Event-ID': '0'})
+            chunks = aiter(response.streaming_content)
+            received = [await anext(chunks), await anext(chunks)]
+            await chunks.aclose()
+            return received[1].decode() if isinstance(received[1], bytes) else received[1]
+
+        with self.settings(EVENTS_MAX_BACKLOG=2):
+            self.assertIn('event: reset', async_to_sync(scenario)())
+
+    def test_poller_starts_where_its_first_subscriber_does(self):
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from .events import Broadcaster
+        from .models import ChangeEvent
+        Bank.objects.create(bank_name='Between Bank')  # committed after the subscriber read its position
+        event = ChangeEvent.objects.get()
+
+        async def scenario():
+            hub = Broadcaster()
+            queue, position = hub.subscribe(event.pk - 1)
+            rows = await asyncio.wait_for(queue.get(), timeout=5)
+            hub.unsubscribe(queue)
+            return position, rows
+
+        with self.settings(EVENTS_POLL_INTERVAL=0.01):
+            position, rows = async_to_sync(scenario)()
+        self.assertEqual(position, event.pk - 1)
+        self.assertEqual([row['id'] for row in rows], [event.pk])
+
+    def test_slow_subscribers_are_dropped(self):
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from .events import Broadcaster
+
+        async def scenario():
+            hub = Broadcaster()
+            hub.task = asyncio.get_running_loop().create_future()  # no poller
+            queue, _ = hub.subscribe(0)
+            for batch in ([{'id': 1}], [{'id': 2}], [{'id': 3}]):
+                hub._put(queue, batch)
+            return hub.queues, queue.qsize(), queue.get_nowait()
+
+        with self.settings(EVENTS_QUEUE_SIZE=2):
+            queues, size, item = async_to_sync(scenario)()
+        self.assertEqual((queues, size, item), (set(), 1, None))
+
+    def test_wsgi_and_bad_requests(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        self.assertEqual(self.client.get('/api/events/').status_code, 501)
+        self.assertEqual(async_to_sync(AsyncClient().get)('/api/events/?resources=users').status_code, 400)
+
+
+#-------------------------------------------------------------------------------#
+
+# Async read path
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        seed_master_data('Async', rows=3)
+        Bank.objects.create(bank_name='Closed Bank', status=False)
+
+    def assertSameAsSync(self, path):
+        sync = self.client.get(f'/api/{path}')
+        response = self.async_get(f'/api/async/{path}')
+        self.assertEqual(response.status_code, sync.status_code)
+        self.assertEqual(response.content, sync.content)
+        return response
+
+    def async_get(self, path):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        return async_to_sync(AsyncClient().get)(path)
+
+    def test_lists_are_byte_identical(self):
+        state = BranchState.objects.order_by('id').first()
+        self.assertSameAsSync('branch-states/')
+        self.assertSameAsSync('banks/')
+        self.assertSameAsSync('pincodes/')
+        self.assertSameAsSync(f'pincodes/?branch_state={state.pk}&status=1')
+
+    def test_retrieve_is_byte_identical(self):
+        self.assertSameAsSync(f'pincodes/{Pincode.objects.first().pk}/')
+        self.assertSameAsSync(f'branch-states/{BranchState.objects.first().pk}/')
+        self.assertSameAsSync('branch-states/999999/')
+        closed = Bank.objects.get(bank_name='Closed Bank')
+        self.assertEqual(self.async_get(f'/api/async/banks/{closed.pk}/').status_code, 404)
+
+    def test_unknown_resource(self):
+        self.assertEqual(self.async_get('/api/async/users/').status_code, 404)
+
+
+class RepresentationListTests(TestCase):
+    def setUp(self):
+        seed_master_data('Repr', rows=3)
+        BranchInnerLocation.objects.create(name='Unplaced', branch_inner_state=BranchInnerState.objects.first())
+        User.objects.create(email='full@example.com', full_name='Full Name', employee_id='E-1', contact_info=9876543210)
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def serializer_output(self, serializer_class, queryset):
+        from rest_framework.renderers import JSONRenderer
+        return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+    def test_lists_are_byte_identical(self):
+        from . import serializers
+        cases = {
+            '/api/pincodes/': (serializers.PincodeSerializer, Pincode.objects.all()),
+            '/api/sublocations/': (serializers.SubLocationSerializer, SubLocation.objects.all()),
+            '/api/branch-inner-locations/': (serializers.BranchInnerLocationSerializer, BranchInnerLocation.objects.all()),
+            '/api/designations/': (serializers.DesignationSerializer, Designation.objects.all()),
+            '/api/users/': (serializers.UserSerializer, User.objects.exclude(role='admin')),
+        }
+        for path, (serializer_class, queryset) in cases.items():
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, self.serializer_output(serializer_class, queryset))
+
+    def test_null_relation_name_is_omitted(self):
+        unplaced = next(row for row in self.client.get('/api/branch-inner-locations/').json() if row['name'] == 'Unplaced')
+        self.assertIsNone(unplaced['branch_location'])
+        self.assertNotIn('branch_location_name', unplaced)
+
+    def test_filtered_and_paginated_lists(self):
+        from . import serializers
+        state = BranchState.objects.order_by('id').first()
+        response = self.client.get(f'/api/sublocations/?branch_state={state.pk}')
+        self.assertEqual(response.content, self.serializer_output(
+            serializers.SubLocationSerializer, SubLocation.objects.filter(branch_state=state)))
+
+        first = self.client.get('/api/pincodes/?page_size=2').json()
+        second = self.client.get(first['next']).json()
+        expected = serializers.PincodeSerializer(Pincode.objects.order_by('-created_at', '-id'), many=True).data
+        self.assertEqual(first['results'] + second['results'], [dict(row) for row in expected])
+
+
+#-------------------------------------------------------------------------------#
+
+# Performance instrumentation
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        from . import metrics
+        metrics.registry.reset()
+        seed_master_data('Perf', rows=2)
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def timings(self, response):
+        parts = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            parts[name] = dict(param.split('=', 1) for param in params)
+        return parts
+
+    def test_server_timing_header(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/branch-locations/')
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'serialize', 'render', 'view', 'total'})
+        self.assertEqual(timings['db']['desc'], f'"{len(queries)} queries"')
+        self.assertGreater(float(timings['serialize']['dur']), 0)
+        self.assertGreaterEqual(float(timings['total']['dur']), float(timings['db']['dur']))
+
+    def test_async_requests_stay_on_the_event_loop(self):
+        import asyncio
+        from unittest import mock
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        from . import metrics, profiling
+
+        def on_loop():
+            try:
+                return asyncio.get_running_loop() is not None
+            except RuntimeError:
+                return False
+
+        threads = []
+        observe = metrics.registry.observe
+        requested_mode = profiling.requested_mode
+        # The outermost and innermost middleware both run on the loop, so nothing between them left it
+        with mock.patch.object(metrics.registry, 'observe',
+                               side_effect=lambda *args: threads.append(on_loop()) or observe(*args)), \
+                mock.patch.object(profiling, 'requested_mode',
+                                  side_effect=lambda *args: threads.append(on_loop()) or requested_mode(*args)):
+            response = async_to_sync(AsyncClient().get)('/api/async/banks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(threads, [True, True])
+        # The async ORM queried on another thread; its queries are still timed
+        self.assertNotEqual(self.timings(response)['db']['desc'], '"0 queries"')
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/banks/')
+        self.client.get('/api/banks/')
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('api_requests_total{endpoint="bank-list",method="GET",status="200"} 2', text)
+        self.assertIn('api_request_duration_seconds_bucket{endpoint="bank-list",method="GET",le="+Inf"} 2', text)
+        self.assertIn('api_request_duration_seconds_count{endpoint="bank-list",method="GET"} 2', text)
+
+    def test_metrics_are_admin_only(self):
+        self.assertEqual(APIClient().get('/api/metrics/').status_code, 401)
+        client = APIClient()
+        client.force_authenticate(User.objects.get(email='perf0@example.com'))
+        self.assertEqual(client.get('/api/metrics/').status_code, 403)
+
+    def test_slow_requests_are_logged(self):
+        with self.settings(PERFORMANCE_SLOW_REQUEST_MS=0), self.assertLogs('myapp.performance', 'WARNING') as logs:
+            self.client.get('/api/pincodes/')
+        self.assertIn('GET /api/pincodes/ -> 200', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        from .authentication import get_tokens_for_user
+        seed_master_data('Prof', rows=2)
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(self.admin)['access']}")
+
+    def test_cprofile_report(self):
+        response = self.client.get('/api/pincodes/?profile=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        report = self.client.get(f"/api/profiles/{response['X-Profile-Id']}/").json()
+        self.assertEqual(report['mode'], 'cprofile')
+        self.assertEqual(report['path'], '/api/pincodes/?profile=1')
+        self.assertIn('function calls', report['summary'])
+
+        raw = self.client.get(f"/api/profiles/{response['X-Profile-Id']}/?download=pstats")
+        self.assertEqual(raw['Content-Type'], 'application/octet-stream')
+        self.assertEqual(self.client.get(f"/api/profiles/{response['X-Profile-Id']}/?download=collapsed").status_code, 400)
+
+    def test_sampling_report(self):
+        import time
+        from unittest import mock
+        with mock.patch('myapp.views.search.search', side_effect=lambda *args: time.sleep(0.05) or []):
+            response = self.client.get('/api/search/?q=prof', HTTP_X_PROFILE='sample')
+        profile_id = response['X-Profile-Id']
+        self.assertIn('samples every', self.client.get(f'/api/profiles/{profile_id}/').json()['summary'])
+        collapsed = self.client.get(f'/api/profiles/{profile_id}/?download=collapsed').content.decode()
+        self.assertIn('SearchView.get', collapsed)
+
+    def test_only_admins_are_profiled(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(email='prof0@example.com'))
+        self.assertNotIn('X-Profile-Id', client.get('/api/pincodes/?profile=1'))
+        self.assertNotIn('X-Profile-Id', APIClient().get('/api/location-hierarchy/?profile=1'))
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/pincodes/'))
+        self.assertEqual(self.client.get('/api/profiles/missing/').status_code, 404)
+
+    def test_async_requests_are_profiled_on_the_event_loop(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        headers = {'Authorization': self.client._credentials['HTTP_AUTHORIZATION']}
+        response = async_to_sync(AsyncClient().get)('/api/async/pincodes/?profile=1', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        report = self.client.get(f"/api/profiles/{response['X-Profile-Id']}/").json()
+        self.assertEqual(report['path'], '/api/async/pincodes/?profile=1')
+        self.assertIn('list_view', report['summary'])
+
+    def test_reports_are_shared_through_the_database(self):
+        from django.core.cache import cache
+        from .models import ProfileReport
+        profile_id = self.client.get('/api/pincodes/?profile=1')['X-Profile-Id']
+        cache.clear()  # another worker's cache is empty
+        self.assertEqual(self.client.get(f'/api/profiles/{profile_id}/').status_code, 200)
+
+        with self.settings(PROFILE_TTL=0):
+            self.assertEqual(self.client.get(f'/api/profiles/{profile_id}/').status_code, 404)
+            self.client.get('/api/pincodes/?profile=1')
+        self.assertFalse(ProfileReport.objects.filter(pk=profile_id).exists())
+
+    def test_concurrency_cap(self):
+        with self.settings(PROFILE_MAX_CONCURRENT=0):
+            response = self.client.get('/api/pincodes/?profile=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Profile'], 'busy')
+        self.assertNotIn('X-Profile-Id', response)
+
+
+#-------------------------------------------------------------------------------#
+
+# Renderers / parsers
+
+class RendererTests(TestCase):
+    def payload(self):
+        import datetime
+        import decimal
+        import uuid
+        from django.utils import timezone
+        from django.utils.translation import gettext_lazy
+        return {
+            'aware': timezone.now().replace(microsecond=123456),
+            'naive': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901),
+            'date': datetime.date(2024, 1, 2),
+            'time': datetime.time(10, 30, 15, 250000),
+            'duration': datetime.timedelta(minutes=5),
+            'decimal': decimal.Decimal('12.50'),
+            'lazy': gettext_lazy('Not found.'),
+            'uuid': uuid.UUID(int=1),
+            'separators': 'a\u2028b\u2029c',
+            'unicode': 'Bengaluru – ಬೆಂಗಳೂರು',
+            'nested': ({'n': 1}, [None, True, 1.5]),
+            7: 'int key',
+            'huge': 2 ** 70,
+        }
+
+    def test_same_bytes_as_drf(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = self.payload()
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        del data['huge']  # without the 64-bit fallback
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_floats_written_with_an_exponent(self):
+        import decimal
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = {'small': 1e-07, 'tiny': 0.00001, 'large': 1e16, 'decimal': decimal.Decimal('1E-7'),
+                'plain': [1.5, 0.0001, 123456789.25], 'text': 'rate 2e-3'}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b'1e-07', FastJSONRenderer().render(data))
+
+    def test_non_finite_numbers_are_refused_like_drf(self):
+        import decimal
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        for value in (float('nan'), float('inf'), decimal.Decimal('NaN')):
+            with self.subTest(value=value):
+                data = {'rows': [{'value': value, 'other': None}]}
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render(data)
+
+    def test_wide_integers_are_parsed_exactly(self):
+        import io
+        from .renderers import FastJSONParser
+        body = b'{"contact_info": 123456789012345678901234, "small": 12}'
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)),
+                         {'contact_info': 123456789012345678901234, 'small': 12})
+
+    def test_indent_uses_drf(self):
+        from .renderers import FastJSONRenderer
+        content = FastJSONRenderer().render({'a': 1}, 'application/json; indent=2', {})
+        self.assertEqual(content, b'{\n  "a": 1\n}')
+
+    def test_parser(self):
+        client = APIClient()
+        response = client.post('/api/branch-states/', data='{"name": "Parsed \\u2013 State"}',
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(BranchState.objects.get(pk=response.json()['id']).name, 'Parsed – State')
+
+        response = client.post('/api/branch-states/', data='{"name": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+    def test_msgpack(self):
+        from . import renderers
+        if renderers.msgpack is None:
+            self.skipTest('msgpack is not installed')
+        BranchState.objects.create(name='Packed State')
+        response = APIClient().get('/api/branch-states/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content)[0]['name'], 'Packed State')
+        self.assertIsInstance(renderers.MessagePackRenderer().render(self.payload() | {7: 'x', 'huge': 1}), bytes)
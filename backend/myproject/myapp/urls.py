@@ -1,6 +1,7 @@
-from django.urls import path,include
-from .views import LoginView, UserManagementView , TrainerOnlyView, TraineeOnlyView  ,DepartmentViewSet ,DesignationViewSet ,BranchStateViewSet ,BranchLocationViewSet,SubLocationViewSet, PincodeViewSet, BranchInnerStateViewSet, BranchInnerLocationViewSet, BankViewSet,TypeOfAccountViewSet
+from django.urls import path, re_path, include
+from .views import LoginView, TokenRefreshView, ChangesView, UserManagementView, UserProvisionView, EmployeeListView, EmployeeStatusView, EmployeeBatchView, ExportView, LocationHierarchyView, MetricsView, ProfileView, SearchView, TrainerOnlyView, TraineeOnlyView  ,DepartmentViewSet ,DesignationViewSet ,BranchStateViewSet ,BranchLocationViewSet,SubLocationViewSet, PincodeViewSet, BranchInnerStateViewSet, BranchInnerLocationViewSet, BankViewSet,TypeOfAccountViewSet, SubtreeJobViewSet, ProvisionJobViewSet
 from rest_framework.routers import DefaultRouter
+from . import async_views
 
 
 
@@ -16,6 +17,8 @@ router.register(r'branch-inner-states', BranchInnerStateViewSet)
 router.register(r'branch-inner-locations', BranchInnerLocationViewSet)
 router.register(r'banks', BankViewSet)
 router.register(r'typeofaccounts', TypeOfAccountViewSet)
+router.register(r'subtree-jobs', SubtreeJobViewSet)
+router.register(r'provision-jobs', ProvisionJobViewSet)
 
 
 
@@ -23,9 +26,27 @@ router.register(r'typeofaccounts', TypeOfAccountViewSet)
 
 urlpatterns = [
     path("login/", LoginView.as_view(), name="login"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
     path("users/", UserManagementView.as_view(), name="users"),           # GET, POST
     path("users/<int:pk>/", UserManagementView.as_view(), name="user-crud"),  # PUT, DELETE
+    path("users/bulk/", UserProvisionView.as_view(), name="user-provision"),  # JSON list or CSV `file`; 202 + job
+    path("users/batch/", EmployeeBatchView.as_view(), name="user-batch"),  # {"action": "activate", "ids": [...]}
+    # Employee directory; the dashboard calls these without a trailing slash
+    re_path(r"^active-employees/?$", EmployeeListView.as_view(is_active=True), name="active-employees"),
+    re_path(r"^inactive-employees/?$", EmployeeListView.as_view(is_active=False), name="inactive-employees"),
+    re_path(r"^user/(?P<action>activate|inactivate)/(?P<pk>[0-9]+)/?$", EmployeeStatusView.as_view(),
+            name="user-status"),
     path("trainer-only/", TrainerOnlyView.as_view(), name="trainer-only"),
     path("trainee-only/", TraineeOnlyView.as_view(), name="trainee-only"),
+    path("exports/<slug:resource>.<slug:fmt>", ExportView.as_view(), name="export"),  # e.g. exports/pincodes.csv
+    path("location-hierarchy/", LocationHierarchyView.as_view(), name="location-hierarchy"),  # ?state=<id>
+    path("search/", SearchView.as_view(), name="search"),  # ?q=&types=bank,sublocation&limit=
+    path("changes/", ChangesView.as_view(), name="changes"),  # ?since=<token>&resources=pincodes,banks
+    path("metrics/", MetricsView.as_view(), name="metrics"),  # Prometheus scrape target, admin only
+    path("profiles/<str:profile_id>/", ProfileView.as_view(), name="profile"),  # from X-Profile-Id
+    # Async (ASGI) read path for branch-states, banks and pincodes
+    path("async/<slug:resource>/", async_views.list_view, name="async-list"),
+    path("async/<slug:resource>/<int:pk>/", async_views.detail_view, name="async-detail"),
+    path("events/", async_views.events_view, name="events"),  # SSE change feed, ?resources=banks,pincodes
     path('', include(router.urls)),
 ]
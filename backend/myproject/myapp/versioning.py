@@ -0,0 +1,110 @@
+import threading
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    TableVersion, Department, Designation, BranchState, BranchLocation, SubLocation, Pincode,
+    BranchInnerState, Bank, TypeOfAccount,
+)
+
+
+# Tables whose writes are counted. Readers compare versions instead of scanning rows.
+VERSIONED_MODELS = (
+    Department, Designation, BranchState, BranchLocation, SubLocation, Pincode, BranchInnerState, Bank,
+    TypeOfAccount,
+)
+
+
+def bump(model):
+    """
+    Record a write to `model`'s table: one UPDATE, in the writer's own transaction.
+    Returns the version this write produced.
+    """
+    label, now = model._meta.label_lower, timezone.now()
+    version = _increment(label, now)
+    if version is not None:
+        return version
+    try:
+        with transaction.atomic():
+            TableVersion.objects.create(label=label, version=1, modified_at=now)
+            return 1
+    except IntegrityError:
+        # Another writer created the row first
+        return _increment(label, now)
+
+
+def _increment(label, now):
+    if connection.vendor in ('sqlite', 'postgresql'):
+        # UPDATE ... RETURNING: the new version without a second query
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {quote(TableVersion._meta.db_table)} SET version = version + 1, modified_at = %s '
+                f'WHERE label = %s RETURNING version',
+                [connection.ops.adapt_datetimefield_value(now), label],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    rows = TableVersion.objects.filter(label=label)
+    if rows.update(version=F('version') + 1, modified_at=now):
+        return rows.values_list('version', flat=True).get()
+    return None
+
+
+def current(model):
+    """(version, modified_at) of `model`'s table, or (0, None) if it was never written."""
+    row = TableVersion.objects.filter(label=model._meta.label_lower).values_list('version', 'modified_at').first()
+    return row or (0, None)
+
+
+def current_many(models):
+    """{label: (version, modified_at)} of several tables in one query; (0, None) for tables never written."""
+    labels = [model._meta.label_lower for model in models]
+    rows = {label: (version, modified_at) for label, version, modified_at in
+            TableVersion.objects.filter(label__in=labels).values_list('label', 'version', 'modified_at')}
+    return {label: rows.get(label, (0, None)) for label in labels}
+
+
+class VersionWatch:
+    """
+    Tells a process's own writes to a set of tables apart from everybody else's,
+    for the in-process caches built from those tables.
+
+    Writers report the version their bump produced once it has committed
+    (`written`). `changed()` reads the current versions and names the tables
+    with a version since the last check that no local write accounts for, or
+    whose version went backwards (a rolled-back test database).
+    """
+
+    def __init__(self, models):
+        self.labels = [model._meta.label_lower for model in models]
+        self._lock = threading.Lock()
+        self._seen = None
+        self._local = {label: set() for label in self.labels}
+
+    def written(self, model, version):
+        label = model._meta.label_lower
+        if label in self._local:
+            with self._lock:
+                self._local[label].add(version)
+
+    def changed(self):
+        """Labels written by another process since the last call (none on the first call)."""
+        rows = dict(TableVersion.objects.filter(label__in=self.labels).values_list('label', 'version'))
+        versions = {label: rows.get(label, 0) for label in self.labels}
+        with self._lock:
+            seen, self._seen = self._seen, versions
+            changed = set()
+            for label in self.labels:
+                local = self._local[label]
+                if seen is not None and (versions[label] < seen[label] or any(
+                        version not in local for version in range(seen[label] + 1, versions[label] + 1))):
+                    changed.add(label)
+                self._local[label] = {version for version in local if version > versions[label]}
+        return changed
+
+    def reset(self):
+        with self._lock:
+            self._seen = None
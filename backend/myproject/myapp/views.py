@@ -1,58 +1,76 @@
+import csv
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions,viewsets, generics
+from rest_framework import status, permissions,viewsets, generics, mixins
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
-from .models import  User, Department,Designation,BranchState,BranchLocation,SubLocation, Pincode,BranchInnerState, BranchInnerLocation , Bank, TypeOfAccount
-from .serializers import UserSerializer,DepartmentSerializer,DesignationSerializer,BranchStateSerializer,BranchLocationSerializer,SubLocationSerializer, PincodeSerializer,BranchInnerStateSerializer, BranchInnerLocationSerializer , BankSerializer, TypeOfAccountSerializer
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from .models import  User, Department,Designation,BranchState,BranchLocation,SubLocation, Pincode,BranchInnerState, BranchInnerLocation , Bank, TypeOfAccount, SubtreeJob, ProvisionJob
+from .serializers import UserSerializer, UserBatchSerializer,DepartmentSerializer,DesignationSerializer,BranchStateSerializer,BranchLocationSerializer,SubLocationSerializer, PincodeSerializer,BranchInnerStateSerializer, BranchInnerLocationSerializer , BankSerializer, TypeOfAccountSerializer, SubtreeJobSerializer, ProvisionJobSerializer
 from .permissions import IsTrainer, IsTrainee
+from .authentication import add_claims, get_tokens_for_user, is_revoked
+from .importers import PincodeImporter
+from .exports import EXPORTS, ADMIN_ONLY_EXPORTS, FORMATS, export_rows
+from . import changes, employees, hierarchy, metrics, profiling, provisioning, representations, search, subtree
+from .mixins import BatchActionMixin, ConditionalGetMixin, RepresentationListMixin
+from .pagination import PageLimitPagination
+from .pincode_index import index as pincode_index
+from .reference_cache import cache as reference_cache
 
 
 #here im defining the views
 from rest_framework.viewsets import ModelViewSet
 
-# Utility: generate JWT tokens
-def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
-    return {
-        'refresh': str(refresh),
-        'access': str(refresh.access_token),
-        'role': user.role
-    }
-
 # 🔹 Login View
 class LoginView(APIView):
+    authentication_classes = []  # a stale Authorization header must not block signing in
+
     def post(self, request):
         email = request.data.get("email")
         password = request.data.get("password")
 
-        # First check: Admin superuser
+        # One lookup and one password check. Superusers may sign in even when
+        # inactive; everyone else must be active.
+        user = User.objects.filter(email=email).first() if email else None
+        if user is None:
+            User().set_password(password)  # spend the same hashing time as a wrong password
+        elif user.check_password(password) and (user.is_active or user.is_superuser):
+            return Response(get_tokens_for_user(user), status=status.HTTP_200_OK)
+
+        return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+# 🔹 New access token from a refresh token, with the user's current role and flags
+class TokenRefreshView(APIView):
+    authentication_classes = []
+
+    def post(self, request):
         try:
-            admin_user = User.objects.get(email=email, is_superuser=True)
-            if admin_user.check_password(password):
-                tokens = get_tokens_for_user(admin_user)
-                return Response(tokens, status=status.HTTP_200_OK)
-        except User.DoesNotExist:
-            pass
+            refresh = RefreshToken(request.data.get("refresh"))
+        except TokenError:
+            return Response({"error": "Invalid or expired refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        # Next check: Trainer/Trainee
-        user = authenticate(request, email=email, password=password)
-        if user:
-            tokens = get_tokens_for_user(user)
-            return Response(tokens, status=status.HTTP_200_OK)
+        user = User.objects.filter(pk=refresh[jwt_settings.USER_ID_CLAIM]).first()
+        if user is None or not (user.is_active or user.is_superuser) or is_revoked(refresh, user):
+            return Response({"error": "Invalid or expired refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+        access = add_claims(refresh.access_token, user)
+        return Response({"access": str(access), "role": user.role}, status=status.HTTP_200_OK)
 
 
 # 🔹 Admin-only CRUD for Trainers & Trainees
 class UserManagementView(APIView):
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
 
-    # GET → List all non-admin users
+    # GET → List all non-admin users (same JSON as UserSerializer, without building the objects)
     def get(self, request):
         users = User.objects.exclude(role='admin')
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        return Response(representations.USER.render(representations.USER.rows(users)))
 
     # POST → Create Trainer/Trainee
     def post(self, request):
@@ -96,6 +114,92 @@ class UserManagementView(APIView):
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
 
+# 🔹 Bulk provisioning of trainers / trainees: a JSON list of users, or a CSV upload (`file`).
+# Answers 202 with a job at once; GET /api/provision-jobs/<id>/ for progress and per-row errors.
+class UserProvisionView(APIView):
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def post(self, request):
+        limit = getattr(settings, 'PROVISION_MAX_ROWS', 5000)
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                rows = list(provisioning.read_csv(upload))
+            except (UnicodeDecodeError, csv.Error) as exc:
+                return Response({"error": f"Unreadable CSV: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            records = request.data.get('users') if isinstance(request.data, dict) else request.data
+            if not isinstance(records, list) or not records:
+                return Response({"error": "Send a non-empty list of users, or a CSV in the 'file' field"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            rows = list(enumerate(records, start=1))
+        if len(rows) > limit:
+            return Response({"error": f"At most {limit} users per request; use the provision_users command"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # The rows (plaintext passwords included) go to the worker thread only, never to the database
+        job = ProvisionJob.objects.create(total=len(rows))
+        provisioning.start(job, rows)
+        return Response(ProvisionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+# 🔹 Employee directory: active / inactive non-admin users, ?page=&limit=&search=&role=
+class EmployeeListView(RepresentationListMixin, generics.ListAPIView):
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+    pagination_class = PageLimitPagination
+    list_representation = representations.USER
+    is_active = True
+
+    def get_queryset(self):
+        role = self.request.query_params.get('role')
+        return employees.directory(
+            self.is_active,
+            role=role if role in employees.DIRECTORY_ROLES else None,
+            search=self.request.query_params.get('search'),
+        )
+
+
+# 🔹 Activate / inactivate one employee (POST user/activate/<id>, user/inactivate/<id>)
+class EmployeeStatusView(APIView):
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def post(self, request, action, pk):
+        active, pk = action == 'activate', int(pk)
+        _, missing = employees.set_active([pk], active)
+        if missing:
+            return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"id": pk, "is_active": active}, status=status.HTTP_200_OK)
+
+
+# 🔹 Activate / deactivate many employees with one UPDATE: {"action": ..., "ids": [...]}
+class EmployeeBatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+    batch_max_size = 1000
+
+    def post(self, request):
+        serializer = UserBatchSerializer(data=request.data, context={'max_size': self.batch_max_size})
+        serializer.is_valid(raise_exception=True)
+        operation, ids = serializer.validated_data['action'], serializer.validated_data['ids']
+        changed, missing = employees.set_active(ids, operation == 'activate')
+        return Response({'action': operation, 'count': len(changed), 'missing': missing}, status=status.HTTP_200_OK)
+
+
+# 🔹 Streaming export (CSV / NDJSON) of the large tables
+class ExportView(APIView):
+    def get_permissions(self):
+        if self.kwargs.get('resource') in ADMIN_ONLY_EXPORTS:
+            return [permissions.IsAuthenticated(), permissions.IsAdminUser()]
+        return super().get_permissions()
+
+    def get(self, request, resource, fmt):
+        if resource not in EXPORTS or fmt not in FORMATS:
+            return Response({"error": "Unknown export"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(export_rows(resource, fmt), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{resource}.{fmt}"'
+        return response
+
+
 # 🔹 Trainer-only API example
 class TrainerOnlyView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsTrainer]
@@ -117,15 +221,16 @@ class TraineeOnlyView(APIView):
 # --------------------------------------------------------------------------
 
 
-class DepartmentViewSet(ModelViewSet):
+class DepartmentViewSet(BatchActionMixin, ConditionalGetMixin, ModelViewSet):
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
 
 
 
-class DesignationViewSet(ModelViewSet):
-    queryset = Designation.objects.all()
+class DesignationViewSet(BatchActionMixin, RepresentationListMixin, ModelViewSet):
+    queryset = Designation.objects.select_related('department')
     serializer_class = DesignationSerializer
+    list_representation = representations.DESIGNATION
     permission_classes = [permissions.AllowAny]  # Allow public access for now
     
     def create(self, request, *args, **kwargs):
@@ -139,13 +244,13 @@ class DesignationViewSet(ModelViewSet):
             )
 
 
-class BranchStateViewSet(ModelViewSet):
+class BranchStateViewSet(BatchActionMixin, ConditionalGetMixin, ModelViewSet):
     queryset = BranchState.objects.all()
     serializer_class = BranchStateSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class BranchLocationViewSet(ModelViewSet):
+class BranchLocationViewSet(BatchActionMixin, ModelViewSet):
     queryset = BranchLocation.objects.all()
     serializer_class = BranchLocationSerializer
     permission_classes = [permissions.AllowAny]
@@ -165,13 +270,15 @@ class BranchLocationViewSet(ModelViewSet):
 
 # SubLocation ViewSet
 
-class SubLocationViewSet(viewsets.ModelViewSet):
+class SubLocationViewSet(BatchActionMixin, RepresentationListMixin, viewsets.ModelViewSet):
     queryset = SubLocation.objects.all()
     serializer_class = SubLocationSerializer
+    list_representation = representations.SUB_LOCATION
     # permission_classes = [IsAuthenticated]  # Uncomment if you need authentication
     
     def get_queryset(self):
-        queryset = SubLocation.objects.all()
+        # Join the relations behind branch_state_name / branch_location_name
+        queryset = SubLocation.objects.select_related('branch_state', 'branch_location')
         
         # Filter by branch_state if provided
         branch_state = self.request.query_params.get('branch_state')
@@ -197,20 +304,135 @@ class SubLocationByLocationView(generics.ListAPIView):
     
     def get_queryset(self):
         location_id = self.kwargs['location_id']
-        return SubLocation.objects.filter(branch_location=location_id, status=True)
+        return SubLocation.objects.select_related('branch_state', 'branch_location').filter(
+            branch_location=location_id, status=True
+        )
 
 
-class BranchInnerStateViewSet(ModelViewSet):
+# Ranked, typo-tolerant name search over sublocations, locations, inner locations, banks and designations
+class SearchView(APIView):
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        kinds = [kind for kind in request.query_params.get('types', '').split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in search.SEARCH_MODELS]
+        if unknown:
+            return Response(
+                {"error": f"Unknown type(s): {', '.join(unknown)}. Choose from {', '.join(search.SEARCH_MODELS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        include_inactive = request.query_params.get('include_inactive', '').lower() in ('1', 'true', 'yes')
+        return Response(search.search(query, kinds or None, limit, include_inactive))
+
+
+# Rows of the master tables changed or deleted since a token, for clients that keep a local copy.
+# ?since=<token from the last response>&resources=pincodes,banks (default: all); see changes.py
+class ChangesView(APIView):
+    def get(self, request):
+        resources = [name for name in request.query_params.get('resources', '').split(',') if name]
+        unknown = [name for name in resources if name not in changes.RESOURCES]
+        if unknown:
+            return Response(
+                {"error": f"Unknown resource(s): {', '.join(unknown)}. Choose from {', '.join(changes.RESOURCES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            since = changes.decode_token(request.query_params['since']) if 'since' in request.query_params else None
+            return Response(changes.changes(resources or list(changes.RESOURCES), since))
+        except changes.InvalidToken as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except changes.TokenExpired:
+            return Response({"error": "Token expired, sync again without since", "reset": True},
+                            status=status.HTTP_410_GONE)
+
+
+# Whole active State → Location → SubLocation → Pincode tree in one cached response
+class LocationHierarchyView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        state = request.query_params.get('state')
+        if state is not None and not state.isdigit():
+            return Response({"error": "state must be a BranchState id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        tree = hierarchy.get_tree(int(state) if state else None)
+        if state and not tree:
+            return Response({"error": "State not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(tree)
+
+
+# Per-endpoint request counts and latency / SQL histograms in the Prometheus text format
+class MetricsView(APIView):
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def get(self, request):
+        text = metrics.registry.render() + '\n'.join(reference_cache.metric_lines()) + '\n'
+        return HttpResponse(text, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# A stored request profile (see profiling.py); ?download=pstats or ?download=collapsed for the raw data
+class ProfileView(APIView):
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        report = profiling.get_report(profile_id)
+        if report is None:
+            return Response({"error": "Profile not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+
+        fmt = request.query_params.get('download')
+        if fmt in ('pstats', 'collapsed'):
+            if fmt not in report:
+                return Response({"error": f"No {fmt} data for a {report['mode']} profile"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            content_type = 'application/octet-stream' if fmt == 'pstats' else 'text/plain; charset=utf-8'
+            response = HttpResponse(report[fmt], content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{profile_id}.{fmt}"'
+            return response
+        return Response({key: value for key, value in report.items() if key not in ('pstats', 'collapsed')})
+
+
+# Background delete / archive of a whole state, location or sublocation subtree.
+# POST {kind, root_id, mode} answers 202 at once; GET the job to follow its progress.
+class SubtreeJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                        viewsets.GenericViewSet):
+    queryset = SubtreeJob.objects.order_by('-id')
+    serializer_class = SubtreeJobSerializer
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        subtree.start(job)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+# Progress and per-row errors of bulk provisioning jobs (created by POST /api/users/bulk/)
+class ProvisionJobViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    queryset = ProvisionJob.objects.order_by('-id')
+    serializer_class = ProvisionJobSerializer
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+
+class BranchInnerStateViewSet(BatchActionMixin, ConditionalGetMixin, ModelViewSet):
     queryset = BranchInnerState.objects.all()
     serializer_class = BranchInnerStateSerializer
 
 
-class BranchInnerLocationViewSet(ModelViewSet):
+class BranchInnerLocationViewSet(BatchActionMixin, RepresentationListMixin, ModelViewSet):
     queryset = BranchInnerLocation.objects.all()
     serializer_class = BranchInnerLocationSerializer
+    list_representation = representations.BRANCH_INNER_LOCATION
 
     def get_queryset(self):
-        queryset = BranchInnerLocation.objects.all()
+        # Join the relations behind branch_inner_state_name / branch_location_name
+        queryset = BranchInnerLocation.objects.select_related('branch_inner_state', 'branch_location')
         branch_inner_state = self.request.query_params.get('branch_inner_state')
         branch_location = self.request.query_params.get('branch_location')
         status = self.request.query_params.get('status')
@@ -226,12 +448,15 @@ class BranchInnerLocationViewSet(ModelViewSet):
 
 
 # Pincode ViewSet
-class PincodeViewSet(viewsets.ModelViewSet):
+class PincodeViewSet(BatchActionMixin, RepresentationListMixin, viewsets.ModelViewSet):
     queryset = Pincode.objects.all()
     serializer_class = PincodeSerializer
+    list_representation = representations.PINCODE
+    keyset_ordering = ('-created_at', '-id')  # matches Meta.ordering, id breaks ties
 
     def get_queryset(self):
-        queryset = Pincode.objects.all()
+        # Join the relations behind branch_state_name / location_name / sub_location_name
+        queryset = Pincode.objects.select_related('branch_state', 'branch_location', 'sub_location')
         branch_state = self.request.query_params.get('branch_state')
         branch_location = self.request.query_params.get('branch_location')
         sub_location = self.request.query_params.get('sub_location')
@@ -248,12 +473,42 @@ class PincodeViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @action(detail=False, methods=['post'], url_path='bulk-import', parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        """Import a CSV upload (`file`) of pincode,state,location,sub_location rows"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Upload a CSV file in the 'file' field"}, status=status.HTTP_400_BAD_REQUEST)
 
-
-
-class BranchInnerStateViewSet(ModelViewSet):
-    queryset = BranchInnerState.objects.all()
-    serializer_class = BranchInnerStateSerializer
+        create_missing = request.query_params.get('create_missing', '').lower() in ('1', 'true', 'yes')
+        importer = PincodeImporter(create_missing=create_missing)
+        try:
+            result = importer.import_file(upload)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # Chunks before the bad line are already committed
+            return Response({"error": f"Unreadable CSV: {exc}", "created": importer.created},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path=r'lookup/(?P<code>[^/.]+)')
+    def lookup(self, request, code=None):
+        """Resolve one pincode to its sublocation, location and state from the in-memory index"""
+        record = pincode_index.lookup(code)
+        if record is None:
+            return Response({"error": "Pincode not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(record)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Active pincodes starting with ?q= (at most ?limit=, default 10)"""
+        prefix = request.query_params.get('q', '')
+        if not prefix.isdigit():
+            return Response({"error": "q must be the leading digits of a pincode"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+        except ValueError:
+            limit = 10
+        return Response(pincode_index.complete(prefix, limit))
 
 
 
@@ -261,11 +516,19 @@ class BranchInnerStateViewSet(ModelViewSet):
 
 
 
-class BankViewSet(ModelViewSet):
+class BankViewSet(BatchActionMixin, ConditionalGetMixin, ModelViewSet):
     queryset = Bank.objects.filter(status=True)
     serializer_class = BankSerializer
 
+    def get_batch_queryset(self):
+        # Inactive rows are hidden from the routes but must still be re-activatable
+        return Bank.objects.all()
 
-class TypeOfAccountViewSet(ModelViewSet):
+
+class TypeOfAccountViewSet(BatchActionMixin, ConditionalGetMixin, ModelViewSet):
     queryset = TypeOfAccount.objects.filter(status=True)
-    serializer_class = TypeOfAccountSerializer
\ No newline at end of file
+    serializer_class = TypeOfAccountSerializer
+
+    def get_batch_queryset(self):
+        # Inactive rows are hidden from the routes but must still be re-activatable
+        return TypeOfAccount.objects.all()
@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
+os.environ.setdefault('DJANGO_ASGI', '1')  # settings.py turns persistent connections off under ASGI
 
 application = get_asgi_application()
+
+# Load the in-memory pincode index before the first request (servers only; not management commands)
+from myapp.pincode_index import warm_up  # noqa: E402
+
+warm_up()
@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myapp.middleware.PerformanceMiddleware',  # first, so its timings cover the whole stack
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -52,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'myapp.middleware.ProfilingMiddleware',  # ?profile=1 for admins, see myapp/profiling.py
 ]
 
 
@@ -66,8 +71,36 @@ AUTH_USER_MODEL = 'myapp.User'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ]
+        # Builds request.user from the token's role / flag claims, without a query
+        "myapp.authentication.ClaimsJWTAuthentication",
+    ],
+    # Opt-in: lists stay unpaginated unless the client sends ?cursor= or ?page_size=
+    "DEFAULT_PAGINATION_CLASS": "myapp.pagination.KeysetPagination",
+    "PAGE_SIZE": 50,
+    # Same bytes as DRF's JSON renderer / parser, encoded with orjson when it is installed
+    "DEFAULT_RENDERER_CLASSES": [
+        "myapp.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "myapp.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# MessagePack for internal consumers (Accept / Content-Type: application/msgpack),
+# offered only when the msgpack package is installed
+if importlib.util.find_spec("msgpack") is not None:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].append("myapp.renderers.MessagePackRenderer")
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].append("myapp.renderers.MessagePackParser")
+
+# Access tokens carry the user's role and flags, so keep them short-lived: a role
+# change or deactivation is enforced at the latest when the access token expires
+# (immediately where the revocation cache is shared, see myapp/authentication.py).
+SIMPLE_JWT = {
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
+    "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
 
@@ -110,9 +143,54 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,  # seconds to wait for a lock before "database is locked"
+            # Take the write lock at BEGIN, so two transactions never deadlock upgrading
+            # from a read lock (the cause of most "database is locked" errors under load)
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Keep connections (and their pragmas / page cache) between requests under WSGI.
+        # Under ASGI (asgi.py sets DJANGO_ASGI) each request's sync code may run on a
+        # different thread, so persistent connections pile up instead of being reused;
+        # Django advises 0 there.
+        'CONN_MAX_AGE': 0 if os.environ.get('DJANGO_ASGI') else 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Per-connection SQLite pragmas, merged over myapp.sqlite.DEFAULT_PRAGMAS
+# (WAL, synchronous=NORMAL, busy_timeout, cache_size, mmap_size, temp_store).
+# e.g. {'mmap_size': 0} to disable memory mapping, or {'journal_mode': None} to keep the file's mode.
+SQLITE_PRAGMAS = {}
+
+# Requests slower than this are logged to `myapp.performance` with their slowest SQL (None disables)
+PERFORMANCE_SLOW_REQUEST_MS = 500
+
+# Delta sync (/api/changes/): overlap between consecutive tokens, and how long deletions are remembered
+CHANGES_MARGIN_SECONDS = 5
+CHANGES_TOMBSTONE_DAYS = 30
+
+# Change event stream (/api/events/, ASGI only)
+EVENTS_POLL_INTERVAL = 1.0  # seconds between each process's polls of the ChangeEvent table
+EVENTS_HEARTBEAT = 15.0  # seconds of silence before a keepalive comment
+EVENTS_MAX_BACKLOG = 1000  # missed events replayed on reconnect before sending `reset` instead
+EVENTS_QUEUE_SIZE = 100  # unread batches per stream before a slow client is disconnected
+EVENTS_MAX_CONNECTIONS = 1000  # open streams per process
+EVENTS_RETENTION_DAYS = 7
+
+# On-demand request profiling (?profile=1 / ?profile=sample, admins only)
+PROFILE_MAX_CONCURRENT = 2  # per server process (worker), not cluster-wide; 0 disables profiling
+PROFILE_TTL = 3600  # seconds a report stays retrievable at /api/profiles/<id>/
+PROFILE_SAMPLE_INTERVAL = 0.001  # seconds between stack samples in sample mode
+
+# Per-process cache of the reference tables (myapp/reference_cache.py): how stale a
+# write made by another process may look, in seconds
+REFERENCE_CACHE_RECHECK_SECONDS = 1.0
+
+# Bulk user provisioning (/api/users/bulk/, provision_users command)
+PROVISION_WORKERS = None  # password hashing processes, one pool per server process; None uses every CPU
+PROVISION_MAX_ROWS = 5000  # per API request; larger files go through the command
+
 
 
 # DATABASES = {
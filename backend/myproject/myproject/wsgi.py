@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
 application = get_wsgi_application()
+
+# Load the in-memory pincode index before the first request (servers only; not management commands)
+from myapp.pincode_index import warm_up  # noqa: E402
+
+warm_up()